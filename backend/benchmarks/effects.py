@@ -0,0 +1,225 @@
+"""Benchmark the built-in effect kernels across resolutions and batch sizes.
+
+Runs every kernel from ``openscope_backend.effects`` (plus the example
+pipeline from ``processor-architecture.md``) on the CPU, records fps,
+p50/p99 latency and peak RSS per case and compares them to a stored
+baseline. Exits non-zero when throughput regresses beyond the threshold.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.effects                      # run and compare
+    python -m benchmarks.effects --save-baseline      # record a new baseline
+    python -m benchmarks.effects --quick --kernels blur kaleidoscope
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from openscope_backend import effects
+
+HERE = Path(__file__).parent
+DEFAULT_BASELINE = HERE / "baseline.json"
+DEFAULT_OUTPUT = HERE / "results.json"
+
+RESOLUTIONS = [(270, 480), (540, 960), (720, 1280)]
+BATCH_SIZES = [1, 4, 8]
+QUICK_RESOLUTIONS = [(270, 480)]
+QUICK_BATCH_SIZES = [1, 4]
+
+
+def example_pipeline(frames: np.ndarray, intensity: float = 0.5) -> np.ndarray:
+    """NumPy port of ``VFXPipeline.__call__`` from processor-architecture.md.
+
+    Takes uint8 frames like Scope does, normalizes, scales and clamps.
+    """
+    batch = frames.astype(np.float32) / 255.0
+    batch *= intensity
+    return np.clip(batch, 0.0, 1.0, out=batch)
+
+
+def blend_kernel(mode: str) -> Callable[[np.ndarray], np.ndarray]:
+    """Blend a batch with its time-reversed copy using ``mode``."""
+    return lambda frames: effects.blend(frames, frames[::-1], mode, 0.5)
+
+
+# Kernel name -> (function of a THWC batch, input dtype)
+KERNELS: Dict[str, Tuple[Callable[[np.ndarray], np.ndarray], str]] = {
+    "brightness": (lambda f: effects.brightness(f, 25), "float32"),
+    "contrast": (lambda f: effects.contrast(f, 1.5), "float32"),
+    "blur": (lambda f: effects.blur(f, 5), "float32"),
+    "mirror": (lambda f: np.ascontiguousarray(effects.mirror(f, "both")), "float32"),
+    "kaleido": (lambda f: effects.kaleido(f, 6, 30, 1.2), "float32"),
+    "kaleidoscope_warp": (
+        lambda f: effects.kaleidoscope(f, mirror_mode="4x", warp=0.3, mix=0.8),
+        "float32",
+    ),
+    **{
+        f"blend_{mode}": (blend_kernel(mode), "float32") for mode in effects.BLEND_MODES
+    },
+    "example_pipeline": (example_pipeline, "uint8"),
+}
+
+
+def case_key(kernel: str, height: int, width: int, batch_size: int) -> str:
+    """Stable identifier of one matrix cell."""
+    return f"{kernel}@{height}x{width}xT{batch_size}"
+
+
+def run_case(
+    kernel: str, height: int, width: int, batch_size: int, iterations: int
+) -> Dict[str, Any]:
+    """Time one kernel in a fresh worker process so peak RSS is per case."""
+    function, dtype = KERNELS[kernel]
+    rng = np.random.default_rng(0)
+    if dtype == "uint8":
+        frames = rng.integers(0, 256, (batch_size, height, width, 3), dtype=np.uint8)
+    else:
+        frames = rng.random((batch_size, height, width, 3), dtype=np.float32)
+
+    function(frames)  # warm-up, fills any shape-keyed caches
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function(frames)
+        timings.append(time.perf_counter() - start)
+
+    timings_ms = np.array(timings) * 1000.0
+    return {
+        "kernel": kernel,
+        "height": height,
+        "width": width,
+        "batch_size": batch_size,
+        "iterations": iterations,
+        # Median-based so one descheduled iteration does not look like a regression
+        "fps": batch_size / float(np.median(timings)),
+        "p50_ms": float(np.percentile(timings_ms, 50)),
+        "p99_ms": float(np.percentile(timings_ms, 99)),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+
+
+def run_suite(
+    kernels: List[str],
+    resolutions: List[Tuple[int, int]],
+    batch_sizes: List[int],
+    iterations: int,
+) -> Dict[str, Any]:
+    """Run the full matrix and return a results document."""
+    results = {}
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+        for kernel in kernels:
+            for height, width in resolutions:
+                for batch_size in batch_sizes:
+                    key = case_key(kernel, height, width, batch_size)
+                    result = pool.submit(
+                        run_case, kernel, height, width, batch_size, iterations
+                    ).result()
+                    results[key] = result
+                    print(
+                        f"{key:<40} {result['fps']:>9.1f} fps  "
+                        f"p50 {result['p50_ms']:>8.2f} ms  "
+                        f"p99 {result['p99_ms']:>8.2f} ms  "
+                        f"rss {result['peak_rss_mb']:>7.1f} MB",
+                        file=sys.stderr,
+                    )
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[Dict[str, Any]]:
+    """Return cases whose fps dropped more than ``threshold`` below baseline."""
+    regressions = []
+    for key, result in current["results"].items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        change = result["fps"] / previous["fps"] - 1.0
+        if change < -threshold:
+            regressions.append(
+                {
+                    "case": key,
+                    "baseline_fps": previous["fps"],
+                    "fps": result["fps"],
+                    "change": change,
+                }
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    """Command-line entry point; returns the process exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kernels", nargs="+", choices=sorted(KERNELS))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--quick", action="store_true", help="small matrix")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="allowed fractional fps drop before failing (default 0.15)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="write the results as the new baseline instead of comparing",
+    )
+    args = parser.parse_args(argv)
+
+    current = run_suite(
+        args.kernels or list(KERNELS),
+        QUICK_RESOLUTIONS if args.quick else RESOLUTIONS,
+        QUICK_BATCH_SIZES if args.quick else BATCH_SIZES,
+        args.iterations,
+    )
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        current["baseline"] = str(args.baseline)
+        current["regressions"] = compare(current, baseline, args.threshold)
+    else:
+        print(f"No baseline at {args.baseline}; skipping comparison", file=sys.stderr)
+        current["regressions"] = []
+
+    args.output.write_text(json.dumps(current, indent=2) + "\n")
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    for regression in current["regressions"]:
+        print(
+            f"REGRESSION {regression['case']}: {regression['baseline_fps']:.1f} -> "
+            f"{regression['fps']:.1f} fps ({regression['change']:+.1%})",
+            file=sys.stderr,
+        )
+    return 1 if current["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""Stand-in Scope server for load-testing OpenScope without a GPU.
+
+Implements the upstream endpoints the routers call, with configurable
+latency, jitter, error rate and pipeline load / plugin install durations.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.fake_scope --port 8000 --latency-ms 20 --error-rate 0.01
+    SCOPE_API_URL=http://localhost:8000 ./run.sh
+"""
+
+import argparse
+import asyncio
+import random
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class FakeScopeConfig(BaseModel):
+    """Behaviour of the fake server."""
+
+    latency_ms: float = 10.0
+    jitter_ms: float = 5.0
+    error_rate: float = 0.0
+    load_seconds: float = 5.0
+    install_seconds: float = 2.0
+    extra_pipelines: int = 20  # padding so schema payloads are realistically large
+    seed: Optional[int] = None
+
+
+BUILTIN_PIPELINES = ["passthrough", "longlive", "streamdiffusionv2", "krea-realtime"]
+
+PLUGINS = [
+    ("kaleido-scope", "0.1.0", ["kaleido-scope-pre"]),
+    ("scope-bloom", "0.2.0", ["bloom"]),
+]
+
+
+def pipeline_schema(pipeline_id: str, plugin_name: Optional[str] = None):
+    """Schema shaped like Scope's, with a handful of runtime parameters."""
+    return {
+        "pipeline_name": pipeline_id.replace("-", " ").title(),
+        "pipeline_description": f"Fake {pipeline_id} pipeline",
+        "supported_modes": ["video", "text"],
+        "default_mode": "video",
+        "plugin_name": plugin_name,
+        "usage": ["preprocessor"] if plugin_name else [],
+        "config_schema": {
+            "type": "object",
+            "properties": {
+                "strength": {"type": "number", "minimum": 0, "maximum": 1},
+                "steps": {"type": "integer", "minimum": 1, "maximum": 50},
+                "seed": {"type": "integer", "default": 42},
+                "prompt": {"type": "string", "default": ""},
+                "resolution": {
+                    "type": "string",
+                    "enum": ["512x512", "768x768", "1024x576"],
+                },
+            },
+        },
+    }
+
+
+class FakeScope:
+    """Mutable server state."""
+
+    def __init__(self, config: FakeScopeConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.status: Dict[str, Any] = {"status": "not_loaded"}
+        self.load_task: Optional[asyncio.Task] = None
+        self.sessions: Dict[str, List[dict]] = {}
+        self.cloud = {"connected": False, "connecting": False, "app_id": None}
+        self.plugins = {name: (version, pipes) for name, version, pipes in PLUGINS}
+
+    def schemas(self) -> Dict[str, Any]:
+        pipelines = {pid: pipeline_schema(pid) for pid in BUILTIN_PIPELINES}
+        for name, (_, pipes) in self.plugins.items():
+            for pid in pipes:
+                pipelines[pid] = pipeline_schema(pid, name)
+        for i in range(self.config.extra_pipelines):
+            pipelines[f"synthetic-{i:03d}"] = pipeline_schema(f"synthetic-{i:03d}")
+        return pipelines
+
+    async def finish_load(self, pipeline_ids: List[str], load_params: dict):
+        await asyncio.sleep(self.config.load_seconds)
+        self.status = {
+            "status": "loaded",
+            "pipeline_ids": pipeline_ids,
+            "load_params": load_params,
+        }
+
+
+def create_app(config: FakeScopeConfig) -> FastAPI:
+    """Build the fake Scope application."""
+    app = FastAPI(title="Fake Scope")
+    state = FakeScope(config)
+    app.state.scope = state
+
+    @app.middleware("http")
+    async def latency_and_errors(request: Request, call_next):
+        delay = config.latency_ms + state.random.uniform(0, config.jitter_ms)
+        await asyncio.sleep(delay / 1000.0)
+        if state.random.random() < config.error_rate:
+            return JSONResponse({"detail": "Injected failure"}, status_code=503)
+        return await call_next(request)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "version": "fake"}
+
+    @app.get("/api/v1/pipelines/schemas")
+    async def schemas():
+        return {"pipelines": state.schemas()}
+
+    @app.get("/api/v1/pipeline/status")
+    async def pipeline_status():
+        return state.status
+
+    @app.post("/api/v1/pipeline/load")
+    async def pipeline_load(body: Dict[str, Any]):
+        pipeline_ids = body.get("pipeline_ids") or []
+        unknown = [pid for pid in pipeline_ids if pid not in state.schemas()]
+        if not pipeline_ids or unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown pipelines: {unknown}")
+        if state.load_task is not None:
+            state.load_task.cancel()
+        state.status = {"status": "loading", "pipeline_ids": pipeline_ids}
+        state.load_task = asyncio.create_task(
+            state.finish_load(pipeline_ids, body.get("load_params") or {})
+        )
+        return {"message": "Pipeline loading initiated", "pipeline_ids": pipeline_ids}
+
+    @app.get("/api/v1/webrtc/ice-servers")
+    async def ice_servers():
+        return {"iceServers": [{"urls": "stun:stun.l.google.com:19302"}]}
+
+    @app.post("/api/v1/webrtc/offer")
+    async def offer(body: Dict[str, Any]):
+        if state.status.get("status") != "loaded":
+            raise HTTPException(status_code=400, detail="Pipeline not loaded")
+        session_id = uuid.uuid4().hex
+        state.sessions[session_id] = []
+        return {
+            "sdp": "v=0\r\no=- 0 0 IN IP4 127.0.0.1\r\ns=fake\r\nt=0 0\r\n",
+            "type": "answer",
+            "sessionId": session_id,
+        }
+
+    @app.post("/api/v1/webrtc/ice")
+    async def ice(session_id: str, body: Dict[str, Any]):
+        if session_id not in state.sessions:
+            raise HTTPException(status_code=404, detail="Unknown session")
+        state.sessions[session_id].extend(body.get("candidates") or [body])
+        return {"status": "ok"}
+
+    @app.get("/api/v1/cloud/status")
+    async def cloud_status():
+        return {**state.cloud, "webrtc_connected": False}
+
+    @app.post("/api/v1/cloud/connect")
+    async def cloud_connect(body: Dict[str, Any]):
+        if not body.get("app_id") or not body.get("api_key"):
+            raise HTTPException(status_code=400, detail="Cloud credentials missing")
+        state.cloud = {"connected": True, "connecting": False, "app_id": body["app_id"]}
+        return {**state.cloud, "webrtc_connected": False}
+
+    @app.post("/api/v1/cloud/disconnect")
+    async def cloud_disconnect():
+        state.cloud = {"connected": False, "connecting": False, "app_id": None}
+        return state.cloud
+
+    @app.get("/api/v1/plugins")
+    async def list_plugins():
+        plugins = [
+            {
+                "name": name,
+                "version": version,
+                "pipelines": [{"pipeline_id": pid} for pid in pipes],
+            }
+            for name, (version, pipes) in state.plugins.items()
+        ]
+        return {"plugins": plugins, "total": len(plugins)}
+
+    @app.post("/api/v1/plugins")
+    async def install_plugin(body: Dict[str, Any]):
+        package = body.get("package", "")
+        name = package.rstrip("/").rsplit("/", 1)[-1] or "plugin"
+        await asyncio.sleep(config.install_seconds)
+        state.plugins[name] = ("0.0.1", [name])
+        return {"success": True, "plugin": name}
+
+    @app.delete("/api/v1/plugins/{name}")
+    async def uninstall_plugin(name: str):
+        if state.plugins.pop(name, None) is None:
+            raise HTTPException(status_code=404, detail="Plugin not installed")
+        return {"success": True}
+
+    @app.post("/api/v1/restart")
+    async def restart():
+        state.status = {"status": "not_loaded"}
+        state.sessions.clear()
+        return {"status": "restarting"}
+
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    for name, field in FakeScopeConfig.model_fields.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=int if field.annotation in (int, Optional[int]) else float,
+            default=field.default,
+        )
+    args = parser.parse_args(argv)
+    config = FakeScopeConfig(
+        **{name: getattr(args, name) for name in FakeScopeConfig.model_fields}
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Replay realistic client mixes against a running OpenScope backend.
+
+Simulated users follow the frontend's request patterns:
+
+* ``poller``   - ``useScopeServer``: status polled at 1 Hz, health every 30 s
+* ``templates`` - ``TemplateModal`` opening bursts (templates, categories,
+  plugins) separated by think time
+* ``session``  - fetch schemas, load a pipeline, poll status until loaded,
+  then ICE servers, an offer and a trickle of ICE candidates (one request
+  each, or batched with ``--ice batched``); ``session setup`` times the
+  offer through the last candidate delivered
+
+Reports throughput and p50/p99 latency per endpoint. Point the backend at
+``benchmarks.fake_scope`` for reproducible upstream behaviour.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.load --url http://localhost:3001 --duration 60 \\
+        --users poller=20 templates=5 session=2 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+DEFAULT_USERS = {"poller": 10, "templates": 3, "session": 1}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    """Per-endpoint latency samples and status counts."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(
+        self, client: httpx.AsyncClient, method: str, endpoint: str, name: str, **kw
+    ):
+        """Send one request and record it under ``name``."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, endpoint, **kw)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            response = None
+            status = type(e).__name__
+        self.latencies[name].append((time.perf_counter() - start) * 1000.0)
+        self.statuses[name][status] += 1
+        return response
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            statuses = dict(self.statuses[name])
+            errors = sum(n for s, n in statuses.items() if not s.startswith("2"))
+            endpoints[name] = {
+                "requests": len(samples),
+                "rps": len(samples) / elapsed,
+                "p50_ms": percentile(samples, 50),
+                "p99_ms": percentile(samples, 99),
+                "max_ms": max(samples),
+                "errors": errors,
+                "statuses": statuses,
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "duration_s": elapsed,
+            "requests": total,
+            "rps": total / elapsed,
+            "endpoints": endpoints,
+        }
+
+
+async def poller(client, recorder, rng, stop, **_):
+    """1 Hz pipeline status polling plus the 30 s health check."""
+    last_health = 0.0
+    while not stop.is_set():
+        if time.monotonic() - last_health >= 30.0:
+            last_health = time.monotonic()
+            await recorder.request(client, "GET", "/api/scope/health", "GET health")
+        await recorder.request(
+            client, "GET", "/api/scope/pipeline/status", "GET pipeline/status"
+        )
+        await sleep(stop, 1.0)
+
+
+async def templates(client, recorder, rng, stop, **_):
+    """Template modal opened repeatedly; each open is a parallel burst."""
+    while not stop.is_set():
+        await asyncio.gather(
+            recorder.request(client, "GET", "/api/templates/", "GET templates"),
+            recorder.request(
+                client, "GET", "/api/templates/categories", "GET templates/categories"
+            ),
+            recorder.request(client, "GET", "/api/scope/plugins", "GET plugins"),
+        )
+        await sleep(stop, rng.uniform(2.0, 8.0))
+
+
+async def session(client, recorder, rng, stop, ice_mode="single"):
+    """Load a pipeline and start a WebRTC session, then idle and repeat."""
+    while not stop.is_set():
+        response = await recorder.request(
+            client, "GET", "/api/scope/pipelines", "GET pipelines"
+        )
+        pipelines = list((response.json() if response else {}).get("pipelines", {}))
+        pipeline_id = rng.choice(pipelines) if pipelines else "passthrough"
+        await recorder.request(
+            client,
+            "POST",
+            "/api/scope/pipeline/load",
+            "POST pipeline/load",
+            json={"pipeline_ids": [pipeline_id], "load_params": {}},
+        )
+
+        while not stop.is_set():
+            await sleep(stop, 1.0)
+            status = await recorder.request(
+                client, "GET", "/api/scope/pipeline/status", "GET pipeline/status"
+            )
+            state = status.json().get("status") if status is not None else "error"
+            if state in ("loaded", "error", None):
+                break
+
+        await recorder.request(
+            client, "GET", "/api/scope/webrtc/ice-servers", "GET webrtc/ice-servers"
+        )
+        setup_start = time.perf_counter()
+        offer = await recorder.request(
+            client,
+            "POST",
+            "/api/scope/webrtc/offer",
+            "POST webrtc/offer",
+            json={"sdp": "v=0\r\n", "type": "offer", "initialParameters": {}},
+        )
+        session_id = (offer.json() if offer else {}).get("sessionId")
+        if session_id:
+            candidates = [
+                {"candidate": f"candidate:{i} 1 udp 2122260223 10.0.0.1"}
+                for i in range(rng.randint(4, 12))
+            ]
+            await send_candidates(client, recorder, session_id, candidates, ice_mode)
+            # Offer sent to every candidate delivered: the server's share of
+            # connection setup
+            recorder.latencies[f"session setup ({ice_mode} ice)"].append(
+                (time.perf_counter() - setup_start) * 1000.0
+            )
+        await recorder.request(
+            client, "GET", "/api/scope/cloud/status", "GET cloud/status"
+        )
+        await sleep(stop, rng.uniform(10.0, 30.0))
+
+
+async def send_candidates(client, recorder, session_id, candidates, ice_mode):
+    """Trickle candidates the way the browser does, one by one or batched."""
+    if ice_mode == "batched":
+        # Gathering is bursty: a first batch, then stragglers shortly after
+        split = max(1, len(candidates) * 2 // 3)
+        await asyncio.gather(
+            *(
+                recorder.request(
+                    client,
+                    "POST",
+                    "/api/scope/webrtc/ice/batch",
+                    "POST webrtc/ice/batch",
+                    params={"session_id": session_id},
+                    json={"candidates": chunk},
+                )
+                for chunk in (candidates[:split], candidates[split:])
+                if chunk
+            )
+        )
+        return
+    for candidate in candidates:
+        await recorder.request(
+            client,
+            "POST",
+            "/api/scope/webrtc/ice",
+            "POST webrtc/ice",
+            params={"session_id": session_id},
+            json=candidate,
+        )
+
+
+SCENARIOS = {"poller": poller, "templates": templates, "session": session}
+
+
+async def sleep(stop: asyncio.Event, seconds: float):
+    """Sleep that wakes early when the run ends."""
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run(
+    url: str,
+    users: Dict[str, int],
+    duration: float,
+    seed: int,
+    ice_mode: str = "single",
+) -> Dict[str, Any]:
+    """Run the mix for ``duration`` seconds and return the report."""
+    recorder = Recorder()
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=sum(users.values()) * 3)
+    async with httpx.AsyncClient(base_url=url, timeout=60.0, limits=limits) as client:
+        tasks = []
+        for name, count in users.items():
+            for i in range(count):
+                # Per-user seeds keep runs reproducible regardless of scheduling
+                rng = random.Random(f"{seed}-{name}-{i}")
+
+                async def user(scenario=SCENARIOS[name], rng=rng):
+                    # Stagger starts so pollers do not fire in lockstep
+                    await sleep(stop, rng.uniform(0.0, 1.0))
+                    await scenario(client, recorder, rng, stop, ice_mode=ice_mode)
+
+                tasks.append(asyncio.create_task(user()))
+
+        start = time.perf_counter()
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+    report = recorder.report(elapsed)
+    report["users"] = users
+    report["ice_mode"] = ice_mode
+    report["url"] = url
+    return report
+
+
+def parse_users(values: List[str]) -> Dict[str, int]:
+    users = {}
+    for value in values:
+        name, _, count = value.partition("=")
+        if name not in SCENARIOS or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"invalid user spec: {value}")
+        users[name] = int(count)
+    return users
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:3001")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument(
+        "--users",
+        nargs="+",
+        default=[f"{k}={v}" for k, v in DEFAULT_USERS.items()],
+        help="scenario=count pairs; scenarios: " + ", ".join(SCENARIOS),
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--ice",
+        choices=("single", "batched"),
+        default="single",
+        help="trickle ICE one candidate per request or in batches",
+    )
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(
+        run(args.url, parse_users(args.users), args.duration, args.seed, args.ice)
+    )
+
+    print(
+        f"{'endpoint':<30} {'reqs':>7} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}",
+        file=sys.stderr,
+    )
+    for name, e in report["endpoints"].items():
+        print(
+            f"{name:<30} {e['requests']:>7} {e['rps']:>8.2f} "
+            f"{e['p50_ms']:>9.1f} {e['p99_ms']:>9.1f} {e['errors']:>7}",
+            file=sys.stderr,
+        )
+    print(
+        f"{'total':<30} {report['requests']:>7} {report['rps']:>8.2f}", file=sys.stderr
+    )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Measure backend cold start and check it against a time budget.
+
+Reports import time per module (``python -X importtime``) and the time from
+spawning uvicorn to the first healthy ``/health`` response, taking the
+median over several fresh processes. Exits non-zero when either median
+exceeds its budget.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.startup
+    GITHUB_ENABLED=false AI_ENABLED=false python -m benchmarks.startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND = Path(__file__).parent.parent
+APP_MODULE = "openscope_backend.main"
+
+
+def import_times() -> Dict[str, Any]:
+    """Import the app once with ``-X importtime`` and parse the tree."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {APP_MODULE}"],
+        cwd=BACKEND,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, total_us, name = line.split("|")
+            total_ms = int(total_us) / 1000.0
+        except ValueError:
+            continue  # the header line
+        module = name.strip()
+        cumulative[module] = total_ms
+        # Third-party packages; nested ones also count towards their importer
+        if (
+            "." not in module
+            and not module.startswith("_")
+            and module not in sys.stdlib_module_names
+            and module not in ("openscope_backend", "site")
+        ):
+            packages[module] = total_ms
+    return {
+        "total_ms": cumulative.get(APP_MODULE, 0.0),
+        "modules": {
+            m: t for m, t in cumulative.items() if m.startswith("openscope_backend")
+        },
+        "packages": dict(
+            sorted(packages.items(), key=lambda item: item[1], reverse=True)[:15]
+        ),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_healthy(timeout: float = 60.0) -> float:
+    """Seconds from spawning uvicorn to the first 200 from ``/health``."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            f"{APP_MODULE}:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/health", timeout=1.0
+                ) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"server not healthy after {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-import-ms", type=float, default=1500.0)
+    parser.add_argument("--budget-healthy-ms", type=float, default=3000.0)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+
+    # Keep local proxies out of the health probe
+    os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+    imports: List[Dict[str, Any]] = [import_times() for _ in range(args.runs)]
+    healthy_ms = [time_to_healthy() * 1000.0 for _ in range(args.runs)]
+
+    median_run = sorted(imports, key=lambda r: r["total_ms"])[len(imports) // 2]
+    report = {
+        "runs": args.runs,
+        "import_ms": statistics.median(r["total_ms"] for r in imports),
+        "healthy_ms": statistics.median(healthy_ms),
+        "modules": median_run["modules"],
+        "packages": median_run["packages"],
+        "budget": {
+            "import_ms": args.budget_import_ms,
+            "healthy_ms": args.budget_healthy_ms,
+        },
+    }
+
+    print("Slowest third-party packages (cumulative):", file=sys.stderr)
+    for name, ms in report["packages"].items():
+        print(f"  {name:<40} {ms:>8.1f} ms", file=sys.stderr)
+    print("Backend modules (cumulative):", file=sys.stderr)
+    for name, ms in sorted(report["modules"].items(), key=lambda m: -m[1]):
+        print(f"  {name:<40} {ms:>8.1f} ms", file=sys.stderr)
+
+    failures = []
+    for key in ("import_ms", "healthy_ms"):
+        status = "ok"
+        if report[key] > report["budget"][key]:
+            status = "OVER BUDGET"
+            failures.append(key)
+        print(
+            f"{key:<12} {report[key]:>8.1f} ms  (budget {report['budget'][key]:.0f} ms) "
+            f"{status}",
+            file=sys.stderr,
+        )
+    report["passed"] = not failures
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
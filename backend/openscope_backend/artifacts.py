@@ -0,0 +1,491 @@
+"""Content-addressed store of plugin wheels and a local package index.
+
+Scope installs a plugin from whatever package spec it is given. For a git
+URL that means a clone and a build on every fresh Scope host. Instead, the
+backend builds each wheel once (``pip wheel``), or imports it from
+``artifact_seed_dir`` or an upload, and keeps it on local disk by SHA-256:
+
+    <artifact_dir>/files/<sha256>/<wheel filename>
+    <artifact_dir>/manifest.json
+
+The manifest records which source (a git URL, or any key the caller picks)
+each wheel was built from. Installs then hand Scope the local wheel: a URL
+under ``artifact_base_url``, else a path, which only works when Scope runs
+on this host; with neither, installs use the source as before. The same
+files are listed as a PEP 503 simple index for pip. With pre-seeded wheels
+nothing touches the network.
+
+Plugins built in the editor are cached the same way, keyed by a hash of
+their file set (source ``files:<sha256>``): an unchanged plugin is not
+rebuilt, and only the newest ``artifact_keep_builds`` of them are kept.
+Building runs the project's build backend on this host, so editor plugins
+must use plain hatchling: no build hooks, no code-sourced version and no
+``setup.py``.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tomllib
+from functools import partial
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .config import settings
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = Path(__file__).parent.parent / "data" / "artifacts"
+
+ARTIFACT_LOOKUPS = Counter(
+    "openscope_artifact_lookups_total",
+    "Plugin wheel lookups by result (hit, built, build_failed or miss).",
+    ("result",),
+)
+
+# name-version(-build)?-python-abi-platform.whl
+WHEEL_NAME = re.compile(
+    r"^(?P<name>[^-]+)-(?P<version>[^-]+)(-\d[^-]*)?-[^-]+-[^-]+-[^-]+\.whl$"
+)
+
+
+class ArtifactError(Exception):
+    """A wheel could not be built or imported."""
+
+
+def normalize(name: str) -> str:
+    """PEP 503 project name normalization."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def project_for_source(source: str) -> str:
+    """Project name a git URL is expected to build, from its repository name."""
+    name = source.rstrip("/").rsplit("/", 1)[-1].split("@", 1)[0]
+    return normalize(name.removesuffix(".git"))
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Wheels on disk by SHA-256, with the sources they were built from."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.files_dir = root / "files"
+        self.manifest_path = root / "manifest.json"
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        # sha256 -> {filename, project, version, size, source, added}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # source -> sha256
+        self.sources: Dict[str, str] = {}
+        # One build per source at a time; later callers reuse its result
+        self.building: Dict[str, asyncio.Future] = {}
+        self.load()
+
+    def load(self):
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return
+        self.files = {
+            sha: entry
+            for sha, entry in manifest.get("files", {}).items()
+            if self.path(sha, entry).is_file()
+        }
+        self.sources = {
+            source: sha
+            for source, sha in manifest.get("sources", {}).items()
+            if sha in self.files
+        }
+
+    def save(self):
+        manifest = {"files": self.files, "sources": self.sources}
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+        os.replace(tmp, self.manifest_path)
+
+    def path(self, sha: str, entry: Optional[Dict[str, Any]] = None) -> Path:
+        entry = entry or self.files[sha]
+        return self.files_dir / sha / entry["filename"]
+
+    def put(self, wheel: Path, source: Optional[str] = None) -> Dict[str, Any]:
+        """Import a wheel file (blocking); returns its entry."""
+        match = WHEEL_NAME.match(wheel.name)
+        if match is None:
+            raise ArtifactError(f"Not a wheel filename: {wheel.name}")
+        sha = file_digest(wheel)
+        entry = self.files.get(sha)
+        if entry is None:
+            target = self.files_dir / sha / wheel.name
+            target.parent.mkdir(exist_ok=True)
+            # Copy then rename so readers never see a partial wheel
+            tmp = target.with_name(target.name + ".tmp")
+            shutil.copyfile(wheel, tmp)
+            os.replace(tmp, target)
+            entry = self.files[sha] = {
+                "filename": wheel.name,
+                "project": normalize(match["name"]),
+                "version": match["version"],
+                "size": target.stat().st_size,
+                "source": source,
+                "added": time.time(),
+            }
+        if source:
+            self.sources[source] = sha
+        self.save()
+        return {"sha256": sha, **entry}
+
+    def seed(self, directory: Path) -> int:
+        """Import every wheel in ``directory`` not already stored (blocking)."""
+        known = {(e["filename"], e["size"]) for e in self.files.values()}
+        added = 0
+        for wheel in sorted(directory.glob("*.whl")):
+            if (wheel.name, wheel.stat().st_size) not in known:
+                self.put(wheel)
+                added += 1
+        return added
+
+    def lookup(self, source: str, by_project: bool = True) -> Optional[Dict[str, Any]]:
+        """The wheel for a source: recorded, else the newest unclaimed one of
+        its project (seeded, or uploaded without a processor type)."""
+        sha = self.sources.get(source)
+        if sha is None and not by_project:
+            return None
+        if sha is None:
+            project = project_for_source(source)
+            claimed = set(self.sources.values())
+            candidates = [
+                (entry["added"], sha)
+                for sha, entry in self.files.items()
+                if entry["project"] == project and sha not in claimed
+            ]
+            if not candidates:
+                return None
+            sha = max(candidates)[1]
+        return {"sha256": sha, **self.files[sha]}
+
+    def projects(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Stored wheels grouped by normalized project name."""
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for sha, entry in self.files.items():
+            grouped.setdefault(entry["project"], []).append({"sha256": sha, **entry})
+        return grouped
+
+    def prune(self, prefix: str, keep: int):
+        """Drop all but the newest ``keep`` wheels of sources with ``prefix``."""
+        matching = sorted(
+            (self.files[sha]["added"], source, sha)
+            for source, sha in self.sources.items()
+            if source.startswith(prefix)
+        )
+        if len(matching) <= keep:
+            return
+        for _, source, _ in matching[: len(matching) - keep]:
+            self.drop_source(source)
+        self.save()
+
+    def forget(self, source: str) -> Optional[Dict[str, Any]]:
+        """Drop the wheel recorded for ``source`` so the next lookup rebuilds."""
+        sha = self.sources.get(source)
+        if sha is None:
+            return None
+        entry = {"sha256": sha, **self.files[sha]}
+        self.drop_source(source)
+        self.save()
+        return entry
+
+    def drop_source(self, source: str):
+        """Unrecord ``source``; its wheel goes too unless another source uses it."""
+        sha = self.sources.pop(source)
+        if sha not in self.sources.values():
+            shutil.rmtree(self.files_dir / sha, ignore_errors=True)
+            del self.files[sha]
+
+    async def build(
+        self, source: str, make: Optional[Callable[[Path], Awaitable[Path]]] = None
+    ) -> Dict[str, Any]:
+        """Build the wheel for ``source`` once; concurrent callers share it.
+
+        ``make`` builds into the given scratch directory and returns the wheel;
+        by default ``source`` is a pip requirement.
+        """
+        future = self.building.get(source)
+        if future is None:
+            future = self.building[source] = asyncio.ensure_future(
+                self._build(source, make or partial(build_wheel, source))
+            )
+            future.add_done_callback(lambda _: self.building.pop(source, None))
+        # A caller that goes away does not stop the build for the others
+        return await asyncio.shield(future)
+
+    async def _build(
+        self, source: str, make: Callable[[Path], Awaitable[Path]]
+    ) -> Dict[str, Any]:
+        with tempfile.TemporaryDirectory(prefix="openscope-wheel-") as out:
+            wheel = await make(Path(out))
+            return await asyncio.to_thread(self.put, wheel, source)
+
+
+async def run_build(
+    what: str, args: List[str], out: Path, cwd: Optional[Path] = None
+) -> Path:
+    """Run a wheel build command; returns the one wheel it left in ``out``."""
+    timeout = settings.artifact_build_timeout
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise ArtifactError(f"Building {what} timed out after {timeout:g}s")
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    wheels = list(out.glob("*.whl"))
+    if process.returncode != 0 or len(wheels) != 1:
+        tail = output.decode(errors="replace").strip().splitlines()[-5:]
+        raise ArtifactError(f"Building {what} failed: {' '.join(tail)}")
+    return wheels[0]
+
+
+async def build_wheel(spec: str, out: Path) -> Path:
+    """``pip wheel`` one package (no dependencies) into ``out``."""
+    return await run_build(spec, pip_wheel(spec, out), out)
+
+
+def pip_wheel(spec: str, out: Path) -> List[str]:
+    return [
+        sys.executable,
+        "-m",
+        "pip",
+        "wheel",
+        "--no-deps",
+        # Built here for Scope, whose Python may be newer than ours
+        "--ignore-requires-python",
+        "--disable-pip-version-check",
+        "--wheel-dir",
+        str(out),
+        spec,
+    ]
+
+
+def file_set_hash(files: Dict[str, str]) -> str:
+    """Content hash of a plugin file set, independent of order."""
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        for part in (name.encode(), files[name].encode()):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+    return digest.hexdigest()
+
+
+def stamp_version(pyproject: str, tag: str) -> str:
+    """Add a local version label, so each file set installs as a new version.
+
+    pip skips a wheel whose name and version are already installed, which
+    would leave the previous build of an edited plugin running.
+    """
+
+    def stamp(match: re.Match) -> str:
+        version = match["version"]
+        separator = "." if "+" in version else "+"
+        return (
+            f'{match["key"]}{match["quote"]}{version}{separator}{tag}{match["quote"]}'
+        )
+
+    # Only the [project] table, up to the next table header
+    table = re.search(
+        r"^\[project\][^\n]*\n(?P<body>(?:(?!\[).*\n?)*)", pyproject, re.M
+    )
+    if table is not None:
+        body = re.sub(
+            r"""^(?P<key>version\s*=\s*)(?P<quote>["'])(?P<version>[^"']+)(?P=quote)""",
+            stamp,
+            table["body"],
+            count=1,
+            flags=re.MULTILINE,
+        )
+        pyproject = (
+            pyproject[: table.start("body")] + body + pyproject[table.end("body") :]
+        )
+    version = tomllib.loads(pyproject).get("project", {}).get("version", "")
+    if not version.endswith(tag):
+        raise ArtifactError('Cannot stamp [project] version; use version = "..."')
+    return pyproject
+
+
+def write_file_set(files: Dict[str, str], root: Path):
+    """Write a plugin file set under ``root``, refusing paths outside it."""
+    for name, content in files.items():
+        relative = Path(name)
+        if relative.is_absolute() or ".." in relative.parts or not relative.parts:
+            raise ArtifactError(f"Invalid file path: {name}")
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def check_build_config(files: Dict[str, str]):
+    """Refuse file sets whose build would run their own code.
+
+    Raises ``ArtifactError`` naming the first problem found.
+    """
+    if "pyproject.toml" not in files:
+        raise ArtifactError("The plugin has no pyproject.toml")
+    for name in files:
+        if Path(name).name in ("setup.py", "hatch_build.py"):
+            raise ArtifactError(f"Build scripts are not allowed: {name}")
+    try:
+        pyproject = tomllib.loads(files["pyproject.toml"])
+    except tomllib.TOMLDecodeError as e:
+        raise ArtifactError(f"Invalid pyproject.toml: {e}")
+    build_system = pyproject.get("build-system", {})
+    if build_system.get("build-backend") != "hatchling.build":
+        raise ArtifactError('build-backend must be "hatchling.build"')
+    for requirement in build_system.get("requires", []):
+        if normalize(re.split(r"[\s<>=!~;\[]", requirement, 1)[0]) != "hatchling":
+            raise ArtifactError(f"Build requirement not allowed: {requirement}")
+    hatch = pyproject.get("tool", {}).get("hatch", {})
+
+    def hooks(table: Any) -> bool:
+        if not isinstance(table, dict):
+            return False
+        return "hooks" in table or any(hooks(value) for value in table.values())
+
+    if hooks(hatch):
+        raise ArtifactError("Hatch build and metadata hooks are not allowed")
+    # stamp_version rewrites a static version; a dynamic one would keep the
+    # same version across edits and pip would not reinstall it
+    project = pyproject.get("project", {})
+    if "version" in project.get("dynamic", []) or not isinstance(
+        project.get("version"), str
+    ):
+        raise ArtifactError('[project] needs a static version = "..."')
+
+
+async def build_file_set(files: Dict[str, str], tag: str, out: Path) -> Path:
+    """Build a wheel from a plugin file set with a ``pyproject.toml``.
+
+    Uses hatchling from this environment when installed (no network);
+    otherwise pip builds it with hatchling from the index.
+    """
+    check_build_config(files)
+    project, dist = out / "project", out / "dist"
+    files = {**files, "pyproject.toml": stamp_version(files["pyproject.toml"], tag)}
+    await asyncio.to_thread(write_file_set, files, project)
+    if importlib.util.find_spec("hatchling") is not None:
+        args = [sys.executable, "-m", "hatchling", "build", "-t", "wheel"]
+        args += ["-d", str(dist)]
+    else:
+        args = pip_wheel(str(project), dist)
+    return await run_build("the plugin", args, dist, cwd=project)
+
+
+def reachable() -> bool:
+    """Whether Scope can install a stored wheel from ``package_spec``.
+
+    A URL under ``artifact_base_url`` works from anywhere; a local path only
+    when Scope runs on this host.
+    """
+    if settings.artifact_base_url:
+        return True
+    host = urlparse(settings.scope_api_url).hostname
+    return host in ("localhost", "127.0.0.1", "::1")
+
+
+def package_spec(entry: Dict[str, Any]) -> str:
+    """What to pass Scope to install a stored wheel."""
+    if settings.artifact_base_url:
+        base = settings.artifact_base_url.rstrip("/")
+        return (
+            f"{base}/api/scope/artifacts/files/{entry['sha256']}/"
+            f"{entry['filename']}#sha256={entry['sha256']}"
+        )
+    return str(get_store().path(entry["sha256"]).resolve())
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_store() -> ArtifactStore:
+    """Return the process-wide store, seeded on first use."""
+    global _store
+    if _store is None:
+        _store = ArtifactStore(Path(settings.artifact_dir or DEFAULT_DIR))
+        if settings.artifact_seed_dir:
+            added = _store.seed(Path(settings.artifact_seed_dir))
+            if added:
+                logger.info("Imported %d seeded plugin wheels", added)
+    return _store
+
+
+def lookup_files(files: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """The stored wheel for a plugin file set, if it was built before."""
+    return get_store().lookup(f"files:{file_set_hash(files)}", by_project=False)
+
+
+async def resolve_files(files: Dict[str, str]) -> Tuple[Dict[str, Any], bool]:
+    """Wheel for a plugin file set, built on first use; returns (entry, cached).
+
+    Raises ``ArtifactError`` when it cannot be built.
+    """
+    store = get_store()
+    digest = file_set_hash(files)
+    source = f"files:{digest}"
+    entry = lookup_files(files)
+    if entry is not None:
+        ARTIFACT_LOOKUPS.inc(result="hit")
+        return entry, True
+    try:
+        entry = await store.build(
+            source, partial(build_file_set, files, f"h{digest[:12]}")
+        )
+    except ArtifactError:
+        ARTIFACT_LOOKUPS.inc(result="build_failed")
+        raise
+    ARTIFACT_LOOKUPS.inc(result="built")
+    await asyncio.to_thread(store.prune, "files:", settings.artifact_keep_builds)
+    return entry, False
+
+
+async def resolve(source: str) -> Optional[Dict[str, Any]]:
+    """Stored wheel for a source, building it if enabled; None to use the source."""
+    if not reachable():
+        return None
+    store = get_store()
+    entry = store.lookup(source)
+    if entry is not None:
+        ARTIFACT_LOOKUPS.inc(result="hit")
+        return entry
+    if not settings.artifact_build:
+        ARTIFACT_LOOKUPS.inc(result="miss")
+        return None
+    try:
+        entry = await store.build(source)
+    except ArtifactError as e:
+        ARTIFACT_LOOKUPS.inc(result="build_failed")
+        logger.warning("%s; installing from the source instead", e)
+        return None
+    ARTIFACT_LOOKUPS.inc(result="built")
+    return entry
@@ -0,0 +1,233 @@
+"""Cache and shared state for upstream responses.
+
+Two backends with the same interface:
+
+* ``MemoryCache`` - per-process dict, the default for a single worker
+* ``SQLiteCache`` - a WAL-mode SQLite file shared by every worker on the
+  host, with cross-process locks so a cold entry is filled only once
+
+``get_or_fill`` is the single-flight entry point: concurrent misses for a
+key wait on one lock while the holder calls upstream, then read its result.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .config import settings
+from .metrics import Counter
+
+CACHE_REQUESTS = Counter(
+    "openscope_cache_requests_total",
+    "Cache lookups by namespace and result.",
+    ("namespace", "result"),
+)
+
+MISSING = object()
+
+# A lock not renewed for this long (its worker died) may be taken over.
+# Holders renew it every LOCK_TIMEOUT / 3, so fills may run longer.
+LOCK_TIMEOUT = 30.0
+
+
+class MemoryCache:
+    """In-process cache with per-key asyncio locks."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.entries: Dict[str, Tuple[float, Any]] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.max_entries = max_entries
+
+    async def get(self, key: str) -> Any:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.time():
+            return MISSING
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: float):
+        if len(self.entries) >= self.max_entries:
+            now = time.time()
+            self.entries = {k: e for k, e in self.entries.items() if e[0] >= now}
+        self.entries[key] = (time.time() + ttl, value)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    @asynccontextmanager
+    async def lock(self, key: str):
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            yield
+
+
+class SQLiteCache:
+    """Cache shared between processes through a WAL-mode SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.connection: Optional[sqlite3.Connection] = None
+        self.db_lock = threading.Lock()
+        # Coroutines in this process queue here rather than polling SQLite
+        self.local = MemoryCache()
+        self.writes = 0
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value NOT NULL, expires REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS locks "
+                "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self.connection = connection
+        return self.connection
+
+    def execute(self, sql: str, params: tuple = ()) -> list:
+        with self.db_lock:
+            return self.connect().execute(sql, params).fetchall()
+
+    async def run(self, sql: str, params: tuple = ()) -> list:
+        return await asyncio.to_thread(self.execute, sql, params)
+
+    async def get(self, key: str) -> Any:
+        rows = await self.run(
+            "SELECT value FROM entries WHERE key = ? AND expires >= ?",
+            (key, time.time()),
+        )
+        if not rows:
+            return MISSING
+        value = rows[0][0]
+        # Raw response bodies are stored as BLOBs and returned as-is
+        return value if isinstance(value, bytes) else json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self.run(
+            "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+            (
+                key,
+                value if isinstance(value, bytes) else json.dumps(value),
+                time.time() + ttl,
+            ),
+        )
+        self.writes += 1
+        if self.writes % 100 == 0:
+            await self.run("DELETE FROM entries WHERE expires < ?", (time.time(),))
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            await self.run("DELETE FROM entries WHERE key = ?", (key,))
+
+    def try_acquire(self, key: str) -> bool:
+        now = time.time()
+        with self.db_lock:
+            connection = self.connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "DELETE FROM locks WHERE key = ? AND expires < ?", (key, now)
+                )
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO locks (key, owner, expires) VALUES (?, ?, ?)",
+                    (key, self.owner, now + LOCK_TIMEOUT),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    async def renew(self, key: str):
+        """Keep extending a held lock until cancelled."""
+        while True:
+            await asyncio.sleep(LOCK_TIMEOUT / 3)
+            await self.run(
+                "UPDATE locks SET expires = ? WHERE key = ? AND owner = ?",
+                (time.time() + LOCK_TIMEOUT, key, self.owner),
+            )
+
+    @asynccontextmanager
+    async def lock(self, key: str):
+        async with self.local.lock(key):
+            delay = 0.01
+            while not await asyncio.to_thread(self.try_acquire, key):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.2)
+            renewal = asyncio.create_task(self.renew(key))
+            try:
+                yield
+            finally:
+                renewal.cancel()
+                await self.run(
+                    "DELETE FROM locks WHERE key = ? AND owner = ?", (key, self.owner)
+                )
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the process-wide cache, created on first use."""
+    global _cache
+    if _cache is None:
+        if settings.cache_backend == "sqlite":
+            path = settings.cache_path or os.path.join(
+                tempfile.gettempdir(), "openscope-cache.sqlite3"
+            )
+            _cache = SQLiteCache(path)
+        else:
+            _cache = MemoryCache()
+    return _cache
+
+
+async def get_or_fill(key: str, ttl: float, fill: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached value for ``key`` or fill it exactly once.
+
+    Exceptions from ``fill`` propagate and nothing is cached. A ``ttl`` of 0
+    bypasses the cache.
+    """
+    namespace = key.split(":", 1)[0]
+    if ttl <= 0:
+        return await fill()
+
+    cache = get_cache()
+    value = await cache.get(key)
+    if value is not MISSING:
+        CACHE_REQUESTS.inc(namespace=namespace, result="hit")
+        return value
+
+    async with cache.lock(key):
+        # Another coroutine or worker may have filled it while we waited
+        value = await cache.get(key)
+        if value is not MISSING:
+            CACHE_REQUESTS.inc(namespace=namespace, result="coalesced")
+            return value
+        CACHE_REQUESTS.inc(namespace=namespace, result="miss")
+        value = await fill()
+        await cache.set(key, value, ttl)
+        return value
+
+
+def scope_key(name: str, scope_url: Optional[str] = None) -> str:
+    """Cache key for a Scope response, namespaced by server URL."""
+    return f"{name}:{(scope_url or settings.scope_api_url).rstrip('/')}"
+
+
+async def invalidate(*keys: str):
+    """Drop entries after a change upstream, such as a plugin install."""
+    await get_cache().delete(*keys)
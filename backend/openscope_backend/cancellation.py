@@ -0,0 +1,198 @@
+"""Cancel request handlers when their client disconnects.
+
+Once a request body has been read, ``CancellationMiddleware`` keeps
+listening on the connection. If the client goes away before the response
+has started, the handler task is cancelled: awaited upstream calls
+(``proxy_to_scope``, Groq, installs) are abandoned and their connections
+released instead of running to a timeout for nobody.
+
+Work that must not be interrupted halfway runs under ``non_cancellable()``;
+a disconnect during it cancels the handler only when it ends. Blocking work
+in threads cannot be cancelled from outside, so thread loops call
+``raise_if_disconnected()`` between steps.
+
+Each cancellation is counted per route, together with an estimate of the
+work saved: the route's mean duration less the time it had already run.
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from .metrics import LATENCY, Counter, route_template
+
+CANCELLED_REQUESTS = Counter(
+    "openscope_cancelled_requests_total",
+    "Requests cancelled because the client disconnected, by route.",
+    ("route",),
+)
+CANCELLED_WORK = Counter(
+    "openscope_cancelled_work_seconds_total",
+    "Estimated handler time saved by cancelling after a disconnect, by route.",
+    ("route",),
+)
+
+# Larger bodies (uploads) are streamed to the handler without watching
+MAX_WATCHED_BODY = 1024 * 1024
+
+
+class ClientDisconnected(Exception):
+    """Raised in worker threads whose request's client has gone away."""
+
+
+class RequestWatch:
+    """Disconnect state of one request, shared with its handler."""
+
+    def __init__(self, task: Optional[asyncio.Task] = None):
+        self.task = task
+        self.disconnected = asyncio.Event()
+        self.holds = 0
+        self.pending = False
+
+    @property
+    def cancellable(self) -> bool:
+        return self.holds == 0
+
+    def hold(self):
+        self.holds += 1
+
+    def release(self):
+        self.holds -= 1
+        if self.holds == 0 and self.pending and self.task is not None:
+            self.task.cancel()
+
+    def cancel(self):
+        if self.cancellable:
+            self.task.cancel()
+        else:
+            self.pending = True
+
+
+_current: ContextVar[Optional[RequestWatch]] = ContextVar("request_watch", default=None)
+
+
+def current_watch() -> Optional[RequestWatch]:
+    return _current.get()
+
+
+class non_cancellable:
+    """Defer disconnect cancellation until the block ends.
+
+    Usable with ``with`` and ``async with``, e.g. alongside ``scheduled``.
+    """
+
+    def __init__(self, watch: Optional[RequestWatch] = None):
+        self.watch = watch or _current.get()
+
+    def __enter__(self):
+        if self.watch is not None:
+            self.watch.hold()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.watch is not None:
+            self.watch.release()
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def raise_if_disconnected():
+    """Stop thread-pool work for a request whose client has gone."""
+    watch = _current.get()
+    if watch is not None and watch.disconnected.is_set() and watch.cancellable:
+        raise ClientDisconnected()
+
+
+class CancellationMiddleware:
+    """ASGI middleware cancelling handlers whose client disconnected."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope.get("headers", [])) if scope["type"] == "http" else {}
+        length = headers.get(b"content-length", b"0")
+        if (
+            scope["type"] != "http"
+            or not length.isdigit()
+            or int(length) > MAX_WATCHED_BODY
+            or b"chunked" in headers.get(b"transfer-encoding", b"")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        watch = RequestWatch()
+        body_sent = False
+        response_started = False
+
+        async def receive_after_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await watch.disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send_tracked(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def listen():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    watch.disconnected.set()
+                    # Streaming responses notice on their own and end normally
+                    if not response_started:
+                        watch.cancel()
+                    return
+
+        token = _current.set(watch)
+        try:
+            watch.task = asyncio.create_task(
+                self.app(scope, receive_after_body, send_tracked)
+            )
+        finally:
+            _current.reset(token)
+        listener = asyncio.create_task(listen())
+        started = time.perf_counter()
+        try:
+            await watch.task
+        except asyncio.CancelledError:
+            if not watch.disconnected.is_set():
+                raise  # the server is shutting down, not a client disconnect
+            # A deferred cancel landing after the response started saved nothing
+            if not response_started:
+                self.record(scope, time.perf_counter() - started)
+                # Nobody reads this; it lets request metrics show 499
+                await send({"type": "http.response.start", "status": 499})
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            listener.cancel()
+            if not watch.task.done():
+                watch.task.cancel()
+
+    def record(self, scope, elapsed: float):
+        route = route_template(scope)
+        CANCELLED_REQUESTS.inc(route=route)
+        mean = LATENCY.mean(method=scope["method"], route=route)
+        if mean is not None:
+            CANCELLED_WORK.inc(max(0.0, mean - elapsed), route=route)
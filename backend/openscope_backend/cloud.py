@@ -0,0 +1,251 @@
+"""Cloud GPU connection manager.
+
+Keeps Scope's cloud connection in a desired state instead of connecting
+only on demand:
+
+* status is polled every ``cloud_status_interval`` seconds and cached, and
+  changes are pushed to subscribers (the ``/cloud/events`` stream); a
+  status published by the routing prober in the meantime stands in for the
+  poll
+* with ``cloud_warm_standby`` and credentials from ``Settings``, the
+  connection is opened at startup and reopened after activity, so the first
+  remote-inference stream finds it already connected
+* a connection that drops while wanted is reopened with exponential backoff
+  and full jitter
+* after ``cloud_idle_timeout`` seconds without cloud-routed streams or
+  pipeline loads the connection is closed to bound cost
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import settings
+from .metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CLOUD_CONNECTED = Gauge(
+    "openscope_cloud_connected",
+    "1 while Scope reports a live cloud connection.",
+)
+CLOUD_CONNECTS = Counter(
+    "openscope_cloud_connect_attempts_total",
+    "Cloud connect attempts by trigger and outcome.",
+    ("trigger", "outcome"),
+)
+CLOUD_TEARDOWNS = Counter(
+    "openscope_cloud_idle_teardowns_total",
+    "Cloud connections closed after the idle timeout.",
+)
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+Request = Callable[..., Awaitable[Any]]
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for reconnect ``attempt`` (0-based)."""
+    return random.uniform(0.0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def default_credentials() -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    if settings.scope_cloud_app_id:
+        data["app_id"] = settings.scope_cloud_app_id
+    if settings.scope_cloud_api_key:
+        data["api_key"] = settings.scope_cloud_api_key
+    if settings.scope_cloud_user_id:
+        data["user_id"] = settings.scope_cloud_user_id
+    return data
+
+
+class CloudManager:
+    """Desired-state loop around Scope's cloud connect/disconnect/status."""
+
+    def __init__(self, request: Request, busy: Callable[[], bool]):
+        # ``request(endpoint, method="GET", data=None)``, i.e. proxy_to_scope;
+        # ``busy()`` is true while cloud streams are running, which counts as
+        # activity
+        self.request = request
+        self.busy = busy
+        self.status: Optional[Dict[str, Any]] = None
+        self.status_time = 0.0
+        self.was_connected = False
+        self.wanted = False
+        self.credentials: Dict[str, Any] = {}
+        self.last_activity = time.monotonic()
+        self.attempt = 0
+        self.retry_at = 0.0
+        self.connecting: Optional[asyncio.Task] = None
+        self.wake = asyncio.Event()
+        self.subscribers: List[asyncio.Queue] = []
+        self.task: Optional[asyncio.Task] = None
+
+    # Status
+
+    def fresh_status(self) -> Optional[Dict[str, Any]]:
+        """Cached status if the loop refreshed it recently."""
+        if (
+            self.status is not None
+            and time.monotonic() - self.status_time < 2 * settings.cloud_status_interval
+        ):
+            return self.status
+        return None
+
+    def publish(self, status: Dict[str, Any]):
+        changed = status != self.status
+        self.status = status
+        self.status_time = time.monotonic()
+        CLOUD_CONNECTED.set(1 if status.get("connected") else 0)
+        self.was_connected = self.was_connected or bool(status.get("connected"))
+        if changed:
+            for queue in self.subscribers:
+                queue.put_nowait(status)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        if self.status is not None:
+            queue.put_nowait(self.status)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    async def refresh(self) -> Dict[str, Any]:
+        status = await self.request("/api/v1/cloud/status")
+        self.publish(status)
+        return status
+
+    # Connection
+
+    def touch(self):
+        """Record remote-inference activity; re-warms a torn-down standby."""
+        self.last_activity = time.monotonic()
+        if settings.cloud_warm_standby and default_credentials() and not self.wanted:
+            self.wanted = True
+            self.credentials = default_credentials()
+            self.wake.set()
+
+    async def connect(
+        self, data: Dict[str, Any], trigger: str = "request"
+    ) -> Dict[str, Any]:
+        """Connect now, joining an attempt already in flight."""
+        self.wanted = True
+        self.credentials = data
+        self.last_activity = time.monotonic()
+        connected = self.fresh_status()
+        if connected and connected.get("connected"):
+            return connected
+        if self.connecting is None or self.connecting.done():
+            self.connecting = asyncio.create_task(self._connect(trigger))
+        return await asyncio.shield(self.connecting)
+
+    async def _connect(self, trigger: str) -> Dict[str, Any]:
+        try:
+            result = await self.request(
+                "/api/v1/cloud/connect", method="POST", data=self.credentials
+            )
+        except Exception as e:
+            CLOUD_CONNECTS.inc(trigger=trigger, outcome="error")
+            if getattr(e, "status_code", None) == 400:
+                # Missing or rejected credentials; retrying will not help
+                self.wanted = False
+            self.retry_at = time.monotonic() + backoff_delay(self.attempt)
+            self.attempt += 1
+            raise
+        CLOUD_CONNECTS.inc(trigger=trigger, outcome="ok")
+        self.attempt = 0
+        if isinstance(result, dict):
+            self.publish({**(self.status or {}), **result})
+        return result
+
+    async def disconnect(self) -> Any:
+        self.wanted = False
+        result = await self.request("/api/v1/cloud/disconnect", method="POST")
+        if isinstance(result, dict):
+            self.publish({**(self.status or {}), **result})
+        return result
+
+    # Background loop
+
+    async def tick(self):
+        """One pass: refresh status, reconnect or tear down as needed."""
+        try:
+            status = self.status
+            if time.monotonic() - self.status_time >= settings.cloud_status_interval:
+                status = await self.refresh()
+        except Exception as e:
+            logger.debug("Cloud status unavailable: %s", e)
+            return
+        now = time.monotonic()
+        if self.busy():
+            self.last_activity = now
+        connected = status.get("connected") or status.get("connecting")
+
+        if (
+            self.wanted
+            and connected
+            and settings.cloud_idle_timeout > 0
+            and now - self.last_activity > settings.cloud_idle_timeout
+        ):
+            logger.info("Closing idle cloud connection")
+            CLOUD_TEARDOWNS.inc()
+            try:
+                await self.disconnect()
+            except Exception as e:
+                logger.warning("Cloud idle teardown failed: %s", e)
+        elif self.wanted and not connected and now >= self.retry_at:
+            trigger = "reconnect" if self.attempt or self.was_connected else "warm"
+            try:
+                await self.connect(self.credentials, trigger=trigger)
+            except Exception as e:
+                logger.warning("Cloud connect failed (attempt %d): %s", self.attempt, e)
+
+    async def run(self):
+        if settings.cloud_warm_standby and default_credentials():
+            self.wanted = True
+            self.credentials = default_credentials()
+        while True:
+            await self.tick()
+            delay = settings.cloud_status_interval
+            if self.wanted and self.retry_at > time.monotonic():
+                delay = min(delay, self.retry_at - time.monotonic())
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), max(0.05, delay))
+            except asyncio.TimeoutError:
+                pass
+
+
+_manager: Optional[CloudManager] = None
+_monitor: Optional[asyncio.Task] = None
+
+
+def get_manager(request: Request, busy: Callable[[], bool]) -> CloudManager:
+    """Return the process-wide cloud manager, created on first use."""
+    global _manager
+    if _manager is None:
+        _manager = CloudManager(request, busy)
+    return _manager
+
+
+def start_monitor(manager: CloudManager):
+    """Poll cloud status and hold the desired connection in the background."""
+    global _monitor
+    if settings.scope_api_url:
+        _monitor = asyncio.create_task(manager.run())
+
+
+async def stop_monitor():
+    if _monitor is not None:
+        _monitor.cancel()
+        try:
+            await _monitor
+        except asyncio.CancelledError:
+            pass
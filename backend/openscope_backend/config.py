@@ -1,7 +1,7 @@
 """OpenScope configuration."""
 
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -9,6 +9,11 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     """Application settings."""
 
+    # Optional feature routers; disabled ones are never imported
+    github_enabled: bool = True
+    ai_enabled: bool = True
+    preview_enabled: bool = True
+
     # Groq AI
     groq_api_key: Optional[str] = None
 
@@ -23,6 +28,131 @@ class Settings(BaseSettings):
     scope_cloud_app_id: Optional[str] = None
     scope_cloud_api_key: Optional[str] = None
     scope_cloud_user_id: Optional[str] = None
+    # Keep the cloud connection open ahead of the first remote stream (needs
+    # the credentials above), reconnecting with backoff; close it after
+    # cloud_idle_timeout seconds without streams or loads (0 keeps it open)
+    cloud_warm_standby: bool = True
+    cloud_idle_timeout: float = 900.0
+    cloud_status_interval: float = 5.0
+
+    # Local vs cloud inference per new session: "auto" picks the path with the
+    # lowest expected time to first frame + routing_frame_weight x frame
+    # latency, keeping a plugin's remoteInference choice unless the other path
+    # is better by more than routing_preference_margin_ms; "manual" follows
+    # remoteInference as before
+    inference_routing: str = "auto"
+    routing_probe_interval: float = 5.0
+    routing_frame_weight: float = 10.0
+    routing_preference_margin_ms: float = 250.0
+
+    # Upstream response cache: "memory" (per process) or "sqlite" (shared by
+    # all workers on the host). TTLs in seconds; 0 disables caching.
+    cache_backend: str = "memory"
+    cache_path: Optional[str] = None  # defaults to a file in the temp dir
+    schema_cache_ttl: float = 30.0
+    plugins_cache_ttl: float = 10.0
+    status_cache_ttl: float = 0.5
+
+    # Pipeline-schema change feed: versions kept for diffs, and how often open
+    # change streams re-check the (cached) schemas document
+    schema_feed_history: int = 100
+    schema_feed_poll_interval: float = 5.0
+
+    # Streaming-session admission per Scope backend; 0 capacity is unlimited.
+    # Queued requests wait up to session_queue_wait, then get a 503 with
+    # their position and keep it while they retry within session_claim_timeout.
+    session_capacity: int = 0
+    session_idle_timeout: float = 60.0
+    session_claim_timeout: float = 30.0
+    session_queue_wait: float = 20.0
+
+    # Batched trickle ICE: wait this long for stragglers, then forward the
+    # batch one call per candidate, the shape Scope accepts. Upstream batching
+    # ({"candidates": [...]}) is opt-in for a Scope known to take it.
+    ice_batch_window_ms: float = 25.0
+    ice_upstream_batch: bool = False
+
+    # ICE server list cache; entries live until the soonest TURN credential
+    # expiry, at most ice_servers_ttl seconds, and are refreshed ahead of it
+    ice_servers_ttl: float = 300.0
+    ice_servers_prewarm: bool = True
+
+    # Fair scheduling of pipeline loads, plugin installs and restarts:
+    # per-user token buckets, then weighted fair queuing across users
+    scheduler_concurrency: int = 1
+    scheduler_rate_per_minute: float = 12.0
+    scheduler_burst: float = 8.0
+    scheduler_max_queued_per_user: int = 3
+    scheduler_user_weights: Dict[str, float] = {}  # JSON, e.g. {"alice": 2}
+    # Schedule by X-User-Id only when a proxy in front authenticates users and
+    # sets it; otherwise clients could mint ids to dodge their rate limit
+    scheduler_trust_user_header: bool = False
+
+    # Proxies in front of the backend that append to X-Forwarded-For (1 on
+    # Render). The entry that many from the right is the client address;
+    # anything left of it was sent by the client and is ignored.
+    forwarded_hops: int = 0
+
+    # Workflow store; a full snapshot is kept every N versions, deltas between
+    workflow_db_path: Optional[str] = None  # defaults to backend/data/
+    workflow_snapshot_interval: int = 20
+
+    # Plugin wheel cache (default backend/data/artifacts): wheels in
+    # artifact_seed_dir are imported on first use, misses are built once with
+    # pip when artifact_build is on. Scope is given a URL under
+    # artifact_base_url (this backend as Scope reaches it), else the local
+    # wheel path; a remote Scope without a base URL installs from the source.
+    # Wheels built from editor plugins are kept for the newest
+    # artifact_keep_builds.
+    artifact_dir: Optional[str] = None
+    artifact_seed_dir: Optional[str] = None
+    artifact_build: bool = True
+    artifact_build_timeout: float = 600.0
+    artifact_base_url: Optional[str] = None
+    artifact_keep_builds: int = 50
+
+    # POST /api/batch: items per batch, and the longest any item may run
+    batch_max_items: int = 20
+    batch_item_timeout: float = 10.0
+
+    # Idempotency-Key on expensive POSTs: matching routes, how long finished
+    # responses are replayed, and bounds on what is kept
+    idempotent_paths: List[str] = [
+        "/api/scope/pipeline/load",
+        "/api/scope/plugins",
+        "/api/scope/plugins/install/*",
+        "/api/scope/plugins/build",
+        "/api/github/push",
+        "/api/ai/generate-processor",
+    ]
+    idempotency_ttl: float = 600.0
+    idempotency_max_entries: int = 1000
+    idempotency_max_bytes: int = 32 * 1024 * 1024
+
+    # Response compression (gzip, or brotli with the speedups extra)
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024
+
+    # CPU preview runtime
+    preview_fps: float = 24.0
+    preview_width: int = 480
+    preview_batch_size: int = 4
+    preview_workers: Optional[int] = None  # defaults to the CPU count
+    preview_jpeg_quality: int = 80
+    # Open streams share the worker pool; more than this get a 429
+    preview_max_streams: int = 4
+
+    # Sandboxed benchmarks of generated processors (opt-in). The code runs
+    # with rlimits, an empty environment and no network where user namespaces
+    # allow, but it can still read this host's files, .env included.
+    processor_benchmark_enabled: bool = False
+    processor_benchmark_timeout: float = 60.0
+    processor_benchmark_memory_mb: int = 4096
+
+    # Admin diagnostics; endpoints are disabled unless a token is set
+    admin_token: Optional[str] = None
+    profiler_max_seconds: float = 60.0
+    loop_lag_threshold_ms: float = 100.0  # 0 disables the lag monitor
 
     # App
     app_name: str = "OpenScope"
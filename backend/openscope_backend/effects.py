@@ -0,0 +1,236 @@
+"""NumPy reference implementations of the built-in effects.
+
+Every kernel takes a float32 THWC batch in [0, 1] and returns one, matching
+the tensor rules in ``processor-architecture.md`` and the semantics of the
+code emitted by ``src/lib/codeGenerator.ts``.
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BLEND_MODES = ("add", "multiply", "screen", "overlay")
+
+
+def brightness(frames: np.ndarray, value: float = 0.0) -> np.ndarray:
+    """Scale brightness by ``1 + value / 100``."""
+    if value == 0:
+        return frames
+    out = np.multiply(frames, 1.0 + value / 100.0, dtype=np.float32)
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def contrast(frames: np.ndarray, value: float = 1.0) -> np.ndarray:
+    """Stretch values around the batch mean."""
+    if value == 1:
+        return frames
+    mean = np.float32(frames.mean())
+    out = np.subtract(frames, mean, dtype=np.float32)
+    out *= value
+    out += mean
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def _box_filter(frames: np.ndarray, radius: int, axis: int) -> np.ndarray:
+    """Box filter along one axis with edge padding, O(N) in the radius."""
+    pad = [(0, 0)] * frames.ndim
+    pad[axis] = (radius + 1, radius)
+    padded = np.pad(frames, pad, mode="edge")
+    summed = np.cumsum(padded, axis=axis, dtype=np.float32)
+    size = frames.shape[axis]
+    upper = np.take(summed, np.arange(2 * radius + 1, 2 * radius + 1 + size), axis=axis)
+    lower = np.take(summed, np.arange(0, size), axis=axis)
+    upper -= lower
+    upper *= np.float32(1.0 / (2 * radius + 1))
+    return upper
+
+
+def blur(frames: np.ndarray, radius: int = 5) -> np.ndarray:
+    """Separable box blur with a ``2 * radius + 1`` kernel."""
+    radius = int(radius)
+    if radius <= 0:
+        return frames
+    return _box_filter(_box_filter(frames, radius, axis=1), radius, axis=2)
+
+
+def mirror(frames: np.ndarray, mode: str = "horizontal") -> np.ndarray:
+    """Flip frames horizontally, vertically or both."""
+    if mode in ("horizontal", "both"):
+        frames = frames[:, :, ::-1]
+    if mode in ("vertical", "both"):
+        frames = frames[:, ::-1]
+    return frames
+
+
+@lru_cache(maxsize=32)
+def _kaleido_sampler(
+    height: int,
+    width: int,
+    slices: int,
+    rotation: float,
+    zoom: float,
+    warp: float,
+    mirror_mode: str,
+) -> Tuple[np.ndarray, ...]:
+    """Precompute bilinear sample indices and weights for a kaleido grid.
+
+    The grid only depends on frame size and parameters, so it is cached
+    instead of being rebuilt per batch.
+    """
+    gy, gx = np.meshgrid(
+        np.linspace(-1.0, 1.0, height, dtype=np.float32),
+        np.linspace(-1.0, 1.0, width, dtype=np.float32),
+        indexing="ij",
+    )
+
+    if warp != 0:
+        r = np.sqrt(gx * gx + gy * gy + 1e-8)
+        theta = np.arctan2(gy, gx)
+        r = r + warp * r * r
+        gx, gy = r * np.cos(theta), r * np.sin(theta)
+
+    if zoom != 1.0:
+        gx, gy = gx / zoom, gy / zoom
+
+    if mirror_mode == "2x":
+        gx = np.abs(gx)
+    elif mirror_mode == "4x":
+        gx, gy = np.abs(gx), np.abs(gy)
+
+    if slices >= 2:
+        r = np.sqrt(gx * gx + gy * gy + 1e-8)
+        theta = np.arctan2(gy, gx) + math.radians(rotation)
+        wedge = 2 * math.pi / slices
+        phi = np.remainder(theta, wedge)
+        phi = np.minimum(phi, wedge - phi)
+        gx, gy = r * np.cos(phi), r * np.sin(phi)
+
+    # align_corners=True, padding_mode="border"
+    x = (np.clip(gx, -1, 1) + 1) * 0.5 * (width - 1)
+    y = (np.clip(gy, -1, 1) + 1) * 0.5 * (height - 1)
+    x0 = np.floor(x).astype(np.intp)
+    y0 = np.floor(y).astype(np.intp)
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    wx = (x - x0).astype(np.float32)[..., None]
+    wy = (y - y0).astype(np.float32)[..., None]
+    return y0, y1, x0, x1, wx, wy
+
+
+def kaleidoscope(
+    frames: np.ndarray,
+    enabled: bool = True,
+    mix: float = 1.0,
+    mirror_mode: str = "none",
+    rotational_enabled: bool = True,
+    rotational_slices: int = 6,
+    rotation_deg: float = 0.0,
+    zoom: float = 1.0,
+    warp: float = 0.0,
+) -> np.ndarray:
+    """Kaleidoscope with optional mirroring, warp and wet/dry mix."""
+    if not enabled:
+        return frames
+    _, height, width, _ = frames.shape
+    slices = int(rotational_slices) if rotational_enabled else 0
+    y0, y1, x0, x1, wx, wy = _kaleido_sampler(
+        height,
+        width,
+        slices,
+        float(rotation_deg),
+        float(zoom),
+        float(warp),
+        mirror_mode,
+    )
+    top = frames[:, y0, x0] * (1 - wx) + frames[:, y0, x1] * wx
+    bottom = frames[:, y1, x0] * (1 - wx) + frames[:, y1, x1] * wx
+    result = top * (1 - wy) + bottom * wy
+    if mix < 1.0:
+        result = frames * (1 - mix) + result * mix
+    return np.clip(result, 0.0, 1.0, out=result)
+
+
+def kaleido(
+    frames: np.ndarray, slices: int = 6, rotation: float = 0.0, zoom: float = 1.0
+) -> np.ndarray:
+    """Simple kaleido node: N slices, rotation and zoom."""
+    return kaleidoscope(
+        frames, rotational_slices=slices, rotation_deg=rotation, zoom=zoom
+    )
+
+
+def blend(
+    base: np.ndarray,
+    layer: np.ndarray,
+    mode: str = "add",
+    opacity: float = 0.5,
+) -> np.ndarray:
+    """Blend ``layer`` onto ``base`` and mix by ``opacity``."""
+    if mode == "multiply":
+        mixed = base * layer
+    elif mode == "screen":
+        mixed = 1 - (1 - base) * (1 - layer)
+    elif mode == "overlay":
+        mixed = np.where(base < 0.5, 2 * base * layer, 1 - 2 * (1 - base) * (1 - layer))
+    else:
+        mixed = base + layer
+    out = mixed * opacity + base * (1 - opacity)
+    return np.clip(out, 0.0, 1.0, out=out).astype(np.float32, copy=False)
+
+
+def _kaleidoscope_from_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "enabled": config.get("enabled", True),
+        "mix": config.get("mix", 1.0),
+        "mirror_mode": config.get("mirrorMode", "none"),
+        "rotational_enabled": config.get("rotationalEnabled", True),
+        "rotational_slices": config.get("rotationalSlices", 6),
+        "rotation_deg": config.get("rotationDeg", 0.0),
+        "zoom": config.get("zoom", 1.0),
+        "warp": config.get("warp", 0.0),
+    }
+
+
+# Single-input kernels keyed by node type, fed from the node's config
+KERNELS: Dict[str, Callable[[np.ndarray, Dict[str, Any]], np.ndarray]] = {
+    "brightness": lambda f, c: brightness(f, c.get("value", 0)),
+    "contrast": lambda f, c: contrast(f, c.get("value", 1)),
+    "blur": lambda f, c: blur(f, c.get("radius", 5)),
+    "mirror": lambda f, c: mirror(f, c.get("mode", "horizontal")),
+    "kaleido": lambda f, c: kaleido(
+        f, c.get("slices", 6), c.get("rotation", 0), c.get("zoom", 1)
+    ),
+    "kaleidoscope": lambda f, c: kaleidoscope(f, **_kaleidoscope_from_config(c)),
+}
+
+# Pipelines that have a CPU stand-in, keyed by pipeline id
+PIPELINE_KERNELS = {
+    "kaleido-scope": "kaleidoscope",
+}
+
+
+def kernel_for(kind: str, config: Dict[str, Any]) -> Optional[str]:
+    """Return the kernel name used to preview a node, or None to pass through."""
+    if kind in KERNELS or kind == "blend":
+        return kind
+    if kind == "style_kaleidoscope":
+        return "kaleidoscope"
+    if kind.startswith("pipeline_"):
+        return PIPELINE_KERNELS.get(kind[len("pipeline_") :])
+    if kind == "pipeline":
+        return PIPELINE_KERNELS.get(config.get("pipelineId", ""))
+    return None
+
+
+def apply_kernel(
+    name: str, inputs: List[np.ndarray], config: Dict[str, Any]
+) -> np.ndarray:
+    """Apply a named kernel to its inputs."""
+    if name == "blend":
+        layer = inputs[1] if len(inputs) > 1 else inputs[0]
+        return blend(
+            inputs[0], layer, config.get("mode", "add"), config.get("opacity", 0.5)
+        )
+    return KERNELS[name](inputs[0], config)
@@ -0,0 +1,583 @@
+"""Node graph model and structural validation.
+
+Graphs arrive in two shapes: the template format used by
+``routers/templates.py`` (``type``/``config`` nodes and index-based edges) and
+the React Flow format sent by the editor (``id``/``data`` nodes and id-based
+edges). Both are normalized here so every check runs in O(V + E).
+"""
+
+import copy
+import math
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# What each node type produces on its output handle
+SOURCE_TYPES = {
+    "videoInput": "video",
+    "textPrompt": "text",
+    "imageInput": "image",
+    "parameters": "params",
+}
+
+OUTPUT_TYPES = {"pipelineOutput", "preprocessorOutput", "postprocessorOutput"}
+
+EFFECT_TYPES = {
+    "brightness",
+    "contrast",
+    "blur",
+    "mirror",
+    "kaleido",
+    "kaleidoscope",
+    "blend",
+    "vignette",
+    "mask",
+}
+
+# Nodes that configure the plugin but do not carry frames
+CONFIG_TYPES = {"pluginConfig"}
+
+# Purely visual nodes on the canvas
+ANNOTATION_TYPES = {"noteGuide"}
+
+# Accepted input kinds per node category
+EFFECT_INPUTS = {"video", "params"}
+PIPELINE_INPUTS = {"video", "text", "image", "params", "style"}
+OUTPUT_INPUTS = {"video"}
+
+# Inclusive numeric ranges for built-in effect parameters
+PARAM_RANGES: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "brightness": {"value": (-100, 100)},
+    "contrast": {"value": (0, 3)},
+    "blur": {"radius": (0, 50)},
+    "kaleido": {"slices": (2, 24), "rotation": (0, 360), "zoom": (0.1, 3)},
+    "blend": {"opacity": (0, 1)},
+    "mask": {"confidence": (0, 1)},
+}
+
+INTEGER_PARAMS = {("blur", "radius"), ("kaleido", "slices")}
+
+PARAM_CHOICES: Dict[str, Dict[str, List[str]]] = {
+    "mirror": {"mode": ["horizontal", "vertical", "both"]},
+    "blend": {"mode": ["add", "multiply", "screen", "overlay"]},
+}
+
+PARAM_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "brightness": {"value": 0},
+    "contrast": {"value": 1},
+    "blur": {"radius": 5},
+    "mirror": {"mode": "horizontal"},
+    "kaleido": {"slices": 6, "rotation": 0, "zoom": 1},
+    "blend": {"mode": "add", "opacity": 0.5},
+    "mask": {"confidence": 0.5},
+}
+
+# Number of video inputs a node can consume, when limited
+VIDEO_INPUT_LIMITS = {"blend": 2}
+
+
+class Diagnostic(BaseModel):
+    """A single validation finding."""
+
+    code: str
+    severity: str  # "error" or "warning"
+    message: str
+    node_id: Optional[str] = None
+    edge_index: Optional[int] = None
+    param: Optional[str] = None
+    fixable: bool = False
+
+
+class Fix(BaseModel):
+    """A deterministic change applied to the graph."""
+
+    action: str  # "remove_edge", "add_node", "add_edge" or "set_param"
+    node_id: Optional[str] = None
+    edge_index: Optional[int] = None
+    param: Optional[str] = None
+    value: Any = None
+    reason: str
+
+
+class GraphReport(BaseModel):
+    """Result of validating a node graph."""
+
+    valid: bool
+    diagnostics: List[Diagnostic]
+    fixes: List[Fix]
+    fixed_graph: Dict[str, Any]
+    order: List[str]
+    escalate: bool
+
+
+def raw_node_type(node: Dict[str, Any]) -> Any:
+    data = node.get("data") or {}
+    return data.get("type") or node.get("type") or ""
+
+
+def node_type(node: Dict[str, Any]) -> str:
+    """Return the OpenScope node type of a template or React Flow node.
+
+    A type that is not a string counts as unknown ("").
+    """
+    kind = raw_node_type(node)
+    return kind if isinstance(kind, str) else ""
+
+
+def node_config(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the config dict of a template or React Flow node."""
+    data = node.get("data") or {}
+    config = data.get("config") if "config" in data else node.get("config")
+    return config if isinstance(config, dict) else {}
+
+
+def node_ids(nodes: List[Dict[str, Any]]) -> List[str]:
+    """Return a stable id per node, falling back to its index."""
+    return [str(node.get("id", index)) for index, node in enumerate(nodes)]
+
+
+def edge_endpoints(
+    edge: Dict[str, Any], ids: List[str], id_set: set
+) -> Tuple[Optional[str], Optional[str]]:
+    """Resolve an edge's endpoints to node ids, or None when dangling."""
+
+    def resolve(ref: Any) -> Optional[str]:
+        if isinstance(ref, int) and not isinstance(ref, bool):
+            return ids[ref] if 0 <= ref < len(ids) else None
+        if ref is None:
+            return None
+        ref = str(ref)
+        return ref if ref in id_set else None
+
+    return resolve(edge.get("source")), resolve(edge.get("target"))
+
+
+def produces(kind: str) -> Optional[str]:
+    """Return what a node type emits, or None if it emits nothing."""
+    if kind in SOURCE_TYPES:
+        return SOURCE_TYPES[kind]
+    if kind in CONFIG_TYPES:
+        return "config"
+    if kind.startswith("style_"):
+        return "style"
+    if kind in OUTPUT_TYPES or kind in ANNOTATION_TYPES or kind.startswith("lesson"):
+        return None
+    return "video"
+
+
+def accepts(kind: str) -> Optional[set]:
+    """Return the input kinds a node type accepts, or None if unconstrained."""
+    if kind in SOURCE_TYPES:
+        # Plugin config is wired into the video input in every template
+        return {"config"} if kind == "videoInput" else set()
+    if kind in OUTPUT_TYPES:
+        return OUTPUT_INPUTS
+    if kind in EFFECT_TYPES:
+        return EFFECT_INPUTS
+    if kind == "pipeline" or kind.startswith("pipeline_") or kind == "custom":
+        return PIPELINE_INPUTS
+    if kind in CONFIG_TYPES or kind.startswith("style_"):
+        return set()
+    if kind in ANNOTATION_TYPES or kind.startswith("lesson"):
+        return set()
+    return None
+
+
+def video_input_limit(kind: str) -> Optional[int]:
+    """Return how many video inputs a node type can consume, if limited."""
+    if kind in VIDEO_INPUT_LIMITS:
+        return VIDEO_INPUT_LIMITS[kind]
+    if kind in EFFECT_TYPES or kind in OUTPUT_TYPES:
+        return 1
+    return None
+
+
+def topological_order(
+    ids: List[str], adjacency: Dict[str, List[str]]
+) -> Tuple[List[str], List[str]]:
+    """Kahn's algorithm. Returns (order, nodes left on cycles)."""
+    indegree = {node_id: 0 for node_id in ids}
+    for targets in adjacency.values():
+        for target in targets:
+            indegree[target] += 1
+
+    queue = deque(node_id for node_id in ids if indegree[node_id] == 0)
+    order = []
+    while queue:
+        current = queue.popleft()
+        order.append(current)
+        for target in adjacency[current]:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+
+    placed = set(order)
+    return order, [node_id for node_id in ids if node_id not in placed]
+
+
+def back_edges(
+    ids: List[str], adjacency: Dict[str, List[Tuple[str, int]]]
+) -> List[int]:
+    """Return edge indices that close a cycle in an iterative DFS."""
+    state = {node_id: 0 for node_id in ids}  # 0 new, 1 on stack, 2 done
+    found = []
+    for root in ids:
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(adjacency[root]))]
+        while stack:
+            current, children = stack[-1]
+            advanced = False
+            for target, edge_index in children:
+                if state[target] == 1:
+                    found.append(edge_index)
+                elif state[target] == 0:
+                    state[target] = 1
+                    stack.append((target, iter(adjacency[target])))
+                    advanced = True
+                    break
+            if not advanced:
+                state[current] = 2
+                stack.pop()
+    return found
+
+
+def reachable(starts: List[str], adjacency: Dict[str, List[str]]) -> set:
+    """Breadth-first reachability from a set of start nodes."""
+    seen = set(starts)
+    queue = deque(starts)
+    while queue:
+        current = queue.popleft()
+        for target in adjacency[current]:
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    return seen
+
+
+def check_params(kind: str, node_id: str, config: Dict[str, Any]):
+    """Yield (diagnostic, fixed value) pairs for out-of-range parameters."""
+    for param, (low, high) in PARAM_RANGES.get(kind, {}).items():
+        if param not in config:
+            continue
+        value = config[param]
+        default = PARAM_DEFAULTS[kind][param]
+        if (
+            isinstance(value, bool)
+            or not isinstance(value, (int, float))
+            or not math.isfinite(value)
+        ):
+            yield Diagnostic(
+                code="invalid_param",
+                severity="error",
+                message=f"{kind}.{param} must be a number, got {value!r}",
+                node_id=node_id,
+                param=param,
+                fixable=True,
+            ), default
+            continue
+        fixed = min(max(value, low), high)
+        if (kind, param) in INTEGER_PARAMS:
+            fixed = int(round(fixed))
+        if fixed != value:
+            yield Diagnostic(
+                code="param_out_of_range",
+                severity="error",
+                message=f"{kind}.{param}={value} is outside {low}-{high}",
+                node_id=node_id,
+                param=param,
+                fixable=True,
+            ), fixed
+
+    for param, choices in PARAM_CHOICES.get(kind, {}).items():
+        if param in config and config[param] not in choices:
+            yield Diagnostic(
+                code="invalid_choice",
+                severity="error",
+                message=f"{kind}.{param}={config[param]!r} must be one of {choices}",
+                node_id=node_id,
+                param=param,
+                fixable=True,
+            ), PARAM_DEFAULTS[kind][param]
+
+
+def validate_graph(graph: Dict[str, Any]) -> GraphReport:
+    """Validate a node graph and compute deterministic auto-fixes.
+
+    Runs in O(V + E): one pass over nodes and edges, a topological sort,
+    a DFS for cycle-closing edges and forward/backward reachability.
+    """
+    nodes = list(graph.get("nodes") or [])
+    edges = list(graph.get("edges") or [])
+    ids = node_ids(nodes)
+    id_set = set(ids)
+    kinds = {node_id: node_type(node) for node_id, node in zip(ids, nodes)}
+    index_edges = not any("id" in node for node in nodes)
+
+    diagnostics: List[Diagnostic] = []
+    fixes: List[Fix] = []
+
+    # Node-level checks; graph algorithms below see each id once
+    seen_ids: set = set()
+    for node_id, node in zip(ids, nodes):
+        if node_id in seen_ids:
+            diagnostics.append(
+                Diagnostic(
+                    code="duplicate_id",
+                    severity="error",
+                    message=f"More than one node has id {node_id}",
+                    node_id=node_id,
+                )
+            )
+        seen_ids.add(node_id)
+        if not isinstance(raw_node_type(node), str):
+            diagnostics.append(
+                Diagnostic(
+                    code="invalid_type",
+                    severity="error",
+                    message=f"Node {node_id} has a non-string type {raw_node_type(node)!r}",
+                    node_id=node_id,
+                )
+            )
+    unique_ids = list(dict.fromkeys(ids))
+
+    removed_edges: set = set()
+    seen_pairs: set = set()
+    video_inputs: Dict[str, int] = {}
+    adjacency: Dict[str, List[Tuple[str, int]]] = {node_id: [] for node_id in ids}
+
+    def drop_edge(edge_index: int, code: str, message: str):
+        diagnostics.append(
+            Diagnostic(
+                code=code,
+                severity="error",
+                message=message,
+                edge_index=edge_index,
+                fixable=True,
+            )
+        )
+        fixes.append(Fix(action="remove_edge", edge_index=edge_index, reason=code))
+        removed_edges.add(edge_index)
+
+    # Edge-level checks
+    for edge_index, edge in enumerate(edges):
+        source, target = edge_endpoints(edge, ids, id_set)
+        if source is None or target is None:
+            drop_edge(
+                edge_index,
+                "dangling_edge",
+                f"Edge {edge.get('source')} -> {edge.get('target')} references a missing node",
+            )
+            continue
+        if source == target:
+            drop_edge(edge_index, "self_loop", f"Node {source} is connected to itself")
+            continue
+        if (source, target) in seen_pairs:
+            drop_edge(
+                edge_index, "duplicate_edge", f"Duplicate edge {source} -> {target}"
+            )
+            continue
+        seen_pairs.add((source, target))
+
+        emitted = produces(kinds[source])
+        allowed = accepts(kinds[target])
+        if emitted is None or (allowed is not None and emitted not in allowed):
+            drop_edge(
+                edge_index,
+                "type_mismatch",
+                f"{kinds[source] or 'unknown'} output ({emitted or 'none'}) cannot feed "
+                f"{kinds[target] or 'unknown'}",
+            )
+            continue
+        if emitted == "video":
+            video_inputs[target] = video_inputs.get(target, 0) + 1
+            limit = video_input_limit(kinds[target])
+            if limit is not None and video_inputs[target] > limit:
+                drop_edge(
+                    edge_index,
+                    "too_many_inputs",
+                    f"{kinds[target]} node {target} accepts at most {limit} video input(s)",
+                )
+                continue
+
+        adjacency[source].append((target, edge_index))
+
+    # Cycles: Kahn's algorithm detects them, a DFS picks which edges to cut
+    plain = {node_id: [t for t, _ in targets] for node_id, targets in adjacency.items()}
+    order, cyclic = topological_order(unique_ids, plain)
+    if cyclic:
+        for edge_index in back_edges(unique_ids, adjacency):
+            drop_edge(
+                edge_index,
+                "cycle",
+                f"Edge {edge_index} closes a cycle through nodes {', '.join(cyclic)}",
+            )
+        for node_id in unique_ids:
+            adjacency[node_id] = [
+                (t, i) for t, i in adjacency[node_id] if i not in removed_edges
+            ]
+        plain = {n: [t for t, _ in targets] for n, targets in adjacency.items()}
+        order, _ = topological_order(unique_ids, plain)
+
+    # Parameter ranges
+    param_updates: Dict[str, Dict[str, Any]] = {}
+    for node_id, node in zip(ids, nodes):
+        config = node_config(node)
+        for diagnostic, value in check_params(kinds[node_id], node_id, config):
+            diagnostics.append(diagnostic)
+            fixes.append(
+                Fix(
+                    action="set_param",
+                    node_id=node_id,
+                    param=diagnostic.param,
+                    value=value,
+                    reason=diagnostic.code,
+                )
+            )
+            param_updates.setdefault(node_id, {})[diagnostic.param] = value
+
+    # Reachability
+    frame_nodes = [
+        n
+        for n in unique_ids
+        if produces(kinds[n]) == "video" or kinds[n] in OUTPUT_TYPES
+    ]
+    outputs = [n for n in unique_ids if kinds[n] in OUTPUT_TYPES]
+    sources = [n for n in unique_ids if kinds[n] == "videoInput"]
+    added_nodes: List[Dict[str, Any]] = []
+    added_edges: List[Tuple[str, str]] = []
+
+    if frame_nodes and not outputs:
+        # Attach a pipelineOutput to the last frame-producing sink
+        sinks = [n for n in order if produces(kinds[n]) == "video" and not adjacency[n]]
+        new_id = "pipelineOutput-auto" if not index_edges else str(len(nodes))
+        diagnostics.append(
+            Diagnostic(
+                code="missing_output",
+                severity="error",
+                message="Graph has no pipelineOutput node",
+                fixable=True,
+            )
+        )
+        fixes.append(
+            Fix(
+                action="add_node",
+                node_id=new_id,
+                value="pipelineOutput",
+                reason="missing_output",
+            )
+        )
+        added_nodes.append({"id": new_id, "type": "pipelineOutput"})
+        if sinks:
+            fixes.append(
+                Fix(
+                    action="add_edge",
+                    node_id=new_id,
+                    value=sinks[-1],
+                    reason="missing_output",
+                )
+            )
+            added_edges.append((sinks[-1], new_id))
+            adjacency[sinks[-1]].append((new_id, -1))
+        adjacency[new_id] = []
+        outputs = [new_id]
+
+    forward = reachable(sources, {n: [t for t, _ in a] for n, a in adjacency.items()})
+    for output in outputs:
+        if output not in forward:
+            diagnostics.append(
+                Diagnostic(
+                    code="output_unreachable",
+                    severity="error",
+                    message=f"Output node {output} does not receive frames from any videoInput",
+                    node_id=output,
+                )
+            )
+
+    reverse: Dict[str, List[str]] = {n: [] for n in adjacency}
+    for source, targets in adjacency.items():
+        for target, _ in targets:
+            reverse[target].append(source)
+    backward = reachable(outputs, reverse)
+    for node_id in unique_ids:
+        if produces(kinds[node_id]) == "video" and node_id not in backward:
+            diagnostics.append(
+                Diagnostic(
+                    code="dead_node",
+                    severity="warning",
+                    message=f"{kinds[node_id]} node {node_id} never reaches an output",
+                    node_id=node_id,
+                )
+            )
+
+    fixed_graph = apply_fixes(
+        graph, ids, removed_edges, param_updates, added_nodes, added_edges, index_edges
+    )
+    unresolved = [d for d in diagnostics if d.severity == "error" and not d.fixable]
+    return GraphReport(
+        valid=not any(d.severity == "error" for d in diagnostics),
+        diagnostics=diagnostics,
+        fixes=fixes,
+        fixed_graph=fixed_graph,
+        order=order,
+        escalate=bool(unresolved),
+    )
+
+
+def apply_fixes(
+    graph: Dict[str, Any],
+    ids: List[str],
+    removed_edges: set,
+    param_updates: Dict[str, Dict[str, Any]],
+    added_nodes: List[Dict[str, Any]],
+    added_edges: List[Tuple[str, str]],
+    index_edges: bool,
+) -> Dict[str, Any]:
+    """Return a copy of the graph with fixes applied, in its original format."""
+    fixed = copy.deepcopy(graph)
+    nodes = list(fixed.get("nodes") or [])
+    for node_id, node in zip(ids, nodes):
+        updates = param_updates.get(node_id)
+        if not updates:
+            continue
+        if isinstance(node.get("data"), dict) and "config" in node["data"]:
+            node["data"]["config"].update(updates)
+        else:
+            node.setdefault("config", {}).update(updates)
+
+    edges = [
+        edge
+        for i, edge in enumerate(fixed.get("edges") or [])
+        if i not in removed_edges
+    ]
+    position = {id_: i for i, id_ in enumerate(ids)}
+    for added in added_nodes:
+        position[added["id"]] = len(nodes)
+        if index_edges:
+            nodes.append({"type": added["type"], "position": {"x": 0, "y": 0}})
+        else:
+            nodes.append(
+                {
+                    "id": added["id"],
+                    "type": added["type"],
+                    "position": {"x": 0, "y": 0},
+                    "data": {
+                        "label": "Pipeline Output",
+                        "type": added["type"],
+                        "config": {"usage": "main"},
+                    },
+                }
+            )
+    for source, target in added_edges:
+        if index_edges:
+            edges.append({"source": position[source], "target": position[target]})
+        else:
+            edges.append(
+                {"id": f"e-{source}-{target}", "source": source, "target": target}
+            )
+
+    fixed["nodes"] = nodes
+    fixed["edges"] = edges
+    return fixed
@@ -0,0 +1,213 @@
+"""WebRTC negotiation helpers: batched trickle ICE and cached ICE servers.
+
+Browsers gather ICE candidates in bursts over a few hundred milliseconds.
+Clients post them as arrays, and each session's ``IceBatcher`` holds the
+first arrival for ``ice_batch_window_ms`` so stragglers from the same burst
+join it. The whole batch goes upstream in one call (or, when Scope only
+takes single candidates, as concurrent calls from the backend), and every
+request that contributed gets the same result.
+
+``IceServerCache`` keeps Scope's ICE server list for as long as its TURN
+credentials stay valid and refreshes it ahead of expiry, so starting a
+stream does not wait on an upstream call for it.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import settings
+from .metrics import Counter, Histogram
+from .responses import loads
+
+logger = logging.getLogger(__name__)
+
+ICE_CANDIDATES = Counter(
+    "openscope_ice_candidates_total",
+    "ICE candidates received from clients, by endpoint.",
+    ("endpoint",),
+)
+ICE_UPSTREAM_CALLS = Counter(
+    "openscope_ice_upstream_calls_total",
+    "Upstream calls made to deliver ICE candidates, by endpoint.",
+    ("endpoint",),
+)
+CONNECTION_SETUP = Histogram(
+    "openscope_webrtc_connection_setup_seconds",
+    "Client-reported time from creating the offer to ICE connected, by how "
+    "candidates were sent.",
+    ("ice_mode",),
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0),
+)
+
+ICE_CONFIG_REQUESTS = Counter(
+    "openscope_ice_servers_requests_total",
+    "ICE server config lookups, by cache result.",
+    ("result",),
+)
+
+ICE_MODES = ("single", "batched")
+
+# TURN REST API usernames start with the credential's expiry timestamp
+EXPIRY_USERNAME = re.compile(r"^(\d{9,12})(?::|$)")
+
+# Refresh once this fraction of the lifetime has passed
+REFRESH_FRACTION = 0.75
+
+Forward = Callable[[List[Dict[str, Any]]], Awaitable[int]]
+
+
+class IceBatcher:
+    """Collects one session's candidates for a short window, then forwards."""
+
+    def __init__(self, forward: Forward, window: float):
+        self.forward = forward
+        self.window = window
+        self.pending: List[Dict[str, Any]] = []
+        self.result: Optional[asyncio.Future] = None
+        self.last_used = time.monotonic()
+
+    async def add(self, candidates: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Queue candidates; resolves once their batch has been forwarded."""
+        self.last_used = time.monotonic()
+        self.pending.extend(candidates)
+        if self.result is None:
+            self.result = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self.flush_after(self.result))
+        # Shielded so one client disconnecting does not fail the batch
+        return await asyncio.shield(self.result)
+
+    async def flush_after(self, result: asyncio.Future):
+        await asyncio.sleep(self.window)
+        batch, self.pending, self.result = self.pending, [], None
+        try:
+            calls = await self.forward(batch)
+        except Exception as e:
+            result.set_exception(e)
+            result.exception()  # mark retrieved; every waiter may have gone
+        else:
+            result.set_result({"forwarded": len(batch), "upstream_calls": calls})
+
+
+_batchers: Dict[str, IceBatcher] = {}
+
+
+def get_batcher(session_id: str, forward: Forward) -> IceBatcher:
+    """Batcher for a Scope session; idle ones are dropped on the way."""
+    now = time.monotonic()
+    for key in [
+        k
+        for k, b in _batchers.items()
+        if b.result is None and now - b.last_used > settings.session_idle_timeout
+    ]:
+        del _batchers[key]
+    if session_id not in _batchers:
+        _batchers[session_id] = IceBatcher(
+            forward, settings.ice_batch_window_ms / 1000.0
+        )
+    return _batchers[session_id]
+
+
+def credential_ttl(config: Dict[str, Any], default: float) -> float:
+    """Seconds the ICE config stays usable: the soonest credential expiry.
+
+    Uses an explicit ``ttl`` when Scope sends one, else expiry timestamps in
+    TURN REST usernames, capped at ``default``.
+    """
+    ttl = default
+    if isinstance(config.get("ttl"), (int, float)):
+        ttl = min(ttl, float(config["ttl"]))
+    now = time.time()
+    for server in config.get("iceServers") or []:
+        match = EXPIRY_USERNAME.match(str(server.get("username") or ""))
+        if match:
+            ttl = min(ttl, int(match.group(1)) - now)
+    return max(0.0, ttl)
+
+
+class IceServerCache:
+    """Scope's ICE server list, kept fresh ahead of credential expiry."""
+
+    def __init__(self, fetch: Callable[[], Awaitable[bytes]], max_ttl: float):
+        self.fetch = fetch
+        self.max_ttl = max_ttl
+        self.body: Optional[bytes] = None
+        self.expires = 0.0
+        self.refresh_at = 0.0
+        self.lock = asyncio.Lock()
+        self.refreshing: Optional[asyncio.Task] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.time())
+
+    async def get(self) -> bytes:
+        """Cached body; only a cold or expired cache waits on Scope."""
+        now = time.time()
+        if self.body is not None and now < self.expires:
+            ICE_CONFIG_REQUESTS.inc(result="hit")
+            if now >= self.refresh_at and (
+                self.refreshing is None or self.refreshing.done()
+            ):
+                self.refreshing = asyncio.create_task(self.refresh_quietly())
+            return self.body
+        ICE_CONFIG_REQUESTS.inc(result="miss")
+        return await self.refresh()
+
+    async def refresh(self) -> bytes:
+        async with self.lock:
+            # Another caller may have refreshed while we waited
+            if self.body is not None and time.time() < self.refresh_at:
+                return self.body
+            body = await self.fetch()
+            ttl = credential_ttl(loads(body), self.max_ttl)
+            now = time.time()
+            self.body = body
+            self.expires = now + ttl
+            self.refresh_at = now + ttl * REFRESH_FRACTION
+            return body
+
+    async def refresh_quietly(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keep serving the current list until it actually expires
+            logger.warning("ICE server refresh failed: %s", e)
+
+    async def keep_warm(self):
+        """Refresh ahead of expiry forever, so even the first stream is warm."""
+        while True:
+            await self.refresh_quietly()
+            if self.body is None:
+                await asyncio.sleep(30.0)  # Scope not reachable yet
+            else:
+                await asyncio.sleep(max(1.0, self.refresh_at - time.time()))
+
+
+_ice_caches: Dict[str, IceServerCache] = {}
+_warmer: Optional[asyncio.Task] = None
+
+
+def get_ice_cache(fetch: Callable[[], Awaitable[bytes]]) -> IceServerCache:
+    """ICE server cache for the configured Scope server."""
+    backend = settings.scope_api_url.rstrip("/")
+    if backend not in _ice_caches:
+        _ice_caches[backend] = IceServerCache(fetch, settings.ice_servers_ttl)
+    return _ice_caches[backend]
+
+
+def start_warmer(cache: IceServerCache):
+    """Keep the ICE server list warm in the background."""
+    global _warmer
+    if settings.scope_api_url and settings.ice_servers_prewarm:
+        _warmer = asyncio.create_task(cache.keep_warm())
+
+
+async def stop_warmer():
+    if _warmer is not None:
+        _warmer.cancel()
+        try:
+            await _warmer
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,256 @@
+"""``Idempotency-Key`` support for expensive POST routes.
+
+A client that may retry (flaky network, double click) sends the same
+``Idempotency-Key`` header with each attempt. For routes matching
+``idempotent_paths``:
+
+* the first request runs normally and its response is recorded
+* duplicates arriving while it runs wait for it and get the same response
+* duplicates within ``idempotency_ttl`` seconds get the stored response,
+  marked with ``Idempotent-Replayed: true``
+
+Keys are scoped by user (``X-User-Id``, else client address) and path.
+Reusing a key with a different body is a 422. Server errors (5xx) and
+transient refusals (408, 409, 425, 429) are handed to waiting duplicates
+but not stored, so a later retry runs again. Request bodies are buffered
+only up to ``MAX_WATCHED_BODY``; larger or chunked ones run without
+idempotency. Stored responses are bounded by ``idempotency_max_entries``
+and ``idempotency_max_bytes``, least recently used first out; a response
+larger than the whole budget is not kept even for waiting duplicates. The
+store is per process, like the in-flight work it deduplicates.
+"""
+
+import asyncio
+import fnmatch
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cancellation import MAX_WATCHED_BODY, current_watch, non_cancellable
+from .config import settings
+from .metrics import Counter
+from .responses import dumps
+
+IDEMPOTENT_REQUESTS = Counter(
+    "openscope_idempotent_requests_total",
+    "Requests with an Idempotency-Key, by result (executed, attached, "
+    "replayed or mismatch).",
+    ("result",),
+)
+
+Headers = List[Tuple[bytes, bytes]]
+
+# Worth retrying as-is (timeout, conflict, too early, rate limited)
+TRANSIENT_STATUSES = {408, 409, 425, 429}
+
+
+class StoredResponse:
+    """A finished response, replayable to duplicates."""
+
+    def __init__(self, status: int, headers: Headers, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = time.monotonic() + settings.idempotency_ttl
+
+    async def replay(self, send, replayed: bool = True):
+        headers = list(self.headers)
+        if replayed:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send(
+            {"type": "http.response.start", "status": self.status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.response: Optional[StoredResponse] = None
+        # The executing request; duplicates keep it alive past a disconnect
+        self.watch = current_watch()
+
+
+class IdempotencyStore:
+    """In-flight and completed requests by key, bounded, LRU eviction."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self.size = 0
+
+    def get(self, key: str) -> Optional[Entry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.response is not None and entry.response.expires < time.monotonic():
+            self.drop(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def begin(self, key: str, fingerprint: str) -> Entry:
+        entry = self.entries[key] = Entry(fingerprint)
+        return entry
+
+    def finish(self, key: str, entry: Entry, response: StoredResponse):
+        entry.response = response
+        self.size += len(response.body)
+        self.evict()
+
+    def drop(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None and entry.response is not None:
+            self.size -= len(entry.response.body)
+
+    def evict(self):
+        now = time.monotonic()
+        for key in [
+            k
+            for k, e in self.entries.items()
+            if e.response is not None and e.response.expires < now
+        ]:
+            self.drop(key)
+        # Oldest completed entries first; in-flight ones are never evicted
+        completed = (k for k, e in list(self.entries.items()) if e.response)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            key = next(completed, None)
+            if key is None:
+                break
+            self.drop(key)
+
+
+_store: Optional[IdempotencyStore] = None
+
+
+def get_store() -> IdempotencyStore:
+    """Return the process-wide store, created on first use."""
+    global _store
+    if _store is None:
+        _store = IdempotencyStore(
+            settings.idempotency_max_entries, settings.idempotency_max_bytes
+        )
+    return _store
+
+
+def error_response(status: int, detail: str) -> StoredResponse:
+    return StoredResponse(
+        status, [(b"content-type", b"application/json")], dumps({"detail": detail})
+    )
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware applying ``Idempotency-Key`` to configured routes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def applies(self, scope: Dict[str, Any], headers: Dict[bytes, bytes]) -> bool:
+        length = headers.get(b"content-length", b"0")
+        return (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and any(
+                fnmatch.fnmatchcase(scope["path"], pattern)
+                for pattern in settings.idempotent_paths
+            )
+            # The body is buffered to fingerprint it; uploads are not
+            and length.isdigit()
+            and int(length) <= MAX_WATCHED_BODY
+            and b"chunked" not in headers.get(b"transfer-encoding", b"")
+        )
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope.get("headers", [])) if scope["type"] == "http" else {}
+        idempotency_key = headers.get(b"idempotency-key", b"").decode()
+        if not idempotency_key or not self.applies(scope, headers):
+            await self.app(scope, receive, send)
+            return
+
+        # Read the body to fingerprint it, then hand it on unchanged
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        user = headers.get(b"x-user-id", b"").decode() or (
+            scope["client"][0] if scope.get("client") else "unknown"
+        )
+        key = f"{user} {scope['path']} {idempotency_key}"
+
+        store = get_store()
+        while True:
+            entry = store.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                IDEMPOTENT_REQUESTS.inc(result="mismatch")
+                await error_response(
+                    422, "Idempotency-Key was already used with a different request"
+                ).replay(send, replayed=False)
+                return
+            if entry.response is not None:
+                IDEMPOTENT_REQUESTS.inc(result="replayed")
+                await entry.response.replay(send)
+                return
+            try:
+                with non_cancellable(entry.watch):
+                    response = await asyncio.shield(entry.result)
+            except Exception:
+                continue  # the original failed without a response; run it here
+            IDEMPOTENT_REQUESTS.inc(result="attached")
+            await response.replay(send)
+            return
+
+        IDEMPOTENT_REQUESTS.inc(result="executed")
+        entry = store.begin(key, fingerprint)
+        sent = False
+        status, response_headers, parts = 500, [], []
+        size = 0
+
+        async def replay_body():
+            nonlocal sent
+            if sent:
+                return await receive()  # disconnect detection still works
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture(message):
+            nonlocal status, response_headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                # Past the store's budget the copy is useless; stop keeping it
+                if size <= settings.idempotency_max_bytes:
+                    parts.append(chunk)
+            await send(message)
+
+        def abandon(reason: str):
+            store.drop(key)
+            entry.result.set_exception(RuntimeError(reason))
+            entry.result.exception()  # mark retrieved; there may be no waiters
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except BaseException:
+            abandon("request failed")
+            raise
+        if size > settings.idempotency_max_bytes:
+            abandon("response too large to keep")  # waiters run it themselves
+            return
+
+        response = StoredResponse(status, response_headers, b"".join(parts))
+        entry.result.set_result(response)
+        if status >= 500 or status in TRANSIENT_STATUSES:
+            store.drop(key)
+        else:
+            store.finish(key, entry, response)
@@ -1,15 +1,33 @@
 """OpenScope Backend API."""
 
+import importlib
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from .routers import api, templates, github, ai, pipelines, plugins, sample_plugins
+from .routers import (
+    api,
+    templates,
+    pipelines,
+    plugins,
+    sample_plugins,
+    graph,
+    lint,
+    admin,
+    workflows,
+    batch,
+)
 from .config import settings
+from . import cloud, ice, metrics, routing, sessions
+from .cancellation import CancellationMiddleware
+from .idempotency import IdempotencyMiddleware
+from .proxy import ForwardedMiddleware
+from .responses import CompressionMiddleware, DefaultJSONResponse
 
 
 @asynccontextmanager
@@ -22,10 +40,23 @@ async def lifespan(app: FastAPI):
     templates_dir = Path(__file__).parent / "templates"
     templates_dir.mkdir(exist_ok=True)
 
+    admin.start_monitor()
+    sessions.start_reaper()
+    ice.start_warmer(api.ice_server_cache())
+    cloud.start_monitor(api.cloud_manager())
+    routing.start_prober(api.inference_router())
+
     yield
 
     # Shutdown
     print("Shutting down OpenScope Backend...")
+    if "preview" in features:
+        features["preview"].shutdown()
+    await admin.stop_monitor()
+    await sessions.stop_reaper()
+    await ice.stop_warmer()
+    await cloud.stop_monitor()
+    await routing.stop_prober()
 
 
 app = FastAPI(
@@ -33,8 +64,16 @@ app = FastAPI(
     description="Visual plugin builder for Daydream Scope",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=DefaultJSONResponse,
 )
 
+# Idempotency-Key replays; innermost so stored responses are uncompressed and
+# CORS headers are added per request
+app.add_middleware(IdempotencyMiddleware)
+
+# Cancel handlers whose client disconnected before the response started
+app.add_middleware(CancellationMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -44,14 +83,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large single-message responses
+app.add_middleware(CompressionMiddleware)
+
+# Per-route request metrics and Server-Timing; outermost so it sees CORS too
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Client address from the trusted X-Forwarded-For entry, before anything
+# keys on it
+app.add_middleware(ForwardedMiddleware, hops=settings.forwarded_hops)
+
 # Include routers
 app.include_router(api.router, prefix="/api")
 app.include_router(templates.router, prefix="/api/templates")
-app.include_router(github.router, prefix="/api/github")
-app.include_router(ai.router, prefix="/api/ai")
 app.include_router(pipelines.router, prefix="/api/scope")
 app.include_router(plugins.router, prefix="/api/scope")
 app.include_router(sample_plugins.router, prefix="/api/sample-plugins")
+app.include_router(graph.router, prefix="/api/graph")
+app.include_router(lint.router, prefix="/api/lint")
+app.include_router(admin.router, prefix="/api/admin")
+app.include_router(workflows.router, prefix="/api/workflows")
+app.include_router(batch.router, prefix="/api")
+
+# Optional feature routers: (setting, module, prefix). Modules are imported
+# only when enabled, so disabled features add nothing to cold start.
+OPTIONAL_ROUTERS = [
+    ("github_enabled", "github", "/api/github"),
+    ("ai_enabled", "ai", "/api/ai"),
+    ("preview_enabled", "preview", "/api/preview"),
+]
+
+features = {}
+for flag, name, prefix in OPTIONAL_ROUTERS:
+    if getattr(settings, flag):
+        features[name] = importlib.import_module(f".routers.{name}", __package__)
+        app.include_router(features[name].router, prefix=prefix)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 
 # Serve static files from frontend build
 frontend_build = Path(__file__).parent.parent / "frontend" / "out"
@@ -0,0 +1,321 @@
+"""Process metrics in the Prometheus text exposition format.
+
+A small registry of counters, gauges and histograms, an ASGI middleware
+that records per-route traffic and adds a ``Server-Timing`` header, and
+``track_upstream`` for timing calls to Scope, Groq and GitHub.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from starlette.routing import Mount
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """Base class for labelled metrics."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def format_labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [
+            f'{label}="{escape(value)}"' for label, value in zip(self.labels, values)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = (
+            f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        )
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self.key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{self.format_labels(k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    """Cumulative bucketed observations with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self.key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            # Per-bucket counts, then +Inf, sum and count
+            state = self.values.setdefault(key, [0.0] * (len(self.buckets) + 3))
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def mean(self, **labels: str) -> Optional[float]:
+        """Mean observed value, or None before the first observation."""
+        with self.lock:
+            state = self.values.get(self.key(labels))
+            return state[-2] / state[-1] if state else None
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = self.format_labels(key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = self.format_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+            lines.append(f"{self.name}_sum{self.format_labels(key)} {state[-2]}")
+            lines.append(f"{self.name}_count{self.format_labels(key)} {state[-1]}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render() -> str:
+    """Render every registered metric."""
+    return "".join(metric.render() for metric in REGISTRY)
+
+
+# HTTP server metrics
+REQUESTS = Counter(
+    "openscope_http_requests_total",
+    "HTTP requests by route, method and status.",
+    ("method", "route", "status"),
+)
+IN_FLIGHT = Gauge(
+    "openscope_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    ("method",),
+)
+LATENCY = Histogram(
+    "openscope_http_request_duration_seconds",
+    "Time from request start to the last response byte.",
+    ("method", "route"),
+)
+
+# Upstream metrics
+UPSTREAM_LATENCY = Histogram(
+    "openscope_upstream_duration_seconds",
+    "Latency of calls to upstream services.",
+    ("upstream", "operation", "outcome"),
+)
+UPSTREAM_ERRORS = Counter(
+    "openscope_upstream_errors_total",
+    "Failed upstream calls by error class.",
+    ("upstream", "operation", "error"),
+)
+
+# Seconds spent waiting on upstreams during the current request
+_upstream_time: ContextVar[Optional[List[float]]] = ContextVar(
+    "upstream_time", default=None
+)
+
+
+def error_class(exc: BaseException) -> str:
+    """Classify an upstream failure into a small, stable label set."""
+    if isinstance(exc, httpx.ConnectError):
+        return "connect_error"
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"http_{exc.response.status_code // 100}xx"
+    status = getattr(exc, "status", None) or getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return f"http_{status // 100}xx"
+    return type(exc).__name__
+
+
+class track_upstream:
+    """Time an upstream call; usable with ``with`` and ``async with``.
+
+    Records latency by outcome, counts errors by class and adds the elapsed
+    time to the current request's upstream share of ``Server-Timing``.
+    """
+
+    def __init__(self, upstream: str, operation: str):
+        self.upstream = upstream
+        self.operation = operation.split("?", 1)[0]
+        self.outcome = "ok"
+
+    def mark_error(self, error: str):
+        """Record a failure that did not raise."""
+        self.outcome = error
+
+    def record_status(self, status_code: int):
+        """Mark non-2xx responses that are handled without raising."""
+        if status_code >= 300:
+            self.outcome = f"http_{status_code // 100}xx"
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        if exc is not None:
+            self.outcome = error_class(exc)
+        UPSTREAM_LATENCY.observe(
+            elapsed,
+            upstream=self.upstream,
+            operation=self.operation,
+            outcome="ok" if self.outcome == "ok" else "error",
+        )
+        if self.outcome != "ok":
+            UPSTREAM_ERRORS.inc(
+                upstream=self.upstream, operation=self.operation, error=self.outcome
+            )
+        spent = _upstream_time.get()
+        if spent is not None:
+            spent[0] += elapsed
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def route_template(scope) -> str:
+    """Return the matched route path, keeping label cardinality bounded.
+
+    The route's own ``path_format`` plus the prefix it was included under:
+    FastAPI records that on the scope when routes of an included router
+    keep their relative paths.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    if isinstance(route, Mount):
+        return route.path or "/"
+    included = (scope.get("fastapi") or {}).get("included_router")
+    prefix = getattr(getattr(included, "include_context", None), "prefix", "")
+    return (prefix or "") + getattr(route, "path_format", route.path)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route metrics and ``Server-Timing``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        spent = [0.0]
+        token = _upstream_time.set(spent)
+        started = time.perf_counter()
+        status = "500"
+        IN_FLIGHT.inc(method=method)
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                total = (time.perf_counter() - started) * 1000
+                upstream = spent[0] * 1000
+                timing = (
+                    f"app;dur={max(total - upstream, 0):.1f}, "
+                    f"upstream;dur={upstream:.1f}, total;dur={total:.1f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _upstream_time.reset(token)
+            # Routing fills in scope["route"] on the shared scope dict
+            route = route_template(scope)
+            IN_FLIGHT.dec(method=method)
+            REQUESTS.inc(method=method, route=route, status=status)
+            LATENCY.observe(time.perf_counter() - started, method=method, route=route)
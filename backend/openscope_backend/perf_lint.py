@@ -0,0 +1,352 @@
+"""AST-based performance linter for processor and pipeline source.
+
+Flags per-frame anti-patterns on the hot path: ``__call__`` and
+``process_frames`` plus every module-level helper or method they call.
+"""
+
+import ast
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Set
+
+from pydantic import BaseModel
+
+HOT_ENTRY_POINTS = {"__call__", "process_frames"}
+
+# Sampling grid builders that only depend on (H, W, params)
+GRID_BUILDERS = {"linspace", "meshgrid", "arange", "mgrid", "ogrid", "affine_grid"}
+
+# Constructors that allocate a new tensor
+ALLOCATORS = {"tensor", "zeros", "ones", "full", "eye", "empty", "as_tensor"}
+
+# Calls that copy between host and device
+TRANSFERS = {"cpu", "cuda", "numpy", "from_numpy", "tolist"}
+
+# Calls that force a device synchronization
+SYNCS = {"item", "synchronize"}
+
+# Reductions that sync when used as a Python bool
+REDUCTIONS = {"max", "min", "any", "all", "sum", "mean"}
+
+# Names that suggest an image dimension in a range() bound
+PIXEL_DIMENSIONS = {"h", "w", "height", "width", "rows", "cols", "H", "W"}
+
+# Reducers that consume a comprehension in one vectorized call
+STACKERS = {"stack", "cat", "concatenate"}
+
+# Decorators whose function body runs once per distinct argument set
+MEMOIZERS = {"lru_cache", "cache", "cached_property"}
+
+
+class Finding(BaseModel):
+    """A single performance finding."""
+
+    rule: str
+    severity: str  # "error", "warning" or "info"
+    message: str
+    fix: str
+    function: str
+    line: int
+    col: int
+    end_line: Optional[int] = None
+
+
+def call_name(node: ast.Call) -> Optional[str]:
+    """Return the called function or method name."""
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def is_constant(node: ast.AST) -> bool:
+    """True for literals and (nested) tuples/lists of literals."""
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, ast.UnaryOp):
+        return is_constant(node.operand)
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return all(is_constant(e) for e in node.elts)
+    return False
+
+
+def collect_functions(tree: ast.Module) -> Dict[str, List[ast.AST]]:
+    """Map every function and method name to its definitions."""
+    functions: Dict[str, List[ast.AST]] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.setdefault(node.name, []).append(node)
+    return functions
+
+
+def hot_functions(functions: Dict[str, List[ast.AST]]) -> List[ast.AST]:
+    """Entry points plus everything they (transitively) call in this module."""
+    seen: Set[str] = set()
+    queue = deque(name for name in HOT_ENTRY_POINTS if name in functions)
+    hot = []
+    while queue:
+        name = queue.popleft()
+        if name in seen:
+            continue
+        seen.add(name)
+        for definition in functions[name]:
+            hot.append(definition)
+            for node in ast.walk(definition):
+                if isinstance(node, ast.Call):
+                    callee = call_name(node)
+                    if callee in functions and callee not in seen:
+                        queue.append(callee)
+    return hot
+
+
+def is_memoized(function: ast.AST) -> bool:
+    """True for ``@lru_cache``, ``@functools.cache(...)`` and the like."""
+    for decorator in function.decorator_list:
+        if isinstance(decorator, ast.Call):
+            decorator = decorator.func
+        name = decorator.attr if isinstance(decorator, ast.Attribute) else None
+        if isinstance(decorator, ast.Name):
+            name = decorator.id
+        if name in MEMOIZERS:
+            return True
+    return False
+
+
+def is_cache_miss(test: ast.AST) -> bool:
+    """True for tests like ``key not in self.grids`` or ``grid is None``."""
+    if isinstance(test, ast.BoolOp):
+        return any(is_cache_miss(value) for value in test.values)
+    if isinstance(test, ast.UnaryOp) and isinstance(test.op, ast.Not):
+        return isinstance(test.operand, (ast.Name, ast.Attribute, ast.Subscript))
+    if isinstance(test, ast.Compare):
+        for op, right in zip(test.ops, test.comparators):
+            if isinstance(op, ast.NotIn):
+                return True
+            if (
+                isinstance(op, ast.Is)
+                and isinstance(right, ast.Constant)
+                and right.value is None
+            ):
+                return True
+    return False
+
+
+class HotPathVisitor(ast.NodeVisitor):
+    """Collect findings inside one hot-path function."""
+
+    def __init__(self, function: str, memoized: bool = False):
+        self.function = function
+        self.findings: List[Finding] = []
+        self.loop_depth = 0
+        self.in_return = False
+        self.stacked: Set[int] = set()
+        # Inside a memoized function or a cache-miss branch, one-off builds
+        # are the fix rather than the problem
+        self.cached = 1 if memoized else 0
+
+    def add(self, node: ast.AST, rule: str, severity: str, message: str, fix: str):
+        self.findings.append(
+            Finding(
+                rule=rule,
+                severity=severity,
+                message=message,
+                fix=fix,
+                function=self.function,
+                line=node.lineno,
+                col=node.col_offset,
+                end_line=getattr(node, "end_lineno", None),
+            )
+        )
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        # Nested definitions are linted only if the hot path calls them
+        if node.name == self.function:
+            self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Return(self, node: ast.Return):
+        self.in_return = True
+        self.generic_visit(node)
+        self.in_return = False
+
+    def visit_For(self, node: ast.For):
+        kind = self.loop_kind(node.iter)
+        if self.loop_depth > 0 or kind == "pixels":
+            self.add(
+                node,
+                "python_pixel_loop",
+                "error",
+                "Python loop over pixels runs once per element on the host",
+                "vectorize",
+            )
+        elif kind == "frames":
+            self.add(
+                node,
+                "python_frame_loop",
+                "warning",
+                "Python loop over frames; process the whole THWC batch at once",
+                "vectorize",
+            )
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+
+    def visit_While(self, node: ast.While):
+        self.check_branch(node.test)
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+
+    def visit_ListComp(self, node: ast.ListComp):
+        if id(node) not in self.stacked:
+            self.add(
+                node,
+                "python_frame_loop",
+                "info",
+                "Per-frame comprehension; prefer one batched tensor op",
+                "vectorize",
+            )
+        self.generic_visit(node)
+
+    def check_branch(self, test: ast.AST):
+        """Flag tensor reductions used as a Python bool."""
+        if isinstance(test, ast.Compare):
+            operands = [test.left, *test.comparators]
+        else:
+            operands = [test]
+        for operand in operands:
+            if (
+                isinstance(operand, ast.Call)
+                and isinstance(operand.func, ast.Attribute)
+                and operand.func.attr in REDUCTIONS
+                and not operand.args
+            ):
+                self.add(
+                    operand,
+                    "device_sync",
+                    "warning",
+                    f"Branching on .{operand.func.attr}() forces a device sync",
+                    "avoid_sync",
+                )
+
+    def visit_If(self, node: ast.If):
+        self.check_branch(node.test)
+        if not is_cache_miss(node.test):
+            self.generic_visit(node)
+            return
+        self.visit(node.test)
+        self.cached += 1
+        for statement in node.body:
+            self.visit(statement)
+        self.cached -= 1
+        for statement in node.orelse:
+            self.visit(statement)
+
+    def visit_IfExp(self, node: ast.IfExp):
+        self.check_branch(node.test)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        name = call_name(node)
+
+        if name in STACKERS:
+            for arg in node.args:
+                if isinstance(arg, (ast.ListComp, ast.GeneratorExp)):
+                    self.stacked.add(id(arg))
+
+        if name in GRID_BUILDERS and not self.cached:
+            self.add(
+                node,
+                "grid_per_call",
+                "warning",
+                f"{name}() rebuilds a sampling grid on every call",
+                "cache_by_shape",
+            )
+        elif (
+            name in ALLOCATORS
+            and not self.cached
+            and node.args
+            and all(map(is_constant, node.args))
+        ):
+            self.add(
+                node,
+                "constant_alloc",
+                "warning",
+                f"{name}() allocates a constant tensor on every call",
+                "hoist_to_init",
+            )
+        elif name in SYNCS and isinstance(node.func, ast.Attribute):
+            self.add(
+                node,
+                "device_sync",
+                "warning",
+                f".{name}() blocks until the device finishes",
+                "avoid_sync",
+            )
+        elif name in TRANSFERS or self.is_host_transfer(node):
+            self.add(
+                node,
+                "host_device_transfer",
+                "info" if self.in_return else "warning",
+                f"{name}() copies data between host and device",
+                "keep_on_device",
+            )
+        self.generic_visit(node)
+
+    @staticmethod
+    def is_host_transfer(node: ast.Call) -> bool:
+        """True for ``.to("cpu")``."""
+        if call_name(node) != "to":
+            return False
+        values = list(node.args) + [k.value for k in node.keywords]
+        return any(
+            isinstance(v, ast.Constant) and v.value in ("cpu", "cuda") for v in values
+        )
+
+    @staticmethod
+    def loop_kind(iterator: ast.AST) -> Optional[str]:
+        """Guess whether a loop walks frames or pixels."""
+        if isinstance(iterator, ast.Call) and call_name(iterator) == "range":
+            for arg in iterator.args:
+                for node in ast.walk(arg):
+                    if isinstance(node, ast.Name) and node.id in PIXEL_DIMENSIONS:
+                        return "pixels"
+                    if (
+                        isinstance(node, ast.Subscript)
+                        and isinstance(node.value, ast.Attribute)
+                        and node.value.attr == "shape"
+                        and isinstance(node.slice, ast.Constant)
+                        and node.slice.value in (1, 2, -2, -3)
+                    ):
+                        return "pixels"
+            return "frames"
+        if isinstance(iterator, ast.Call) and call_name(iterator) in (
+            "enumerate",
+            "zip",
+        ):
+            return "frames"
+        if isinstance(iterator, (ast.Name, ast.Attribute, ast.Subscript)):
+            return "frames"
+        return None
+
+
+def lint_source(code: str, filename: str = "<source>") -> List[Finding]:
+    """Lint Python source and return hot-path findings sorted by line.
+
+    Raises SyntaxError if the code does not parse.
+    """
+    tree = ast.parse(code, filename=filename)
+    findings: List[Finding] = []
+    for function in hot_functions(collect_functions(tree)):
+        visitor = HotPathVisitor(function.name, is_memoized(function))
+        visitor.visit(function)
+        findings.extend(visitor.findings)
+    return sorted(findings, key=lambda f: (f.line, f.col))
+
+
+def iter_python_files(root) -> Iterator:
+    """Yield the Python files below a plugin directory."""
+    for path in sorted(root.rglob("*.py")):
+        if "__pycache__" not in path.parts:
+            yield path
@@ -0,0 +1,306 @@
+"""CPU preview runtime for node graphs.
+
+Frames are decoded (or synthesized) in a streaming generator, grouped into
+batches and spread across a process pool that runs the NumPy kernels from
+``effects.py``. Results are encoded in the workers and streamed back in
+order, paced to the target frame rate.
+"""
+
+import asyncio
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+from .effects import apply_kernel, kernel_for
+from .graph import (
+    edge_endpoints,
+    node_config,
+    node_ids,
+    node_type,
+    produces,
+    topological_order,
+)
+
+SAMPLE_VIDEO = Path(__file__).parent.parent.parent / "public" / "sample.mp4"
+
+MJPEG_BOUNDARY = "frame"
+
+# A plan step: (node id, kernel name or None, config, input node ids)
+Step = Tuple[str, Optional[str], Dict[str, Any], List[str]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class PreviewError(Exception):
+    """Raised when a graph cannot be previewed."""
+
+
+def worker_count() -> int:
+    """Number of preview worker processes."""
+    return settings.preview_workers or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Return the shared worker pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=worker_count())
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the worker pool if it was started."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def compile_plan(graph: Dict[str, Any]) -> Tuple[List[Step], str, str]:
+    """Compile a graph into ordered steps.
+
+    Returns the steps, the id of the video source node and the id of the
+    node whose frames are shown (the input of the first output node).
+    """
+    nodes = list(graph.get("nodes") or [])
+    ids = node_ids(nodes)
+    id_set = set(ids)
+    kinds = {node_id: node_type(node) for node_id, node in zip(ids, nodes)}
+    configs = {node_id: node_config(node) for node_id, node in zip(ids, nodes)}
+
+    adjacency: Dict[str, List[str]] = {node_id: [] for node_id in ids}
+    inputs: Dict[str, List[str]] = {node_id: [] for node_id in ids}
+    for edge in graph.get("edges") or []:
+        source, target = edge_endpoints(edge, ids, id_set)
+        if source is None or target is None:
+            raise PreviewError(f"Dangling edge {edge}")
+        if produces(kinds[source]) != "video":
+            continue
+        adjacency[source].append(target)
+        inputs[target].append(source)
+
+    order, cyclic = topological_order(ids, adjacency)
+    if cyclic:
+        raise PreviewError(f"Graph has a cycle through {', '.join(cyclic)}")
+
+    sources = [n for n in order if kinds[n] == "videoInput"]
+    if not sources:
+        raise PreviewError("Graph has no videoInput node")
+
+    outputs = [
+        n for n in order if kinds[n] in ("pipelineOutput", "postprocessorOutput")
+    ]
+    shown = inputs[outputs[0]][0] if outputs and inputs[outputs[0]] else order[-1]
+
+    steps: List[Step] = []
+    for node_id in order:
+        if node_id in sources or produces(kinds[node_id]) != "video":
+            continue
+        if not inputs[node_id]:
+            continue
+        kernel = kernel_for(kinds[node_id], configs[node_id])
+        steps.append((node_id, kernel, configs[node_id], inputs[node_id]))
+    return steps, sources[0], shown
+
+
+def run_plan(
+    steps: List[Step], source: str, shown: str, batch: np.ndarray
+) -> np.ndarray:
+    """Run compiled steps over a uint8 THWC batch and return uint8 frames."""
+    frames = batch.astype(np.float32) * np.float32(1.0 / 255.0)
+    values = {source: frames}
+    for node_id, kernel, config, input_ids in steps:
+        args = [values[i] for i in input_ids if i in values]
+        if not args:
+            continue
+        if kernel is None:
+            values[node_id] = args[0]
+            continue
+        if kernel == "blend" and len(args) == 1:
+            # A single-input blend mixes with the unprocessed source
+            args.append(frames)
+        values[node_id] = apply_kernel(kernel, args, config)
+    result = values.get(shown, frames)
+    return (result * 255.0 + 0.5).astype(np.uint8)
+
+
+def encode_jpeg(frames: np.ndarray, quality: int) -> List[bytes]:
+    """Encode each frame of a uint8 THWC batch as JPEG."""
+    from PIL import Image
+
+    encoded = []
+    for frame in frames:
+        buffer = io.BytesIO()
+        Image.fromarray(frame).save(buffer, format="JPEG", quality=quality)
+        encoded.append(buffer.getvalue())
+    return encoded
+
+
+def process_batch(
+    steps: List[Step],
+    source: str,
+    shown: str,
+    batch: np.ndarray,
+    output_format: str,
+    quality: int,
+) -> List[bytes]:
+    """Worker entry point: run the plan and return stream-ready parts."""
+    result = run_plan(steps, source, shown, batch)
+    if output_format == "mjpeg":
+        return [
+            multipart(payload, "image/jpeg") for payload in encode_jpeg(result, quality)
+        ]
+    shape = "x".join(str(d) for d in result.shape[1:])
+    return [
+        multipart(frame.tobytes(), "application/octet-stream", shape)
+        for frame in result
+    ]
+
+
+def multipart(payload: bytes, content_type: str, shape: Optional[str] = None) -> bytes:
+    """Wrap one frame as a multipart/x-mixed-replace part."""
+    headers = f"--{MJPEG_BOUNDARY}\r\nContent-Type: {content_type}\r\n"
+    if shape:
+        headers += f"X-Frame-Shape: {shape}\r\n"
+    headers += f"Content-Length: {len(payload)}\r\n\r\n"
+    return headers.encode() + payload + b"\r\n"
+
+
+def decode_video(path: Path, width: int) -> Iterator[np.ndarray]:
+    """Decode a video file into uint8 HWC frames, looping forever."""
+    import av
+
+    while True:
+        with av.open(str(path)) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            height = None
+            for frame in container.decode(stream):
+                if height is None:
+                    scale = width / frame.width
+                    height = max(2, int(frame.height * scale) // 2 * 2)
+                yield frame.to_ndarray(width=width, height=height, format="rgb24")
+
+
+def synthetic_frames(width: int, height: int) -> Iterator[np.ndarray]:
+    """Generate moving color gradients as uint8 HWC frames."""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    x /= max(width - 1, 1)
+    y /= max(height - 1, 1)
+    t = 0
+    while True:
+        phase = t / 30.0
+        frame = np.stack(
+            (
+                0.5 + 0.5 * np.sin(2 * np.pi * (x + phase)),
+                0.5 + 0.5 * np.sin(2 * np.pi * (y - phase)),
+                0.5 + 0.5 * np.cos(2 * np.pi * (x + y + phase)),
+            ),
+            axis=-1,
+        )
+        yield (frame * 255).astype(np.uint8)
+        t += 1
+
+
+def open_source(source: str, width: int) -> Iterator[np.ndarray]:
+    """Open a frame source by name."""
+    if source == "sample":
+        if not SAMPLE_VIDEO.exists():
+            raise PreviewError(f"Sample video not found at {SAMPLE_VIDEO}")
+        try:
+            import av  # noqa: F401
+        except ImportError:
+            raise PreviewError("PyAV not installed - use source=synthetic")
+        return decode_video(SAMPLE_VIDEO, width)
+    if source == "synthetic":
+        return synthetic_frames(width, width * 9 // 16)
+    raise PreviewError(f"Unknown source: {source}")
+
+
+def batches(frames: Iterator[np.ndarray], size: int) -> Iterator[np.ndarray]:
+    """Group frames into THWC batches."""
+    while True:
+        batch = [next(frames) for _ in range(size)]
+        yield np.stack(batch)
+
+
+async def stream_preview(
+    graph: Dict[str, Any],
+    source: str = "sample",
+    output_format: str = "mjpeg",
+    fps: Optional[float] = None,
+    width: Optional[int] = None,
+    max_frames: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Stream processed frames, paced to ``fps``.
+
+    Up to one batch per worker is kept in flight. When processing falls
+    behind the target rate, whole source batches are skipped so the stream
+    stays real-time instead of accumulating latency.
+    """
+    steps, source_id, shown = compile_plan(graph)
+    fps = fps or settings.preview_fps
+    width = width or settings.preview_width
+    batch_size = settings.preview_batch_size
+    frames = open_source(source, width)
+    source_batches = batches(frames, batch_size)
+
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    in_flight: deque = deque()
+    frame_period = 1.0 / fps
+    started = None
+    slot = 0  # position on the output timeline, including skipped frames
+    sent = 0
+
+    async def submit():
+        batch = await asyncio.to_thread(next, source_batches)
+        in_flight.append(
+            loop.run_in_executor(
+                pool,
+                process_batch,
+                steps,
+                source_id,
+                shown,
+                batch,
+                output_format,
+                settings.preview_jpeg_quality,
+            )
+        )
+
+    try:
+        for _ in range(worker_count()):
+            await submit()
+
+        while max_frames is None or sent < max_frames:
+            parts = await in_flight.popleft()
+            if started is None:
+                started = time.perf_counter()
+
+            # Skip whole source batches when more than a batch behind schedule
+            lag = time.perf_counter() - (started + slot * frame_period)
+            skip = int(lag / (frame_period * batch_size)) if lag > 0 else 0
+            for _ in range(skip):
+                await asyncio.to_thread(next, source_batches)
+            slot += skip * batch_size
+            await submit()
+
+            for part in parts:
+                delay = started + slot * frame_period - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield part
+                slot += 1
+                sent += 1
+                if max_frames is not None and sent >= max_frames:
+                    break
+    finally:
+        for future in in_flight:
+            future.cancel()
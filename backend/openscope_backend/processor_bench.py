@@ -0,0 +1,176 @@
+"""Benchmark AI-generated processors in a sandboxed subprocess.
+
+The code runs in a separate, isolated interpreter (``processor_runner.py``)
+with an empty environment, a scratch working directory and rlimits on
+address space, CPU time, file size and open files, plus a wall-clock
+timeout enforced here. Where unprivileged user namespaces are available
+(``unshare``), it also runs without network access.
+
+This is not a filesystem sandbox: the code can read any file this process
+can, including ``backend/.env``. Without network isolation it could send
+what it reads anywhere, so only enable benchmarks on hosts where that is
+acceptable.
+"""
+
+import asyncio
+import json
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+
+RUNNER = Path(__file__).parent / "processor_runner.py"
+
+DEFAULT_RESOLUTIONS = [[256, 256], [512, 512], [720, 1280]]
+DEFAULT_BATCH_SIZES = [1, 4]
+
+
+def limit_resources(memory_mb: int, cpu_seconds: int):
+    """Return a preexec_fn that applies rlimits in the child process."""
+
+    def apply():
+        memory = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (16 * 1024 * 1024,) * 2)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (256, 256))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    return apply
+
+
+_network_isolation: Optional[List[str]] = None
+
+
+def network_isolation() -> List[str]:
+    """Command prefix running the child in an empty network namespace.
+
+    Empty when ``unshare`` is missing or user namespaces are not permitted.
+    """
+    global _network_isolation
+    if _network_isolation is None:
+        prefix = ["unshare", "--net", "--map-root-user"]
+        try:
+            works = shutil.which("unshare") is not None and (
+                subprocess.run(prefix + ["true"], capture_output=True).returncode == 0
+            )
+        except OSError:
+            works = False
+        _network_isolation = prefix if works else []
+    return _network_isolation
+
+
+def sandbox_env(workdir: str) -> Dict[str, str]:
+    """Minimal environment so API keys and tokens never reach the child."""
+    return {
+        "PATH": os.environ.get("PATH", ""),
+        "HOME": workdir,
+        "TMPDIR": workdir,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "OMP_NUM_THREADS": "1",
+    }
+
+
+def summarize(report: Dict[str, Any], max_frame_ms: Optional[float]) -> Dict[str, Any]:
+    """Add an overall verdict to a runner report."""
+    cases = report.get("cases", [])
+    failed = [c for c in cases if "error" in c or not c.get("correct")]
+    slowest = max(
+        (c["per_frame_ms"]["p50"] for c in cases if "per_frame_ms" in c),
+        default=None,
+    )
+    too_slow = (
+        max_frame_ms is not None and slowest is not None and slowest > max_frame_ms
+    )
+    passed = bool(cases) and not report.get("error") and not failed and not too_slow
+    report["summary"] = {
+        "passed": passed,
+        "failed_cases": len(failed),
+        "slowest_p50_frame_ms": slowest,
+        "max_frame_ms": max_frame_ms,
+        "peak_rss_mb": max(
+            (c["peak_rss_mb"] for c in cases if "peak_rss_mb" in c), default=None
+        ),
+    }
+    return report
+
+
+async def benchmark_processor(
+    code: str,
+    resolutions: Optional[List[List[int]]] = None,
+    batch_sizes: Optional[List[int]] = None,
+    iterations: int = 5,
+    max_frame_ms: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Run ``process_frames`` from ``code`` on synthetic batches and report.
+
+    Reports per-frame latency, peak RSS and shape/range correctness for each
+    resolution and batch size.
+    """
+    job = {
+        "code": code,
+        "resolutions": resolutions or DEFAULT_RESOLUTIONS,
+        "batch_sizes": batch_sizes or DEFAULT_BATCH_SIZES,
+        "iterations": iterations,
+        "threads": 1,
+    }
+    timeout = settings.processor_benchmark_timeout
+
+    with tempfile.TemporaryDirectory(prefix="openscope-bench-") as workdir:
+        isolation = await asyncio.to_thread(network_isolation)
+        process = await asyncio.create_subprocess_exec(
+            *isolation,
+            sys.executable,
+            "-I",
+            str(RUNNER),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=workdir,
+            env=sandbox_env(workdir),
+            preexec_fn=limit_resources(
+                settings.processor_benchmark_memory_mb, int(timeout) + 1
+            ),
+            start_new_session=True,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(json.dumps(job).encode()), timeout
+            )
+        except asyncio.TimeoutError:
+            # The runner forks a child per case; take the whole session down
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            return summarize(
+                {"cases": [], "error": f"benchmark timed out after {timeout}s"},
+                max_frame_ms,
+            )
+
+    if process.returncode != 0 or not stdout:
+        reason = (
+            f"terminated by signal {-process.returncode}"
+            if process.returncode and process.returncode < 0
+            else f"exited with code {process.returncode}"
+        )
+        return summarize(
+            {
+                "cases": [],
+                "error": f"benchmark process {reason}",
+                "stderr": stderr.decode(errors="replace")[-2000:],
+            },
+            max_frame_ms,
+        )
+
+    report = summarize(json.loads(stdout), max_frame_ms)
+    report["network_isolated"] = bool(isolation)
+    return report
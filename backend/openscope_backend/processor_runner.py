@@ -0,0 +1,176 @@
+"""Sandboxed benchmark runner for generated processors.
+
+Executed as a standalone script by ``processor_bench.py`` inside a
+resource-limited subprocess. It reads a JSON job from stdin, runs the
+job's ``process_frames`` on synthetic THWC batches and writes a JSON report
+to stdout. Each case runs in a forked child, so its peak RSS is its own and
+a crash ends only that case. It must not import anything from
+``openscope_backend``.
+"""
+
+import json
+import math
+import os
+import resource
+import signal
+import sys
+import time
+import traceback
+
+
+def peak_rss_mb() -> float:
+    """High-water resident set size of this process in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux), else the high-water mark."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+
+
+def check_output(result, shape):
+    """Return a list of correctness problems with a processor's output."""
+    import torch
+
+    if isinstance(result, dict):
+        result = result.get("video")
+    if not isinstance(result, torch.Tensor):
+        return [f"expected a torch.Tensor, got {type(result).__name__}"], None
+
+    problems = []
+    if tuple(result.shape) != tuple(shape):
+        problems.append(f"shape {tuple(result.shape)} != input shape {tuple(shape)}")
+    if not result.is_floating_point():
+        problems.append(f"dtype {result.dtype} is not floating point")
+        return problems, None
+
+    low = float(result.min())
+    high = float(result.max())
+    if math.isnan(low) or math.isnan(high):
+        problems.append("output contains NaN")
+    elif low < 0.0 or high > 1.0:
+        problems.append(f"values in [{low:.4f}, {high:.4f}] fall outside [0, 1]")
+    return problems, [low, high]
+
+
+def run_case(process_frames, height, width, batch_size, iterations):
+    """Benchmark one resolution/batch-size combination."""
+    import torch
+
+    frames = torch.rand(batch_size, height, width, 3)
+    shape = frames.shape
+
+    # Warm-up call also provides the output used for correctness checks
+    result = process_frames(frames.clone())
+    problems, value_range = check_output(result, shape)
+
+    timings = []
+    for _ in range(iterations):
+        batch = frames.clone()
+        start = time.perf_counter()
+        process_frames(batch)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    per_frame = [t / batch_size * 1000.0 for t in timings]
+    return {
+        "height": height,
+        "width": width,
+        "batch_size": batch_size,
+        "per_frame_ms": {
+            "mean": sum(per_frame) / len(per_frame),
+            "p50": per_frame[len(per_frame) // 2],
+            "p95": per_frame[min(len(per_frame) - 1, int(len(per_frame) * 0.95))],
+            "max": per_frame[-1],
+        },
+        "fps": batch_size / (sum(timings) / len(timings)),
+        "peak_rss_mb": peak_rss_mb(),
+        "correct": not problems,
+        "problems": problems,
+        "value_range": value_range,
+    }
+
+
+def run_case_in_child(process_frames, height, width, batch_size, iterations):
+    """Run one case in a forked child and return its result."""
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        try:
+            case = run_case(process_frames, height, width, batch_size, iterations)
+        except MemoryError:
+            case = {"error": "memory limit exceeded"}
+        except Exception:
+            case = {"error": traceback.format_exc(limit=3)}
+        with os.fdopen(write, "w") as f:
+            json.dump(case, f)
+        os._exit(0)
+
+    os.close(write)
+    with os.fdopen(read) as f:
+        data = f.read()
+    _, status = os.waitpid(pid, 0)
+    if data:
+        return json.loads(data)
+    if os.WIFSIGNALED(status):
+        signum = os.WTERMSIG(status)
+        if signum == signal.SIGKILL:
+            return {"error": "case killed (memory or CPU limit)"}
+        return {"error": f"case terminated by signal {signum}"}
+    return {"error": f"case exited with code {os.WEXITSTATUS(status)}"}
+
+
+def main():
+    job = json.load(sys.stdin)
+    report = {"cases": [], "error": None}
+
+    # Generated code may print; keep stdout for the report only
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    try:
+        import torch
+
+        torch.set_num_threads(job.get("threads", 1))
+        torch.manual_seed(0)
+    except ImportError:
+        report["error"] = "torch is not installed in the benchmark environment"
+        json.dump(report, out)
+        return
+
+    namespace = {"__name__": "generated_processor"}
+    try:
+        exec(compile(job["code"], "<generated>", "exec"), namespace)
+        process_frames = namespace["process_frames"]
+    except KeyError:
+        report["error"] = "code does not define process_frames"
+    except Exception:
+        report["error"] = "failed to load code:\n" + traceback.format_exc(limit=3)
+    if report["error"]:
+        json.dump(report, out)
+        return
+
+    # The runner after loading the code. Each case's peak_rss_mb is its
+    # forked child's high-water mark: pages that case touched, shared or not
+    report["baseline_rss_mb"] = rss_mb()
+    for height, width in job["resolutions"]:
+        for batch_size in job["batch_sizes"]:
+            case = run_case_in_child(
+                process_frames, height, width, batch_size, job["iterations"]
+            )
+            case.setdefault("height", height)
+            case.setdefault("width", width)
+            case.setdefault("batch_size", batch_size)
+            report["cases"].append(case)
+
+    json.dump(report, out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Live diagnostics: a stack-sampling profiler and an event-loop lag monitor.
+
+The profiler samples every thread's Python stack from a background thread
+and returns collapsed stacks (``frame;frame;frame count``), the input format
+of flamegraph.pl, speedscope and inferno. The lag monitor runs a heartbeat
+coroutine on the event loop and a watchdog thread that, when the heartbeat
+stalls past a threshold, captures the loop thread's stack and current task.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import Histogram
+
+logger = logging.getLogger("openscope.loop")
+
+LOOP_LAG = Histogram(
+    "openscope_event_loop_lag_seconds",
+    "Delay between when the event loop should have resumed a task and when it did.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+STALL_STACK_DEPTH = 20
+
+# Leaf functions of a thread that is waiting rather than running
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "wait", "_wait_for_tstate_lock", "sleep"}
+
+
+def frame_label(frame) -> str:
+    """Function-level label, so different lines of one function merge."""
+    code = frame.f_code
+    filename = code.co_filename
+    for marker in ("site-packages/", "openscope_backend/"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame) -> List[str]:
+    """Stack from the outermost frame down to ``frame``."""
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def sample_stacks(
+    seconds: float, interval: float = 0.005, include_idle: bool = False
+) -> Dict[str, Any]:
+    """Sample all threads for ``seconds`` and count identical stacks.
+
+    Blocks the calling thread; run it with ``asyncio.to_thread``.
+    """
+    me = threading.get_ident()
+    counts: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if not include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            stack = [names.get(ident, f"thread-{ident}")] + collapse(frame)
+            counts[";".join(stack)] += 1
+        samples += 1
+        time.sleep(interval)
+    return {"samples": samples, "stacks": counts}
+
+
+def render_collapsed(counts: Counter) -> str:
+    """Collapsed-stack text, heaviest stacks first."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class LoopLagMonitor:
+    """Log the stack and task responsible for event-loop stalls."""
+
+    def __init__(self, threshold: float, interval: float = 0.05, history: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[int] = None
+        self.last_beat = time.monotonic()
+        self.current: Optional[Dict[str, Any]] = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the heartbeat on the running loop and the watchdog thread."""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stop_event.clear()
+        self.task = asyncio.create_task(self.heartbeat())
+        self.thread = threading.Thread(
+            target=self.watch, name="loop-lag-monitor", daemon=True
+        )
+        self.thread.start()
+
+    async def stop(self):
+        self.stop_event.set()
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    async def heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            LOOP_LAG.observe(lag)
+            with self.lock:
+                self.last_beat = time.monotonic()
+                stall, self.current = self.current, None
+            if stall is not None:
+                stall["duration_ms"] = round(lag * 1000, 1)
+                logger.warning(
+                    "Event loop stall ended after %.0f ms (task %s)",
+                    lag * 1000,
+                    stall["task"],
+                )
+
+    def watch(self):
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                stalled = time.monotonic() - self.last_beat - self.interval
+                if stalled < self.threshold or self.current is not None:
+                    continue
+                stall = self.current = self.capture(stalled)
+            self.stalls.append(stall)
+            logger.warning(
+                "Event loop blocked for %.0f ms in task %s:\n%s",
+                stalled * 1000,
+                stall["task"],
+                "".join(stall["stack"]),
+            )
+
+    def capture(self, stalled: float) -> Dict[str, Any]:
+        """Snapshot what the loop thread is executing right now."""
+        frame = sys._current_frames().get(self.loop_thread)
+        task = asyncio.current_task(self.loop)
+        name = None
+        if task is not None:
+            coro = task.get_coro()
+            name = f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+        return {
+            "detected_at": time.time(),
+            "blocked_ms": round(stalled * 1000, 1),
+            "duration_ms": None,  # filled in when the loop resumes
+            "task": name,
+            # Innermost frames only; the outer ones are the server machinery
+            "stack": (
+                traceback.format_stack(frame, limit=STALL_STACK_DEPTH)
+                if frame is not None
+                else []
+            ),
+        }
@@ -0,0 +1,50 @@
+"""Client address and scheme from the proxies in front of the backend.
+
+Each proxy appends the address it got the request from to
+``X-Forwarded-For``, so with ``forwarded_hops`` proxies the entry that many
+from the right was written by the outermost one and is the real client.
+Entries further left come from the client itself and are never used: taking
+the leftmost, as a trust-everything proxy setup does, lets any client pick
+its own address and with it a fresh rate-limit bucket per request.
+"""
+
+from typing import List, Optional
+
+
+def header_entries(headers, name: bytes) -> List[str]:
+    """Comma-separated entries of every ``name`` header, in order."""
+    entries = []
+    for key, value in headers:
+        if key.lower() == name:
+            entries.extend(e.strip() for e in value.decode("latin-1").split(","))
+    return [e for e in entries if e]
+
+
+def trusted_entry(entries: List[str], hops: int) -> Optional[str]:
+    """The entry the outermost of ``hops`` proxies appended, if present."""
+    if hops <= 0 or len(entries) < hops:
+        return None
+    return entries[-hops]
+
+
+class ForwardedMiddleware:
+    """Set the ASGI client and scheme from the trusted forwarded entries."""
+
+    def __init__(self, app, hops: int):
+        self.app = app
+        self.hops = hops
+
+    async def __call__(self, scope, receive, send):
+        if self.hops > 0 and scope["type"] in ("http", "websocket"):
+            headers = scope.get("headers", [])
+            host = trusted_entry(header_entries(headers, b"x-forwarded-for"), self.hops)
+            if host is not None:
+                scope = {**scope, "client": (host, 0)}
+            proto = trusted_entry(
+                header_entries(headers, b"x-forwarded-proto"), self.hops
+            )
+            if proto in ("http", "https"):
+                if scope["type"] == "websocket":
+                    proto = "wss" if proto == "https" else "ws"
+                scope = {**scope, "scheme": proto}
+        await self.app(scope, receive, send)
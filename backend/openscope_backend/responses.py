@@ -0,0 +1,159 @@
+"""JSON encoding, raw passthrough responses and response compression.
+
+orjson and brotli come from the optional ``speedups`` extra; without them
+responses fall back to the stdlib ``json`` module and gzip only.
+"""
+
+import gzip
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse, Response
+
+from .config import settings
+from .metrics import Counter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on installed extras
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on installed extras
+    brotli = None
+
+COMPRESSED_RESPONSES = Counter(
+    "openscope_compressed_responses_total",
+    "Responses compressed by the server, by encoding.",
+    ("encoding",),
+)
+COMPRESSION_BYTES_IN = Counter(
+    "openscope_compression_input_bytes_total",
+    "Response bytes before compression, by encoding.",
+    ("encoding",),
+)
+COMPRESSION_BYTES_SAVED = Counter(
+    "openscope_compression_saved_bytes_total",
+    "Bytes not sent thanks to compression, by encoding.",
+    ("encoding",),
+)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes with the fastest available decoder."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a value as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+class DefaultJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Already-encoded JSON, such as an unmodified upstream body."""
+
+    media_type = "application/json"
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding the client accepts."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    # Fast levels: these are per-request, latency matters more than ratio
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5)
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/brotli for single-message responses above a threshold.
+
+    Streaming responses (MJPEG previews, NDJSON) pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            response_headers: List[Tuple[bytes, bytes]] = list(start["headers"])
+            names = {k.lower(): v for k, v in response_headers}
+            content_type = names.get(b"content-type", b"").decode()
+            if (
+                message.get("more_body", False)
+                or b"content-encoding" in names
+                or len(body) < settings.compression_min_bytes
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            response_headers = [
+                (k, v) for k, v in response_headers if k.lower() != b"content-length"
+            ]
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            COMPRESSED_RESPONSES.inc(encoding=encoding)
+            COMPRESSION_BYTES_IN.inc(len(body), encoding=encoding)
+            COMPRESSION_BYTES_SAVED.inc(len(body) - len(compressed), encoding=encoding)
+            await send({**start, "headers": response_headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,6 +1 @@
 """Routers package."""
-
-from .api import router as api_router
-from .templates import router as templates_router
-from .github import router as github_router
-from .ai import router as ai_router
@@ -0,0 +1,84 @@
+"""Admin router - live profiling and event-loop diagnostics."""
+
+import asyncio
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ..config import settings
+from ..profiler import LoopLagMonitor, render_collapsed, sample_stacks
+
+router = APIRouter()
+
+# One profile at a time; concurrent samplers would skew each other
+profile_lock = asyncio.Lock()
+
+monitor: Optional[LoopLagMonitor] = None
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Allow the request only with the configured admin token."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(
+        x_admin_token, settings.admin_token
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def start_monitor():
+    """Start the event-loop lag monitor if a threshold is configured."""
+    global monitor
+    if settings.loop_lag_threshold_ms > 0:
+        monitor = LoopLagMonitor(settings.loop_lag_threshold_ms / 1000.0)
+        monitor.start()
+
+
+async def stop_monitor():
+    if monitor is not None:
+        await monitor.stop()
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(default=10.0, gt=0),
+    interval_ms: float = Query(default=5.0, ge=1.0, le=1000.0),
+    include_idle: bool = False,
+):
+    """Sample all thread stacks for N seconds and return collapsed stacks.
+
+    The response feeds directly into flamegraph.pl, speedscope or inferno.
+    """
+    if seconds > settings.profiler_max_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be at most {settings.profiler_max_seconds}",
+        )
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with profile_lock:
+        result = await asyncio.to_thread(
+            sample_stacks, seconds, interval_ms / 1000.0, include_idle
+        )
+    return PlainTextResponse(
+        render_collapsed(result["stacks"]),
+        headers={
+            "X-Profile-Samples": str(result["samples"]),
+            "Content-Disposition": "attachment; filename=profile.collapsed",
+        },
+    )
+
+
+@router.get("/loop-stalls", dependencies=[Depends(require_admin)])
+async def loop_stalls():
+    """Recent event-loop stalls with the stack and task that caused them."""
+    if monitor is None:
+        return {"enabled": False, "threshold_ms": None, "stalls": []}
+    return {
+        "enabled": True,
+        "threshold_ms": settings.loop_lag_threshold_ms,
+        "stalls": list(monitor.stalls),
+    }
@@ -1,12 +1,17 @@
 """AI Assistant router using Groq."""
 
 import json
-from typing import Optional, List
-from pydantic import BaseModel
+from typing import Annotated, Optional, List, Tuple
+from pydantic import BaseModel, Field
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 
-from ..config import get_settings
+from ..config import get_settings, settings as app_settings
+from ..graph import validate_graph
+from ..metrics import track_upstream
+from ..perf_lint import lint_source
+from ..processor_bench import benchmark_processor
+from .admin import require_admin
 
 router = APIRouter()
 
@@ -31,6 +36,21 @@ class GenerateProcessorRequest(BaseModel):
     kind: str  # "preprocessor" or "postprocessor"
     description: str
     existing_code: Optional[str] = None
+    benchmark: bool = False
+
+
+Height = Annotated[int, Field(ge=16, le=2160)]
+Width = Annotated[int, Field(ge=16, le=3840)]
+
+
+class BenchmarkProcessorRequest(BaseModel):
+    """Request to benchmark generated processor code."""
+
+    code: str
+    resolutions: Optional[List[Tuple[Height, Width]]] = None  # [[h, w], ...]
+    batch_sizes: Optional[List[Annotated[int, Field(ge=1, le=16)]]] = None
+    iterations: int = Field(default=5, ge=1, le=50)
+    max_frame_ms: Optional[float] = None
 
 
 class NodeSuggestion(BaseModel):
@@ -123,12 +143,13 @@ async def call_groq(messages: list, settings) -> str:
     client = AsyncGroq(api_key=settings.groq_api_key)
 
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1024,
-        )
+        async with track_upstream("groq", "chat.completions"):
+            response = await client.chat.completions.create(
+                model="llama-3.1-8b-instant",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1024,
+            )
         return response.choices[0].message.content
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -211,16 +232,47 @@ async def explain_node(node_type: str, settings=get_settings):
 
 @router.post("/fix-errors")
 async def fix_errors(errors: List[str], node_graph: dict, settings=get_settings):
-    """Fix errors in the node graph."""
+    """Fix errors in the node graph.
+
+    Structural problems are fixed locally by the graph validator. The LLM is
+    only called when problems remain that the validator cannot resolve, or
+    when the client reports errors (semantic, runtime) it did not find.
+    Client errors are matched to diagnostics by code, given alone or as a
+    ``"code: message"`` prefix, or by exact message.
+    """
+    report = validate_graph(node_graph)
+    fixable = [d for d in report.diagnostics if d.fixable]
+    found = {d.code for d in report.diagnostics} | {
+        d.message for d in report.diagnostics
+    }
+    reported = [
+        error
+        for error in errors
+        if error not in found and error.split(":", 1)[0].strip() not in found
+    ]
+    if fixable and not report.escalate and not reported:
+        return {
+            "explanation": "; ".join(d.message for d in fixable),
+            "suggestions": [fix.model_dump(exclude_none=True) for fix in report.fixes],
+            "fixed_graph": report.fixed_graph,
+            "diagnostics": [
+                d.model_dump(exclude_none=True) for d in report.diagnostics
+            ],
+            "source": "validator",
+        }
+
+    unresolved = [
+        d.message for d in report.diagnostics if d.severity == "error" and not d.fixable
+    ]
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {
             "role": "user",
             "content": f"""The following errors were detected in my node graph:
-{json.dumps(errors)}
+{json.dumps(reported + unresolved)}
 
 Current node graph:
-{json.dumps(node_graph)}
+{json.dumps(report.fixed_graph)}
 
 Please suggest how to fix these errors. Explain what nodes need to be added, removed, or modified. Respond with a JSON object containing:
 - explanation: what needs to be fixed
@@ -256,8 +308,19 @@ async def ai_status(settings=get_settings):
 
 
 @router.post("/generate-processor")
-async def generate_processor(request: GenerateProcessorRequest, settings=get_settings):
-    """Generate a custom processor using AI."""
+async def generate_processor(
+    request: GenerateProcessorRequest,
+    settings=get_settings,
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    """Generate a custom processor using AI.
+
+    ``benchmark`` runs the generated code on this host, so it needs the admin
+    token like ``/benchmark-processor``.
+    """
+    benchmark = request.benchmark and app_settings.processor_benchmark_enabled
+    if benchmark:
+        require_admin(x_admin_token)
     description = request.description
     kind = request.kind
 
@@ -300,7 +363,33 @@ async def generate_processor(request: GenerateProcessorRequest, settings=get_set
         if end > start:
             code = response[start:end].strip()
 
-    return {
+    result = {
         "code": code,
         "disclaimer": "This is AI-generated code (Beta). Please review and test before using in production.",
     }
+    try:
+        result["lint"] = lint_source(code, "process_frames.py")
+    except SyntaxError as e:
+        result["lint_error"] = str(e)
+    if benchmark:
+        result["benchmark"] = await benchmark_processor(code)
+    return result
+
+
+@router.post("/benchmark-processor", dependencies=[Depends(require_admin)])
+async def benchmark_generated_processor(request: BenchmarkProcessorRequest):
+    """Run generated process_frames code in a sandbox and report performance.
+
+    Disabled unless PROCESSOR_BENCHMARK_ENABLED is set, and admin-only, since
+    it executes untrusted code on this host.
+    """
+    if not app_settings.processor_benchmark_enabled:
+        raise HTTPException(status_code=403, detail="Processor benchmarks are disabled")
+
+    return await benchmark_processor(
+        request.code,
+        resolutions=[list(r) for r in request.resolutions or []] or None,
+        batch_sizes=request.batch_sizes,
+        iterations=request.iterations,
+        max_frame_ms=request.max_frame_ms,
+    )
@@ -1,16 +1,46 @@
 """API routers."""
 
+import asyncio
+import math
+import time
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 import httpx
 
+from ..cache import get_or_fill, invalidate, scope_key
+from ..cloud import CloudManager, default_credentials, get_manager
 from ..config import settings
+from ..ice import (
+    CONNECTION_SETUP,
+    ICE_CANDIDATES,
+    ICE_MODES,
+    ICE_UPSTREAM_CALLS,
+    IceServerCache,
+    get_batcher,
+    get_ice_cache,
+)
+from ..metrics import track_upstream
+from ..responses import RawJSONResponse, dumps, loads
+from ..routing import PATHS, InferenceRouter, get_router
+from ..schema_feed import get_feed
+from ..scheduler import get_scheduler, request_user, scheduled
+from ..sessions import Queued, Session, get_registry, session_key
+from .admin import require_admin
 
 router = APIRouter()
 
 
+class RoutingConstraints(BaseModel):
+    """Limits on where a session's inference may run."""
+
+    path: str = Field(default="auto", pattern="^(auto|local|cloud)$")
+    max_frame_latency_ms: Optional[float] = Field(default=None, gt=0)
+    max_time_to_first_frame_ms: Optional[float] = Field(default=None, gt=0)
+
+
 class PipelineLoadRequest(BaseModel):
     """Request to load a pipeline."""
 
@@ -18,6 +48,7 @@ class PipelineLoadRequest(BaseModel):
     load_params: Optional[Dict[str, Any]] = None
     connection_id: Optional[str] = None
     user_id: Optional[str] = None
+    routing: Optional[RoutingConstraints] = None
 
 
 class WebRTCOfferRequest(BaseModel):
@@ -33,6 +64,21 @@ class WebRTCOfferRequest(BaseModel):
     connection_info: Optional[Dict[str, Any]] = None
 
 
+class IceBatchRequest(BaseModel):
+    """ICE candidates gathered for one session."""
+
+    candidates: List[Dict[str, Any]]
+
+
+class ConnectionTimingRequest(BaseModel):
+    """Client-measured WebRTC connection setup."""
+
+    setup_ms: float = Field(ge=0, le=120_000)
+    ice_mode: str = "batched"
+    session_id: Optional[str] = None
+    frame_latency_ms: Optional[float] = Field(default=None, ge=0, le=60_000)
+
+
 class CloudConnectRequest(BaseModel):
     """Cloud connect request."""
 
@@ -42,23 +88,27 @@ class CloudConnectRequest(BaseModel):
 
 
 async def proxy_to_scope(
-    endpoint: str, method: str = "GET", data: Optional[Dict] = None
+    endpoint: str, method: str = "GET", data: Optional[Dict] = None, raw: bool = False
 ):
-    """Proxy request to Scope server."""
+    """Proxy request to Scope server.
+
+    With ``raw`` the upstream body is returned as bytes, unparsed.
+    """
     scope_url = settings.scope_api_url.rstrip("/")
     url = f"{scope_url}{endpoint}"
 
     try:
         async with httpx.AsyncClient(timeout=60.0) as client:
-            if method == "GET":
-                response = await client.get(url)
-            elif method == "POST":
-                response = await client.post(url, json=data)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-
-            response.raise_for_status()
-            return response.json()
+            async with track_upstream("scope", f"{method} {endpoint}"):
+                if method == "GET":
+                    response = await client.get(url)
+                elif method == "POST":
+                    response = await client.post(url, json=data)
+                else:
+                    raise ValueError(f"Unsupported method: {method}")
+
+                response.raise_for_status()
+            return response.content if raw else response.json()
     except httpx.ConnectError:
         raise HTTPException(
             status_code=503,
@@ -71,6 +121,38 @@ async def proxy_to_scope(
         )
 
 
+async def admit_session(
+    connection_id: Optional[str], user_id: Optional[str], http_request: Request
+) -> Session:
+    """Take a streaming slot for the client, or 503 with its queue position."""
+    client = http_request.client.host if http_request.client else None
+    key = session_key(connection_id, user_id, client)
+    try:
+        return await get_registry().acquire(
+            key, user_id, settings.session_queue_wait, client
+        )
+    except Queued as e:
+        # Retry well within the claim timeout so the place is kept
+        retry_after = max(
+            1, math.ceil(min(e.eta_seconds, settings.session_claim_timeout / 2))
+        )
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "message": "Scope is at capacity; you are in the queue",
+                "position": e.position,
+                "eta_seconds": round(e.eta_seconds, 1),
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def release_unstarted(session: Session):
+    """Give back a slot whose load or offer failed before any stream began."""
+    if session.scope_session_id is None:
+        get_registry().release(session.key)
+
+
 @router.get("/info")
 async def get_info():
     """Get API info."""
@@ -84,50 +166,198 @@ async def get_info():
 @router.get("/scope/health")
 async def scope_health():
     """Get Scope server health status."""
-    return await proxy_to_scope("/health")
+    return RawJSONResponse(await proxy_to_scope("/health", raw=True))
 
 
 @router.get("/scope/pipelines")
 async def get_scope_pipelines():
     """Get available pipelines from Scope server."""
-    return await proxy_to_scope("/api/v1/pipelines/schemas")
+    body = await get_or_fill(
+        scope_key("schemas"),
+        settings.schema_cache_ttl,
+        lambda: proxy_to_scope("/api/v1/pipelines/schemas", raw=True),
+    )
+    get_feed().update(body)
+    return RawJSONResponse(body)
 
 
 @router.get("/scope/pipeline/status")
 async def get_pipeline_status():
     """Get current pipeline status from Scope server."""
-    return await proxy_to_scope("/api/v1/pipeline/status")
+    body = await get_or_fill(
+        scope_key("status"),
+        settings.status_cache_ttl,
+        lambda: proxy_to_scope("/api/v1/pipeline/status", raw=True),
+    )
+    # Frontends poll this while loading, which times loads more closely
+    inference_router().observe_status(loads(body))
+    return RawJSONResponse(body)
 
 
-@router.post("/scope/pipeline/load")
-async def load_pipeline(request: PipelineLoadRequest):
-    """Load a pipeline on the Scope server."""
-    return await proxy_to_scope(
-        "/api/v1/pipeline/load",
-        method="POST",
-        data=request.model_dump(exclude_none=True),
+def inference_router() -> InferenceRouter:
+    return get_router(
+        proxy_to_scope,
+        lambda: sum(get_scheduler().queued.values()),
+        lambda: bool(default_credentials().get("app_id")),
+        lambda status: cloud_manager().publish(status),
+    )
+
+
+async def route_session(request: PipelineLoadRequest, session: Session) -> Dict:
+    """Pick local or cloud inference for the session and prepare that path.
+
+    Sets ``remoteInference`` in the load params to the chosen path; a cloud
+    choice that cannot connect falls back to local.
+    """
+    router = inference_router()
+    load_params = request.load_params or {}
+    preferred = None
+    if "remoteInference" in load_params:
+        preferred = "cloud" if load_params["remoteInference"] else "local"
+    constraints = (request.routing or RoutingConstraints()).model_dump(
+        exclude_none=True
     )
+    decision = router.decide(request.pipeline_ids, constraints, preferred)
+
+    if decision["path"] == "cloud":
+        cloud = router.paths["cloud"]
+        start = time.monotonic()
+        try:
+            await cloud_manager().connect(default_credentials(), trigger="routing")
+        except HTTPException:
+            decision = router.fall_back(decision, "local", "cloud_connect_failed")
+        else:
+            if not cloud.connected:
+                cloud.record("connect", (time.monotonic() - start) * 1000.0)
+                cloud.connected = True
+
+    request.load_params = {
+        **load_params,
+        "remoteInference": decision["path"] == "cloud",
+    }
+    session.route = decision["path"]
+    return decision
+
+
+@router.post("/scope/pipeline/load")
+async def load_pipeline(request: PipelineLoadRequest, http_request: Request):
+    """Load a pipeline on the Scope server.
+
+    Takes a streaming slot first; the WebRTC offer that follows reuses it.
+    The session is then routed to local or cloud inference, and loads are
+    fair-queued per user with the other expensive operations. The response
+    carries the routing decision.
+    """
+    session = await admit_session(request.connection_id, request.user_id, http_request)
+    try:
+        decision = await route_session(request, session)
+        if decision["path"] == "cloud":
+            cloud_manager().touch()
+        async with scheduled("pipeline_load", request_user(http_request)):
+            try:
+                result = await proxy_to_scope(
+                    "/api/v1/pipeline/load",
+                    method="POST",
+                    data=request.model_dump(exclude_none=True, exclude={"routing"}),
+                )
+            finally:
+                await invalidate(scope_key("status"))
+    except BaseException:
+        release_unstarted(session)
+        raise
+    inference_router().load_started(decision["path"], request.pipeline_ids)
+    if isinstance(result, dict):
+        return {**result, "routing": decision}
+    return result
+
+
+@router.get("/scope/routing")
+async def routing_status():
+    """Measured state of both inference paths and recent routing decisions."""
+    return inference_router().to_dict()
+
+
+def ice_server_cache() -> IceServerCache:
+    return get_ice_cache(lambda: proxy_to_scope("/api/v1/webrtc/ice-servers", raw=True))
 
 
 @router.get("/scope/webrtc/ice-servers")
 async def get_ice_servers():
-    """Get ICE servers for WebRTC."""
-    return await proxy_to_scope("/api/v1/webrtc/ice-servers")
+    """Get ICE servers for WebRTC.
+
+    Served from a cache that lives as long as the TURN credentials; browsers
+    may reuse the response until the backend would refresh it.
+    """
+    cache = ice_server_cache()
+    body = await cache.get()
+    max_age = max(0, int(cache.refresh_at - time.time()))
+    return RawJSONResponse(
+        body, headers={"Cache-Control": f"private, max-age={max_age}"}
+    )
+
+
+async def forward_offer(request: WebRTCOfferRequest, http_request: Request) -> Any:
+    """Admit the client, then send its offer to Scope."""
+    session = await admit_session(request.connection_id, request.user_id, http_request)
+    if session.route == "cloud":
+        cloud_manager().touch()
+    try:
+        answer = await proxy_to_scope(
+            "/api/v1/webrtc/offer",
+            method="POST",
+            data=request.model_dump(exclude_none=True),
+        )
+        if not isinstance(answer, dict):
+            raise HTTPException(
+                status_code=502, detail="Scope returned an invalid WebRTC answer"
+            )
+    except BaseException:
+        release_unstarted(session)
+        raise
+    if answer.get("sessionId"):
+        session.scope_session_id = answer["sessionId"]
+    return answer
 
 
 @router.post("/scope/webrtc/offer")
-async def send_webrtc_offer(request: WebRTCOfferRequest):
-    """Send WebRTC offer to Scope server."""
-    return await proxy_to_scope(
-        "/api/v1/webrtc/offer",
-        method="POST",
-        data=request.model_dump(exclude_none=True),
-    )
+async def send_webrtc_offer(request: WebRTCOfferRequest, http_request: Request):
+    """Send WebRTC offer to Scope server once the client has a streaming slot."""
+    return await forward_offer(request, http_request)
+
+
+@router.post("/scope/webrtc/connect")
+async def connect_webrtc(request: WebRTCOfferRequest, http_request: Request):
+    """Offer and ICE config in one round trip.
+
+    Returns Scope's answer plus ``iceServers`` from the cache and how many
+    seconds they may be reused (``iceServersTtl``). Clients that kept the
+    config from a previous call can create their peer connection straight
+    away and skip ``/webrtc/ice-servers``; when the cache is warm the only
+    upstream call is the offer itself.
+
+    The ICE config is fetched before the offer, so a failure there cannot
+    leave a Scope session and its slot behind.
+    """
+    cache = ice_server_cache()
+    ice_config = loads(await cache.get())
+    answer = await forward_offer(request, http_request)
+    return {
+        **answer,
+        "iceServers": (
+            ice_config.get("iceServers", []) if isinstance(ice_config, dict) else []
+        ),
+        "iceServersTtl": max(0, int(cache.refresh_at - time.time())),
+    }
 
 
 @router.post("/scope/webrtc/ice")
 async def send_ice_candidates(session_id: str, candidate: Dict):
     """Send ICE candidates to Scope server."""
+    session = get_registry().find(session_id)
+    if session is not None:
+        session.touch()
+    ICE_CANDIDATES.inc(endpoint="single")
+    ICE_UPSTREAM_CALLS.inc(endpoint="single")
     return await proxy_to_scope(
         f"/api/v1/webrtc/ice?session_id={session_id}",
         method="POST",
@@ -135,21 +365,165 @@ async def send_ice_candidates(session_id: str, candidate: Dict):
     )
 
 
+@router.post("/scope/webrtc/ice/batch")
+async def send_ice_candidate_batch(session_id: str, request: IceBatchRequest):
+    """Send an array of ICE candidates in one request.
+
+    Requests for the same session within ICE_BATCH_WINDOW_MS are merged and
+    delivered to Scope together.
+    """
+    session = get_registry().find(session_id)
+    if session is not None:
+        session.touch()
+    if not request.candidates:
+        return {"forwarded": 0, "upstream_calls": 0}
+    ICE_CANDIDATES.inc(len(request.candidates), endpoint="batch")
+
+    async def forward(candidates: List[Dict[str, Any]]) -> int:
+        endpoint = f"/api/v1/webrtc/ice?session_id={session_id}"
+        if settings.ice_upstream_batch:
+            calls = 1
+            await proxy_to_scope(endpoint, "POST", {"candidates": candidates})
+        else:
+            # Scope takes one candidate per call: fan out here, not from the client
+            calls = len(candidates)
+            await asyncio.gather(
+                *(proxy_to_scope(endpoint, "POST", c) for c in candidates)
+            )
+        ICE_UPSTREAM_CALLS.inc(calls, endpoint="batch")
+        return calls
+
+    return await get_batcher(session_id, forward).add(request.candidates)
+
+
+@router.post("/scope/webrtc/timing", status_code=204)
+async def report_connection_timing(request: ConnectionTimingRequest):
+    """Record how long the client took from offer to ICE connected."""
+    if request.ice_mode not in ICE_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"ice_mode must be one of {list(ICE_MODES)}"
+        )
+    CONNECTION_SETUP.observe(request.setup_ms / 1000.0, ice_mode=request.ice_mode)
+    session = get_registry().find(request.session_id) if request.session_id else None
+    if session is not None and session.route in PATHS:
+        inference_router().report(
+            session.route, request.setup_ms, request.frame_latency_ms
+        )
+
+
+@router.get("/scope/sessions", dependencies=[Depends(require_admin)])
+async def list_sessions():
+    """Active streaming sessions and the admission queue."""
+    registry = get_registry()
+    registry.reap()
+    return registry.to_dict()
+
+
+@router.get("/scope/sessions/{key}")
+async def get_session(key: str):
+    """Admission state for a session key, with queue position and ETA."""
+    return get_registry().status(key)
+
+
+@router.post("/scope/sessions/{key}/heartbeat")
+async def session_heartbeat(key: str):
+    """Keep a streaming session from being reaped as idle."""
+    session = get_registry().sessions.get(key)
+    if session is None:
+        raise HTTPException(status_code=404, detail="No active session")
+    session.touch()
+    return session.to_dict()
+
+
+@router.delete("/scope/sessions/{key}")
+async def end_session(
+    key: str,
+    http_request: Request,
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    """Release a streaming slot (or leave the queue).
+
+    Only the client that took the slot may release it, unless the admin
+    token is sent.
+    """
+    registry = get_registry()
+    holder = registry.holder(key)
+    client = http_request.client.host if http_request.client else None
+    if holder is not None and holder != client:
+        require_admin(x_admin_token)
+    released = registry.release(key)
+    return {"released": released}
+
+
+@router.get("/scope/scheduler")
+async def scheduler_status():
+    """Per-user queue depth and remaining tokens for expensive operations."""
+    return get_scheduler().to_dict()
+
+
+def cloud_manager() -> CloudManager:
+    return get_manager(proxy_to_scope, cloud_sessions_running)
+
+
+def cloud_sessions_running() -> bool:
+    """Whether a live (heartbeating) session was routed to the cloud."""
+    return any(s.route == "cloud" for s in get_registry().sessions.values())
+
+
 @router.get("/scope/cloud/status")
 async def get_cloud_status():
-    """Get cloud connection status."""
-    return await proxy_to_scope("/api/v1/cloud/status")
+    """Get cloud connection status.
+
+    Served from the cloud manager's last poll when it is recent, so the
+    frontend polling this does not reach Scope each time.
+    """
+    status = cloud_manager().fresh_status()
+    if status is not None:
+        return status
+    body = await get_or_fill(
+        scope_key("cloud_status"),
+        settings.status_cache_ttl,
+        lambda: proxy_to_scope("/api/v1/cloud/status", raw=True),
+    )
+    return RawJSONResponse(body)
+
+
+@router.get("/scope/cloud/events")
+async def cloud_events(request: Request):
+    """Server-sent events with the cloud status whenever it changes."""
+    manager = cloud_manager()
+    queue = manager.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    status = await asyncio.wait_for(queue.get(), 15.0)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"event: status\ndata: " + dumps(status) + b"\n\n"
+        finally:
+            manager.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/scope/cloud/connect")
 async def connect_to_cloud(request: CloudConnectRequest):
     """Connect to cloud for remote GPU inference.
 
-    Credentials are optional - if not provided, the request is still sent to Scope server
-    which will determine if cloud connection is available.
+    Credentials are optional - if not provided, the configured ones are used
+    and Scope determines if cloud connection is available. Returns at once
+    when the warm standby connection is already up; concurrent calls share
+    one upstream attempt.
     """
-    # Build request data - only include credentials if provided
-    data = {}
+    # Build request data - request values override configured credentials
+    data = default_credentials()
     if request.app_id:
         data["app_id"] = request.app_id
     if request.api_key:
@@ -158,7 +532,7 @@ async def connect_to_cloud(request: CloudConnectRequest):
     data["user_id"] = request.user_id or settings.scope_cloud_user_id
 
     try:
-        return await proxy_to_scope("/api/v1/cloud/connect", method="POST", data=data)
+        return await cloud_manager().connect(data)
     except HTTPException as e:
         # If cloud connection fails (e.g., no credentials), that's okay - continue without it
         if e.status_code == 400:
@@ -171,12 +545,14 @@ async def connect_to_cloud(request: CloudConnectRequest):
                 "detail": "Cloud credentials not configured - running in local mode",
             }
         raise
+    finally:
+        await invalidate(scope_key("cloud_status"))
 
 
 @router.post("/scope/cloud/disconnect")
 async def disconnect_from_cloud():
-    """Disconnect from cloud."""
-    return await proxy_to_scope(
-        "/api/v1/cloud/disconnect",
-        method="POST",
-    )
+    """Disconnect from cloud; the warm standby stays down until next used."""
+    try:
+        return await cloud_manager().disconnect()
+    finally:
+        await invalidate(scope_key("cloud_status"))
@@ -0,0 +1,177 @@
+"""Batch router - several API calls in one round trip.
+
+Sub-requests are dispatched in-process through the application itself, so
+they pass the same routing, validation and middleware as direct calls. They
+run concurrently, each under its own timeout; a failed or timed-out item is
+reported in its result and does not affect the others.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+import httpx
+
+from ..config import settings
+from ..metrics import Counter
+from ..responses import RawJSONResponse, dumps
+
+router = APIRouter()
+
+BATCH_ITEMS = Counter(
+    "openscope_batch_items_total",
+    "Batch sub-requests by outcome (ok, error or timeout).",
+    ("outcome",),
+)
+
+# Headers of the batch request passed on to every item
+FORWARDED_HEADERS = ("authorization", "x-admin-token", "x-user-id")
+
+
+class BatchItem(BaseModel):
+    """One sub-request."""
+
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str = Field(description="Path under this server, e.g. /api/scope/plugins")
+    body: Optional[Any] = None
+    headers: Dict[str, str] = {}
+    timeout: Optional[float] = Field(default=None, gt=0)
+
+    @field_validator("method")
+    @classmethod
+    def check_method(cls, method: str) -> str:
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+            raise ValueError(f"Unsupported method: {method}")
+        return method
+
+    @field_validator("path")
+    @classmethod
+    def check_path(cls, path: str) -> str:
+        if not path.startswith("/") or path.startswith("//"):
+            raise ValueError("path must be relative to this server")
+        if path.split("?")[0].rstrip("/") == "/api/batch":
+            raise ValueError("batches cannot be nested")
+        return path
+
+
+class BatchRequest(BaseModel):
+    """Sub-requests to run concurrently.
+
+    With ``stream`` the response is NDJSON, one line per item in the order
+    they finish; otherwise one JSON object with every result in request order.
+    """
+
+    requests: List[BatchItem]
+    stream: bool = False
+
+    @field_validator("requests")
+    @classmethod
+    def check_size(cls, requests: List[BatchItem]) -> List[BatchItem]:
+        if len(requests) > settings.batch_max_items:
+            raise ValueError(f"At most {settings.batch_max_items} requests per batch")
+        return requests
+
+
+def encode_result(
+    item_id: str, status: int, elapsed: float, content_type: str, body: bytes
+) -> bytes:
+    """One result as JSON bytes; JSON bodies are embedded without re-parsing."""
+    head = dumps({"id": item_id, "status": status, "ms": round(elapsed * 1000, 1)})
+    if content_type.startswith("application/json") and body:
+        value = body
+    elif body:
+        value = dumps(body.decode("utf-8", "replace"))
+    else:
+        value = b"null"
+    return head[:-1] + b',"body":' + value + b"}"
+
+
+async def run_item(
+    client: httpx.AsyncClient, index: int, item: BatchItem, headers: Dict[str, str]
+) -> bytes:
+    item_id = item.id if item.id is not None else str(index)
+    timeout = min(
+        item.timeout or settings.batch_item_timeout, settings.batch_item_timeout
+    )
+    start = time.monotonic()
+    try:
+        response = await asyncio.wait_for(
+            client.request(
+                item.method,
+                item.path,
+                json=item.body,
+                headers={**headers, **item.headers},
+            ),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        BATCH_ITEMS.inc(outcome="timeout")
+        detail = dumps({"detail": f"Timed out after {timeout:g}s"})
+        return encode_result(
+            item_id, 504, time.monotonic() - start, "application/json", detail
+        )
+    except Exception as e:
+        BATCH_ITEMS.inc(outcome="error")
+        detail = dumps({"detail": f"Request failed: {e}"})
+        return encode_result(
+            item_id, 500, time.monotonic() - start, "application/json", detail
+        )
+    BATCH_ITEMS.inc(outcome="ok" if response.status_code < 400 else "error")
+    return encode_result(
+        item_id,
+        response.status_code,
+        time.monotonic() - start,
+        response.headers.get("content-type", ""),
+        response.content,
+    )
+
+
+@router.post("/batch")
+async def run_batch(batch: BatchRequest, request: Request):
+    """Run several API calls concurrently and return all of their results.
+
+    Each result is ``{"id", "status", "ms", "body"}``. Items are isolated: an
+    error or timeout in one becomes that item's status (504 for timeouts)
+    while the others complete normally.
+    """
+    headers = {
+        name: request.headers[name]
+        for name in FORWARDED_HEADERS
+        if name in request.headers
+    }
+    # Items are not compressed; the batch response as a whole may be. They
+    # keep the caller's address for per-client admission and scheduling.
+    caller = tuple(request.client or ("unknown", 0))
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=request.app, client=caller),
+        base_url="http://batch",
+        headers={"accept-encoding": "identity"},
+    )
+    tasks = [
+        asyncio.create_task(run_item(client, index, item, headers))
+        for index, item in enumerate(batch.requests)
+    ]
+
+    if not batch.stream:
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            await client.aclose()
+        return RawJSONResponse(b'{"results":[' + b",".join(results) + b"]}")
+
+    async def lines():
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished + b"\n"
+        finally:
+            # Client gone: stop the items still running
+            for task in tasks:
+                task.cancel()
+            await client.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
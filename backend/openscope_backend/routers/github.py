@@ -1,19 +1,30 @@
 """GitHub integration router."""
 
+import asyncio
 import base64
 import os
 from typing import Optional
 from pydantic import BaseModel
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from github import Github
-from github.GithubException import GithubException
 
+from ..cancellation import raise_if_disconnected
 from ..config import get_settings
+from ..metrics import track_upstream
 
 router = APIRouter()
 
 
+def load_github():
+    """Import PyGithub on first use; it is slow to import and rarely needed."""
+    try:
+        from github import Github
+        from github.GithubException import GithubException
+    except ImportError:
+        raise HTTPException(status_code=503, detail="PyGithub not installed")
+    return Github, GithubException
+
+
 class GitHubConfig(BaseModel):
     """GitHub configuration."""
 
@@ -47,34 +58,38 @@ async def create_repo(request: CreateRepoRequest, settings=get_settings):
     if not settings.github_token:
         raise HTTPException(status_code=401, detail="GitHub token not configured")
 
+    Github, GithubException = load_github()
+
     try:
         g = Github(settings.github_token)
-        user = g.get_user()
-        repo = user.create_repo(
-            request.name,
-            description=request.description,
-            private=request.private,
-            auto_init=request.auto_init,
-        )
+        with track_upstream("github", "create_repo"):
+            user = g.get_user()
+            repo = user.create_repo(
+                request.name,
+                description=request.description,
+                private=request.private,
+                auto_init=request.auto_init,
+            )
         return {"url": repo.html_url, "name": repo.name}
     except GithubException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/push")
-async def push_plugin(request: PushPluginRequest, settings=get_settings):
-    """Push plugin files to GitHub."""
-    if not settings.github_token:
-        raise HTTPException(status_code=401, detail="GitHub token not configured")
+def push_files(g, request: PushPluginRequest, GithubException) -> str:
+    """Create or update the repository and its files; returns its URL.
 
-    try:
-        g = Github(settings.github_token)
+    Runs in a worker thread. Stops between files once the client has gone;
+    every file is written with create-or-update, so a retry completes it.
+    """
+    with track_upstream("github", "get_user"):
         user = g.get_user()
 
-        # Create or get repository
-        try:
+    # Create or get repository
+    try:
+        with track_upstream("github", "get_repo"):
             repo = user.get_repo(request.repo_name)
-        except GithubException:
+    except GithubException:
+        with track_upstream("github", "create_repo"):
             repo = user.create_repo(
                 request.repo_name,
                 description=request.description,
@@ -82,34 +97,47 @@ async def push_plugin(request: PushPluginRequest, settings=get_settings):
                 auto_init=True,
             )
 
-        # Get default branch
-        branch = repo.default_branch
+    # Get default branch
+    branch = repo.default_branch
 
-        # Create commit
-        contents = []
-        for filename, content in request.files.items():
-            file_content = base64.b64encode(content.encode()).decode()
-            try:
+    # Create commit
+    for filename, content in request.files.items():
+        raise_if_disconnected()
+        file_content = base64.b64encode(content.encode()).decode()
+        try:
+            with track_upstream("github", "get_contents"):
                 existing = repo.get_contents(filename, ref=branch)
-                contents.append(
-                    repo.update_file(
-                        existing.path,
-                        f"Update {filename}",
-                        file_content,
-                        existing.sha,
-                        branch=branch,
-                    )
+            with track_upstream("github", "update_file"):
+                repo.update_file(
+                    existing.path,
+                    f"Update {filename}",
+                    file_content,
+                    existing.sha,
+                    branch=branch,
                 )
-            except GithubException:
-                contents.append(
-                    repo.create_file(
-                        filename, f"Add {filename}", file_content, branch=branch
-                    )
+        except GithubException:
+            with track_upstream("github", "create_file"):
+                repo.create_file(
+                    filename, f"Add {filename}", file_content, branch=branch
                 )
+    return repo.html_url
+
+
+@router.post("/push")
+async def push_plugin(request: PushPluginRequest, settings=get_settings):
+    """Push plugin files to GitHub."""
+    if not settings.github_token:
+        raise HTTPException(status_code=401, detail="GitHub token not configured")
+
+    Github, GithubException = load_github()
 
+    try:
+        g = Github(settings.github_token)
+        # PyGithub blocks; keep it off the event loop
+        url = await asyncio.to_thread(push_files, g, request, GithubException)
         return {
             "success": True,
-            "url": repo.html_url,
+            "url": url,
             "files": list(request.files.keys()),
         }
     except GithubException as e:
@@ -122,13 +150,17 @@ async def list_repos(settings=get_settings):
     if not settings.github_token:
         raise HTTPException(status_code=401, detail="GitHub token not configured")
 
+    Github, GithubException = load_github()
+
     try:
         g = Github(settings.github_token)
-        user = g.get_user()
-        repos = user.get_repos()
-        return [
-            {"name": r.name, "url": r.html_url, "description": r.description}
-            for r in repos
-        ]
+        # The repo list is paginated lazily, so time the iteration too
+        with track_upstream("github", "list_repos"):
+            user = g.get_user()
+            repos = user.get_repos()
+            return [
+                {"name": r.name, "url": r.html_url, "description": r.description}
+                for r in repos
+            ]
     except GithubException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,27 @@
+"""Graph router - local structural validation of node graphs."""
+
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+from fastapi import APIRouter
+
+from ..graph import GraphReport, validate_graph
+
+router = APIRouter()
+
+
+class ValidateGraphRequest(BaseModel):
+    """Request to validate a node graph."""
+
+    nodes: List[Dict[str, Any]]
+    edges: Optional[List[Dict[str, Any]]] = None
+
+
+@router.post("/validate", response_model=GraphReport)
+async def validate(request: ValidateGraphRequest):
+    """Validate a node graph and return diagnostics with deterministic fixes.
+
+    Checks cycles, dangling edges, input types, missing outputs, reachability
+    and parameter ranges without calling the LLM.
+    """
+    return validate_graph({"nodes": request.nodes, "edges": request.edges or []})
@@ -0,0 +1,34 @@
+"""Lint router - static performance checks for pipeline code."""
+
+from typing import List
+from pydantic import BaseModel
+
+from fastapi import APIRouter, HTTPException
+
+from ..perf_lint import Finding, lint_source
+
+router = APIRouter()
+
+
+class LintRequest(BaseModel):
+    """Request to lint pipeline or processor source."""
+
+    code: str
+    filename: str = "pipeline.py"
+
+
+class LintResponse(BaseModel):
+    """Performance findings for a source file."""
+
+    filename: str
+    findings: List[Finding]
+
+
+@router.post("/", response_model=LintResponse)
+async def lint_code(request: LintRequest):
+    """Flag hot-path anti-patterns in __call__/process_frames and their helpers."""
+    try:
+        findings = lint_source(request.code, request.filename)
+    except SyntaxError as e:
+        raise HTTPException(status_code=400, detail=f"Syntax error: {e}")
+    return LintResponse(filename=request.filename, findings=findings)
@@ -1,13 +1,19 @@
 """Pipelines router for fetching available pipelines from Scope server."""
 
+import asyncio
 import os
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 import httpx
 
+from ..cache import get_or_fill, scope_key
 from ..config import settings
+from ..metrics import track_upstream
+from ..responses import DefaultJSONResponse, dumps, loads
+from ..schema_feed import get_feed
 
 router = APIRouter()
 
@@ -54,6 +60,29 @@ def is_demo_mode() -> bool:
     return os.getenv("DEMO_MODE", "false").lower() == "true"
 
 
+async def fetch_schemas(scope_url: str) -> Dict[str, Any]:
+    """Fetch pipeline schemas, filled once per host through the cache.
+
+    The cache holds the raw upstream body, shared with the passthrough
+    ``/scope/pipelines`` route.
+    """
+
+    async def fill():
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            async with track_upstream("scope", "GET /api/v1/pipelines/schemas"):
+                response = await client.get(
+                    f"{scope_url.rstrip('/')}/api/v1/pipelines/schemas"
+                )
+                response.raise_for_status()
+            return response.content
+
+    body = await get_or_fill(
+        scope_key("schemas", scope_url), settings.schema_cache_ttl, fill
+    )
+    get_feed(scope_url).update(body)
+    return loads(body)
+
+
 @router.get("/pipelines", response_model=PipelinesResponse)
 async def get_pipelines(scope_url: Optional[str] = None):
     """Fetch available pipelines from a Scope server.
@@ -70,17 +99,11 @@ async def get_pipelines(scope_url: Optional[str] = None):
     if scope_url is None:
         scope_url = settings.scope_api_url
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{scope_url.rstrip('/')}/api/v1/pipelines/schemas"
-            )
-            response.raise_for_status()
-            data = response.json()
+        data = await fetch_schemas(scope_url)
+        pipelines = data.get("pipelines", {})
 
-            return PipelinesResponse(
-                pipelines=data.get("pipelines", {}),
-                count=len(data.get("pipelines", {})),
-            )
+        # Schemas are arbitrary JSON; skip re-validating them per request
+        return DefaultJSONResponse({"pipelines": pipelines, "count": len(pipelines)})
     except httpx.ConnectError:
         raise HTTPException(
             status_code=503,
@@ -108,29 +131,98 @@ async def list_pipelines_simple(
     if scope_url is None:
         scope_url = settings.scope_api_url
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{scope_url.rstrip('/')}/api/v1/pipelines/schemas"
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            pipelines = []
-            for pipeline_id, schema in data.get("pipelines", {}).items():
-                pipelines.append(
-                    PipelineInfo(
-                        pipeline_id=pipeline_id,
-                        pipeline_name=schema.get("pipeline_name", pipeline_id),
-                        pipeline_description=schema.get("pipeline_description"),
-                        supported_modes=schema.get("supported_modes", []),
-                        default_mode=schema.get("default_mode"),
-                        plugin_name=schema.get("plugin_name"),
-                        usage=schema.get("usage", []),
-                    )
+        data = await fetch_schemas(scope_url)
+
+        pipelines = []
+        for pipeline_id, schema in data.get("pipelines", {}).items():
+            pipelines.append(
+                PipelineInfo(
+                    pipeline_id=pipeline_id,
+                    pipeline_name=schema.get("pipeline_name", pipeline_id),
+                    pipeline_description=schema.get("pipeline_description"),
+                    supported_modes=schema.get("supported_modes", []),
+                    default_mode=schema.get("default_mode"),
+                    plugin_name=schema.get("plugin_name"),
+                    usage=schema.get("usage", []),
                 )
+            )
 
-            return pipelines
+        return pipelines
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch pipelines: {str(e)}"
         )
+
+
+async def refresh_feed(scope_url: str):
+    """Bring the change feed up to date with the (cached) schemas document."""
+    if is_demo_mode():
+        get_feed(scope_url).update(dumps({"pipelines": DEMO_PIPELINES}))
+        return
+    try:
+        await fetch_schemas(scope_url)
+    except httpx.ConnectError:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Cannot connect to Scope server at {scope_url}. Make sure Scope is running.",
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Error fetching pipelines: {e.response.text}",
+        )
+
+
+@router.get("/pipelines/changes")
+async def pipeline_changes(
+    since: Optional[str] = None, scope_url: Optional[str] = None
+):
+    """Pipelines added, modified or removed since feed version ``since``.
+
+    Without ``since`` (or with one the feed can no longer diff from) the
+    response is a reset carrying every pipeline. Keep ``version`` from the
+    response for the next call.
+    """
+    scope_url = scope_url or settings.scope_api_url
+    await refresh_feed(scope_url)
+    return get_feed(scope_url).since(since)
+
+
+@router.get("/pipelines/changes/stream")
+async def pipeline_change_stream(
+    request: Request, since: Optional[str] = None, scope_url: Optional[str] = None
+):
+    """Server-sent events with each schema change as it is seen.
+
+    Each event carries the same body as ``/pipelines/changes`` and its
+    version as the event id, so a reconnecting EventSource resumes from
+    ``Last-Event-ID``.
+    """
+    scope_url = scope_url or settings.scope_api_url
+    feed = get_feed(scope_url)
+    version = request.headers.get("last-event-id") or since
+    await refresh_feed(scope_url)
+
+    async def events():
+        nonlocal version
+        while not await request.is_disconnected():
+            if version != feed.token:
+                changes = feed.since(version)
+                version = changes["version"]
+                yield (
+                    f"id: {version}\nevent: changes\ndata: ".encode()
+                    + dumps(changes)
+                    + b"\n\n"
+                )
+            elif not await feed.wait(version, settings.schema_feed_poll_interval):
+                try:
+                    await refresh_feed(scope_url)
+                except HTTPException:
+                    pass  # Scope restarting; keep the stream and try again
+                yield b": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
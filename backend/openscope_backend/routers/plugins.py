@@ -1,11 +1,25 @@
 """Plugin management router - handles installing/uninstalling Scope plugins."""
 
+import asyncio
+import html
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
 import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse
 
 from pydantic import BaseModel
 
+from .. import artifacts
+from ..cache import get_or_fill, invalidate, scope_key
+from ..cancellation import non_cancellable
 from ..config import settings
+from ..metrics import track_upstream
+from ..scheduler import request_user, scheduled
+from .admin import require_admin
 
 router = APIRouter()
 
@@ -25,75 +39,111 @@ class PluginListResponse(BaseModel):
     total: int
 
 
+async def fetch_plugins() -> dict:
+    """Installed plugins from Scope, filled once per host through the cache."""
+
+    async def fill():
+        async with httpx.AsyncClient() as client:
+            async with track_upstream("scope", "GET /api/v1/plugins") as upstream:
+                response = await client.get(f"{settings.scope_api_url}/api/v1/plugins")
+                upstream.record_status(response.status_code)
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code, detail="Failed to fetch plugins"
+            )
+        return response.json()
+
+    return await get_or_fill(scope_key("plugins"), settings.plugins_cache_ttl, fill)
+
+
+async def invalidate_plugins():
+    """Installing or removing a plugin changes the plugin and pipeline lists."""
+    await invalidate(scope_key("plugins"), scope_key("schemas"))
+
+
 @router.get("/plugins", response_model=PluginListResponse)
 async def list_plugins():
     """List all installed plugins from Scope server."""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{settings.scope_api_url}/api/v1/plugins")
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code, detail="Failed to fetch plugins"
-                )
-            data = response.json()
-
-            plugins = []
-            for p in data.get("plugins", []):
-                pipelines = [pl["pipeline_id"] for pl in p.get("pipelines", [])]
-                plugins.append(
-                    PluginInfo(
-                        name=p["name"],
-                        version=p.get("version"),
-                        pipelines=pipelines,
-                    )
+    try:
+        data = await fetch_plugins()
+
+        plugins = []
+        for p in data.get("plugins", []):
+            pipelines = [pl["pipeline_id"] for pl in p.get("pipelines", [])]
+            plugins.append(
+                PluginInfo(
+                    name=p["name"],
+                    version=p.get("version"),
+                    pipelines=pipelines,
                 )
+            )
 
-            return PluginListResponse(plugins=plugins, total=data.get("total", 0))
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="Scope server not available")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        return PluginListResponse(plugins=plugins, total=data.get("total", 0))
+    except httpx.ConnectError:
+        raise HTTPException(status_code=503, detail="Scope server not available")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/plugins")
-async def install_plugin(request: InstallPluginRequest):
+async def install_plugin(request: InstallPluginRequest, http_request: Request):
     """Install a plugin on the Scope server."""
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        try:
-            response = await client.post(
-                f"{settings.scope_api_url}/api/v1/plugins",
-                json={"package": request.package},
-            )
-            if response.status_code != 200:
+    # Once admitted, see it through even if the client leaves
+    async with scheduled(
+        "plugin_install", request_user(http_request)
+    ), non_cancellable():
+        async with httpx.AsyncClient(timeout=300.0) as client:
+            try:
+                async with track_upstream("scope", "POST /api/v1/plugins") as upstream:
+                    response = await client.post(
+                        f"{settings.scope_api_url}/api/v1/plugins",
+                        json={"package": request.package},
+                    )
+                    upstream.record_status(response.status_code)
+                if response.status_code != 200:
+                    raise HTTPException(
+                        status_code=response.status_code,
+                        detail=f"Failed to install plugin: {response.text}",
+                    )
+                await invalidate_plugins()
+                return response.json()
+            except httpx.ConnectError:
                 raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to install plugin: {response.text}",
+                    status_code=503, detail="Scope server not available"
                 )
-            return response.json()
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="Scope server not available")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/plugins/{plugin_name}")
-async def uninstall_plugin(plugin_name: str):
+async def uninstall_plugin(plugin_name: str, http_request: Request):
     """Uninstall a plugin from the Scope server."""
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        try:
-            response = await client.delete(
-                f"{settings.scope_api_url}/api/v1/plugins/{plugin_name}"
-            )
-            if response.status_code != 200:
+    # Once admitted, see it through even if the client leaves
+    async with scheduled(
+        "plugin_uninstall", request_user(http_request)
+    ), non_cancellable():
+        async with httpx.AsyncClient(timeout=300.0) as client:
+            try:
+                async with track_upstream(
+                    "scope", "DELETE /api/v1/plugins/{plugin_name}"
+                ) as upstream:
+                    response = await client.delete(
+                        f"{settings.scope_api_url}/api/v1/plugins/{plugin_name}"
+                    )
+                    upstream.record_status(response.status_code)
+                if response.status_code != 200:
+                    raise HTTPException(
+                        status_code=response.status_code,
+                        detail=f"Failed to uninstall plugin: {response.text}",
+                    )
+                await invalidate_plugins()
+                return response.json()
+            except httpx.ConnectError:
                 raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to uninstall plugin: {response.text}",
+                    status_code=503, detail="Scope server not available"
                 )
-            return response.json()
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="Scope server not available")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
 
 
 # Map of processor types to their GitHub package URLs
@@ -125,36 +175,30 @@ async def check_plugin(processor_type: str):
 
     required_pipeline = PLUGIN_PIPELINES[processor_type]
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{settings.scope_api_url}/api/v1/plugins")
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code, detail="Failed to fetch plugins"
-                )
+    try:
+        data = await fetch_plugins()
+    except httpx.ConnectError:
+        raise HTTPException(status_code=503, detail="Scope server not available")
 
-            data = response.json()
-            for plugin in data.get("plugins", []):
-                for pipeline in plugin.get("pipelines", []):
-                    if pipeline["pipeline_id"] == required_pipeline:
-                        return {
-                            "installed": True,
-                            "plugin_name": plugin["name"],
-                            "pipeline_id": required_pipeline,
-                        }
+    for plugin in data.get("plugins", []):
+        for pipeline in plugin.get("pipelines", []):
+            if pipeline["pipeline_id"] == required_pipeline:
+                return {
+                    "installed": True,
+                    "plugin_name": plugin["name"],
+                    "pipeline_id": required_pipeline,
+                }
 
-            return {
-                "installed": False,
-                "plugin_name": None,
-                "pipeline_id": required_pipeline,
-                "package_url": PLUGIN_PACKAGES[processor_type],
-            }
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="Scope server not available")
+    return {
+        "installed": False,
+        "plugin_name": None,
+        "pipeline_id": required_pipeline,
+        "package_url": PLUGIN_PACKAGES[processor_type],
+    }
 
 
 @router.post("/plugins/install/{processor_type}")
-async def install_processor_plugin(processor_type: str):
+async def install_processor_plugin(processor_type: str, http_request: Request):
     """Install the required plugin for a processor type if not already installed."""
     if processor_type not in PLUGIN_PACKAGES:
         raise HTTPException(
@@ -167,9 +211,11 @@ async def install_processor_plugin(processor_type: str):
     async with httpx.AsyncClient(timeout=300.0) as client:
         try:
             # First check if already installed
-            response = await client.get(f"{settings.scope_api_url}/api/v1/plugins")
-            if response.status_code == 200:
-                data = response.json()
+            try:
+                data = await fetch_plugins()
+            except HTTPException:
+                data = {}
+            if data:
                 for plugin in data.get("plugins", []):
                     for pipeline in plugin.get("pipelines", []):
                         if pipeline["pipeline_id"] == required_pipeline:
@@ -179,11 +225,23 @@ async def install_processor_plugin(processor_type: str):
                                 "pipeline_id": required_pipeline,
                             }
 
-            # Install the plugin
-            install_response = await client.post(
-                f"{settings.scope_api_url}/api/v1/plugins",
-                json={"package": package_url},
-            )
+            # Build (or reuse) the wheel and install the plugin; once
+            # admitted, see it through even if the client leaves
+            async with scheduled(
+                "plugin_install", request_user(http_request)
+            ), non_cancellable():
+                # Prefer the cached wheel; the git URL is the fallback
+                artifact = await artifacts.resolve(package_url)
+                if artifact is not None:
+                    package_url = artifacts.package_spec(artifact)
+                async with track_upstream("scope", "POST /api/v1/plugins") as upstream:
+                    install_response = await client.post(
+                        f"{settings.scope_api_url}/api/v1/plugins",
+                        json={"package": package_url},
+                    )
+                    upstream.record_status(install_response.status_code)
+                if install_response.status_code == 200:
+                    await invalidate_plugins()
 
             if install_response.status_code != 200:
                 raise HTTPException(
@@ -195,18 +253,231 @@ async def install_processor_plugin(processor_type: str):
                 "installed": True,
                 "message": f"Successfully installed plugin for {processor_type}",
                 "pipeline_id": required_pipeline,
+                "artifact": artifact["sha256"] if artifact else None,
             }
         except httpx.ConnectError:
             raise HTTPException(status_code=503, detail="Scope server not available")
 
 
-@router.post("/restart")
-async def restart_server():
-    """Restart the Scope server to pick up new plugins."""
-    async with httpx.AsyncClient(timeout=10.0) as client:
+class BuildPluginRequest(BaseModel):
+    """A plugin file set from the editor, as sent to ``/api/github/push``."""
+
+    files: dict[str, str]  # filename -> content
+
+
+@router.post("/plugins/build", dependencies=[Depends(require_admin)])
+async def build_and_install_plugin(request: BuildPluginRequest, http_request: Request):
+    """Build a plugin's wheel locally and install it on Scope from that wheel.
+
+    Wheels are cached by a hash of the file set, so reinstalling an unchanged
+    plugin skips the build. Each file set gets its own local version label,
+    so Scope replaces the previous build instead of keeping it. The build
+    runs on this host, hence the admin token.
+    """
+    if not artifacts.reachable():
+        raise HTTPException(
+            status_code=409,
+            detail="Scope runs on another host; set ARTIFACT_BASE_URL so it "
+            "can fetch built plugins",
+        )
+    try:
+        artifacts.check_build_config(request.files)
+    except artifacts.ArtifactError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    operation = (
+        "plugin_install_wheel"
+        if artifacts.lookup_files(request.files)
+        else "plugin_build"
+    )
+
+    async with httpx.AsyncClient(timeout=300.0) as client:
         try:
-            await client.post(f"{settings.scope_api_url}/api/v1/restart")
+            # Once admitted, see it through even if the client leaves
+            async with scheduled(
+                operation, request_user(http_request)
+            ), non_cancellable():
+                started = time.perf_counter()
+                try:
+                    artifact, cached = await artifacts.resolve_files(request.files)
+                except artifacts.ArtifactError as e:
+                    raise HTTPException(status_code=422, detail=str(e))
+                built = time.perf_counter()
+                async with track_upstream("scope", "POST /api/v1/plugins") as upstream:
+                    response = await client.post(
+                        f"{settings.scope_api_url}/api/v1/plugins",
+                        json={"package": artifacts.package_spec(artifact)},
+                    )
+                    upstream.record_status(response.status_code)
+                if response.status_code == 200:
+                    await invalidate_plugins()
         except httpx.ConnectError:
             raise HTTPException(status_code=503, detail="Scope server not available")
-        except Exception:
-            pass
+
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to install plugin: {response.text}",
+        )
+    return {
+        "installed": True,
+        "artifact": artifact["sha256"],
+        "project": artifact["project"],
+        "version": artifact["version"],
+        "cached": cached,
+        "build_ms": round((built - started) * 1000, 1),
+        "install_ms": round((time.perf_counter() - built) * 1000, 1),
+    }
+
+
+def index_page(title: str, links: list[tuple[str, str]]) -> HTMLResponse:
+    """A PEP 503 simple-index page."""
+    body = "".join(
+        f'<a href="{html.escape(href)}">{html.escape(text)}</a><br/>\n'
+        for href, text in links
+    )
+    return HTMLResponse(
+        f"<!DOCTYPE html>\n<html><head><title>{html.escape(title)}</title></head>"
+        f"<body>\n{body}</body></html>\n"
+    )
+
+
+@router.get("/artifacts")
+async def list_artifacts():
+    """Cached plugin wheels by project, and the source each processor uses."""
+    store = artifacts.get_store()
+    return {
+        "projects": store.projects(),
+        "processors": {
+            processor_type: store.lookup(source)
+            for processor_type, source in PLUGIN_PACKAGES.items()
+        },
+    }
+
+
+@router.get("/artifacts/simple/")
+async def artifact_index():
+    """PEP 503 root: every project with a cached wheel."""
+    projects = sorted(artifacts.get_store().projects())
+    return index_page("Simple index", [(f"{p}/", p) for p in projects])
+
+
+@router.get("/artifacts/simple/{project}/")
+async def artifact_project(project: str):
+    """PEP 503 project page linking its wheels with their hashes."""
+    normalized = artifacts.normalize(project)
+    entries = artifacts.get_store().projects().get(normalized)
+    if not entries:
+        raise HTTPException(status_code=404, detail=f"No wheels for {project}")
+    return index_page(
+        f"Links for {normalized}",
+        [
+            (
+                f"../../files/{e['sha256']}/{e['filename']}#sha256={e['sha256']}",
+                e["filename"],
+            )
+            for e in entries
+        ],
+    )
+
+
+@router.get("/artifacts/files/{sha256}/{filename}")
+async def artifact_file(sha256: str, filename: str):
+    """A cached wheel; content-addressed, so cacheable forever."""
+    store = artifacts.get_store()
+    entry = store.files.get(sha256)
+    if entry is None or entry["filename"] != filename:
+        raise HTTPException(status_code=404, detail="Unknown artifact")
+    return FileResponse(
+        store.path(sha256),
+        media_type="application/octet-stream",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+@router.post("/artifacts/build/{processor_type}")
+async def build_artifact(processor_type: str, http_request: Request):
+    """Build and cache the wheel for a processor type ahead of installs."""
+    if processor_type not in PLUGIN_PACKAGES:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown processor type: {processor_type}"
+        )
+    store = artifacts.get_store()
+    source = PLUGIN_PACKAGES[processor_type]
+    entry = store.lookup(source)
+    if entry is not None:
+        return {"built": False, **entry}
+    async with scheduled("plugin_build", request_user(http_request)), non_cancellable():
+        try:
+            entry = await store.build(source)
+        except artifacts.ArtifactError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+    return {"built": True, **entry}
+
+
+@router.delete(
+    "/artifacts/build/{processor_type}",
+    dependencies=[Depends(require_admin)],
+)
+async def forget_artifact(processor_type: str):
+    """Drop a processor's cached wheel so the next install builds it afresh.
+
+    ``git+`` sources track a branch, so a cached build goes stale when the
+    repository moves on.
+    """
+    if processor_type not in PLUGIN_PACKAGES:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown processor type: {processor_type}"
+        )
+    store = artifacts.get_store()
+    entry = await asyncio.to_thread(store.forget, PLUGIN_PACKAGES[processor_type])
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No cached wheel")
+    return {"removed": entry}
+
+
+@router.put(
+    "/artifacts/{filename}",
+    dependencies=[Depends(require_admin)],
+)
+async def upload_artifact(
+    filename: str,
+    request: Request,
+    processor_type: Optional[str] = Query(default=None),
+):
+    """Import a wheel sent as the raw request body.
+
+    Wheels installed from here run on Scope hosts, hence the admin token.
+    With ``processor_type`` the wheel is used for that processor's installs.
+    """
+    if not artifacts.WHEEL_NAME.match(filename):
+        raise HTTPException(status_code=400, detail="Not a wheel filename")
+    if processor_type is not None and processor_type not in PLUGIN_PACKAGES:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown processor type: {processor_type}"
+        )
+    source = PLUGIN_PACKAGES.get(processor_type) if processor_type else None
+    with tempfile.TemporaryDirectory(prefix="openscope-upload-") as tmp:
+        path = Path(tmp) / filename
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                f.write(chunk)
+        return await asyncio.to_thread(artifacts.get_store().put, path, source)
+
+
+@router.post("/restart")
+async def restart_server(http_request: Request):
+    """Restart the Scope server to pick up new plugins."""
+    # Once admitted, see it through even if the client leaves
+    async with scheduled("restart", request_user(http_request)), non_cancellable():
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            try:
+                async with track_upstream("scope", "POST /api/v1/restart"):
+                    await client.post(f"{settings.scope_api_url}/api/v1/restart")
+                await invalidate_plugins()
+                await invalidate(scope_key("status"))
+            except httpx.ConnectError:
+                raise HTTPException(
+                    status_code=503, detail="Scope server not available"
+                )
+            except Exception:
+                pass
@@ -0,0 +1,170 @@
+"""Preview router - CPU preview of node graphs without a Scope server."""
+
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+
+router = APIRouter()
+
+# Registered preview graphs, oldest evicted first
+MAX_PREVIEWS = 64
+PREVIEWS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+_runtime = None
+
+# Streams currently open; each keeps the shared process pool busy
+open_streams = 0
+
+
+class PreviewRequest(BaseModel):
+    """Request to register a graph for preview."""
+
+    nodes: List[Dict[str, Any]]
+    edges: Optional[List[Dict[str, Any]]] = None
+    source: str = "sample"  # "sample" or "synthetic"
+    format: str = "mjpeg"  # "mjpeg" or "raw"
+    # Bounded so frame buffers and pacing stay sane; 1080p is the largest
+    # frame the effects are written for
+    fps: Optional[float] = Field(default=None, gt=0, le=60)
+    width: Optional[int] = Field(default=None, ge=16, le=1920)
+
+
+def get_runtime():
+    """Import the preview runtime, which needs the optional NumPy stack."""
+    global _runtime
+    if _runtime is None:
+        try:
+            from .. import preview as runtime
+        except ImportError:
+            raise HTTPException(
+                status_code=503,
+                detail="Preview runtime not installed (pip install openscope-backend[preview])",
+            )
+        _runtime = runtime
+    return _runtime
+
+
+def shutdown():
+    """Stop the preview worker pool if the runtime was loaded."""
+    if _runtime is not None:
+        _runtime.shutdown_pool()
+
+
+@router.post("/")
+async def create_preview(request: PreviewRequest):
+    """Register a graph for preview and return its stream URL.
+
+    The stream URL can be used directly as an ``<img>`` source.
+    """
+    runtime = get_runtime()
+    if request.source not in ("sample", "synthetic"):
+        raise HTTPException(
+            status_code=400, detail="Source must be 'sample' or 'synthetic'"
+        )
+    if request.format not in ("mjpeg", "raw"):
+        raise HTTPException(status_code=400, detail="Format must be 'mjpeg' or 'raw'")
+
+    graph = {"nodes": request.nodes, "edges": request.edges or []}
+    try:
+        steps, _, _ = runtime.compile_plan(graph)
+    except runtime.PreviewError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    preview_id = uuid.uuid4().hex
+    PREVIEWS[preview_id] = {
+        **request.model_dump(exclude={"nodes", "edges"}),
+        "graph": graph,
+    }
+    while len(PREVIEWS) > MAX_PREVIEWS:
+        PREVIEWS.popitem(last=False)
+
+    return {
+        "preview_id": preview_id,
+        "stream_url": f"/api/preview/{preview_id}/stream",
+        "steps": [
+            {"node_id": node_id, "kernel": kernel or "passthrough"}
+            for node_id, kernel, _, _ in steps
+        ],
+    }
+
+
+@router.get("/{preview_id}/stream")
+async def stream(
+    preview_id: str, max_frames: Optional[int] = Query(default=None, ge=1)
+):
+    """Stream a registered preview as multipart MJPEG or raw RGB frames.
+
+    At most ``preview_max_streams`` streams run at once; more get a 429.
+    """
+    global open_streams
+    runtime = get_runtime()
+    preview = PREVIEWS.get(preview_id)
+    if preview is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    if open_streams >= settings.preview_max_streams:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many preview streams open",
+            headers={"Retry-After": "5"},
+        )
+
+    open_streams += 1
+    released = False
+
+    def release():
+        global open_streams
+        nonlocal released
+        if not released:
+            released = True
+            open_streams -= 1
+
+    frames = runtime.stream_preview(
+        preview["graph"],
+        source=preview["source"],
+        output_format=preview["format"],
+        fps=preview["fps"],
+        width=preview["width"],
+        max_frames=max_frames,
+    )
+    try:
+        first = await anext(frames)
+    except BaseException as e:
+        release()
+        await frames.aclose()
+        if isinstance(e, runtime.PreviewError):
+            raise HTTPException(status_code=400, detail=str(e))
+        if isinstance(e, ImportError):
+            raise HTTPException(status_code=503, detail="Pillow not installed")
+        raise
+
+    async def body():
+        try:
+            yield first
+            async for part in frames:
+                yield part
+        finally:
+            release()
+            await frames.aclose()
+
+    generator = body()
+    # A response cancelled before it starts never runs the finally above
+    weakref.finalize(generator, release)
+
+    return StreamingResponse(
+        generator,
+        media_type=f"multipart/x-mixed-replace; boundary={runtime.MJPEG_BOUNDARY}",
+    )
+
+
+@router.delete("/{preview_id}")
+async def delete_preview(preview_id: str):
+    """Forget a registered preview."""
+    PREVIEWS.pop(preview_id, None)
+    return {"deleted": True}
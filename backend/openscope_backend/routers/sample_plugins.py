@@ -7,9 +7,12 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import PlainTextResponse
 
+from ..perf_lint import iter_python_files, lint_source
+
 router = APIRouter()
 
-SAMPLE_PLUGINS_DIR = Path(__file__).parent.parent / "sample-plugins"
+# backend/sample-plugins, next to the package
+SAMPLE_PLUGINS_DIR = Path(__file__).parent.parent.parent / "sample-plugins"
 
 
 @router.get("/plugins/{plugin_name}/pipeline.py")
@@ -105,6 +108,27 @@ async def get_plugin_pyproject(plugin_name: str) -> PlainTextResponse:
     return PlainTextResponse(content=code, media_type="text/plain")
 
 
+@router.get("/plugins/{plugin_name}/lint")
+async def lint_plugin(plugin_name: str):
+    """Run the performance linter over every Python file of a sample plugin."""
+    plugin_dir = SAMPLE_PLUGINS_DIR / plugin_name
+
+    if not plugin_dir.exists():
+        raise HTTPException(status_code=404, detail=f"Plugin '{plugin_name}' not found")
+
+    files = []
+    for path in iter_python_files(plugin_dir):
+        relative = str(path.relative_to(plugin_dir))
+        try:
+            findings = lint_source(path.read_text(), relative)
+        except SyntaxError as e:
+            files.append({"filename": relative, "error": str(e), "findings": []})
+            continue
+        files.append({"filename": relative, "findings": findings})
+
+    return {"plugin": plugin_name, "files": files}
+
+
 @router.get("/plugins")
 async def list_plugins():
     """List all available sample plugins."""
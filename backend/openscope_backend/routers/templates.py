@@ -1,10 +1,13 @@
 """Templates router for plugin templates."""
 
+from functools import lru_cache
 from typing import List, Optional
 from pydantic import BaseModel
 
 from fastapi import APIRouter, HTTPException
 
+from ..responses import RawJSONResponse, dumps
+
 router = APIRouter()
 
 
@@ -296,12 +299,18 @@ STARTER_TEMPLATES = [
 ]
 
 
+@lru_cache(maxsize=32)
+def encoded_templates(category: Optional[str]) -> bytes:
+    """Templates are static, so each listing is encoded once."""
+    if category:
+        return dumps([t for t in STARTER_TEMPLATES if t.get("category") == category])
+    return dumps(STARTER_TEMPLATES)
+
+
 @router.get("/", response_model=List[dict])
 async def list_templates(category: Optional[str] = None):
     """List all available templates."""
-    if category:
-        return [t for t in STARTER_TEMPLATES if t.get("category") == category]
-    return STARTER_TEMPLATES
+    return RawJSONResponse(encoded_templates(category))
 
 
 @router.get("/categories")
@@ -0,0 +1,145 @@
+"""Workflows router - saved graphs with delta-encoded version history.
+
+With ``scheduler_trust_user_header`` set, each request sees only the
+workflows of the user in the proxy's ``X-User-Id``. Without it the store is
+single-user: anyone who can reach the backend can list and delete every
+workflow.
+"""
+
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from ..config import settings
+from ..workflows import PatchError, VersionConflict, WorkflowNotFound, get_store
+
+router = APIRouter()
+
+
+def request_owner(request: Request) -> Optional[str]:
+    """The trusted caller whose workflows this request may touch, if any."""
+    if not settings.scheduler_trust_user_header:
+        return None
+    user_id = request.headers.get("x-user-id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="X-User-Id header required")
+    return user_id
+
+
+class CreateWorkflowRequest(BaseModel):
+    """A new workflow and its first version."""
+
+    name: str
+    description: str = ""
+    user_id: Optional[str] = None
+    nodes: List[Dict[str, Any]] = []
+    edges: List[Dict[str, Any]] = []
+    plugin_config: Dict[str, Any] = {}
+
+
+class PatchWorkflowRequest(BaseModel):
+    """JSON Patch (RFC 6902) against ``base_version``, which must be the head.
+
+    Paths address the document ``{"nodes": [...], "edges": [...],
+    "plugin_config": {...}}``.
+    """
+
+    base_version: int
+    patch: List[Dict[str, Any]] = Field(default_factory=list)
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
+@router.get("/")
+async def list_workflows(
+    user_id: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    owner: Optional[str] = Depends(request_owner),
+):
+    """List workflow summaries, most recently updated first. No graph bodies."""
+    limit = max(1, min(limit, 200))
+    return await get_store().list(owner or user_id, limit, max(0, offset))
+
+
+@router.post("/", status_code=201)
+async def create_workflow(
+    request: CreateWorkflowRequest, owner: Optional[str] = Depends(request_owner)
+):
+    """Create a workflow; version 1 is stored as a full snapshot."""
+    document = {
+        "nodes": request.nodes,
+        "edges": request.edges,
+        "plugin_config": request.plugin_config,
+    }
+    return await get_store().create(
+        request.name, document, request.description, owner or request.user_id
+    )
+
+
+@router.get("/{workflow_id}")
+async def get_workflow(
+    workflow_id: str,
+    version: Optional[int] = None,
+    owner: Optional[str] = Depends(request_owner),
+):
+    """Get a workflow at ``version`` (default: latest)."""
+    try:
+        return await get_store().get(workflow_id, version, owner)
+    except WorkflowNotFound:
+        raise HTTPException(status_code=404, detail="Workflow or version not found")
+
+
+@router.patch("/{workflow_id}")
+async def patch_workflow(
+    workflow_id: str,
+    request: PatchWorkflowRequest,
+    owner: Optional[str] = Depends(request_owner),
+):
+    """Save a new version as a delta against the current head.
+
+    Returns 409 with the head version when ``base_version`` is stale; the
+    client should refetch and rebase its changes.
+    """
+    try:
+        return await get_store().commit(
+            workflow_id,
+            request.base_version,
+            request.patch,
+            request.name,
+            request.description,
+            owner,
+        )
+    except WorkflowNotFound:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    except VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "head_version": e.head_version},
+        )
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/{workflow_id}/versions")
+async def list_versions(
+    workflow_id: str, owner: Optional[str] = Depends(request_owner)
+):
+    """Version history (number, snapshot or delta, stored size), newest first."""
+    try:
+        return await get_store().versions(workflow_id, owner)
+    except WorkflowNotFound:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+
+@router.delete("/{workflow_id}")
+async def delete_workflow(
+    workflow_id: str, owner: Optional[str] = Depends(request_owner)
+):
+    """Delete a workflow and its history."""
+    try:
+        await get_store().delete(workflow_id, owner)
+    except WorkflowNotFound:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"success": True}
@@ -0,0 +1,356 @@
+"""Latency-aware routing of new sessions between local and cloud inference.
+
+Both paths are measured continuously:
+
+* round-trip time of a probe every ``routing_probe_interval`` seconds
+  (``/health`` for local, ``/api/v1/cloud/status`` for cloud), and whether
+  the path is usable at all; the cloud status is shared with the cloud
+  manager so it does not poll the same endpoint
+* queue depth: pipeline loads waiting for the local GPU, and the cloud's
+  queue when Scope reports one
+* load status: which pipelines are loaded and on which path, and how long
+  loads took
+* client reports of connection setup time and frame latency per path
+
+For each new session the expected time to first frame is the probe RTT plus
+queue wait, pipeline load (unless already loaded on that path), connection
+setup and, for an idle cloud, connecting. Paths are scored as
+``time_to_first_frame + routing_frame_weight * frame_latency`` and the
+lowest score that meets the request's constraints wins. A plugin's
+``remoteInference`` flag is kept as a preference: it is followed unless the
+other path scores better by more than ``routing_preference_margin_ms``.
+Until a figure has been measured an assumed default (``PRIORS``) stands in.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .config import settings
+from .metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+ROUTING_DECISIONS = Counter(
+    "openscope_routing_decisions_total",
+    "Inference path chosen for new sessions, by path and reason.",
+    ("path", "reason"),
+)
+EXPECTED_FIRST_FRAME = Gauge(
+    "openscope_routing_expected_first_frame_ms",
+    "Expected time to first frame at the last decision, by path.",
+    ("path",),
+)
+PROBE_RTT = Gauge(
+    "openscope_routing_probe_rtt_ms",
+    "Smoothed probe round-trip time, by path.",
+    ("path",),
+)
+
+PATHS = ("local", "cloud")
+
+# Assumed milliseconds until measurements replace them
+PRIORS: Dict[str, Dict[str, float]] = {
+    "local": {"setup": 800.0, "frame": 60.0, "load": 8000.0},
+    "cloud": {"setup": 1500.0, "frame": 90.0, "load": 8000.0, "connect": 4000.0},
+}
+
+# Weight of the newest sample in the smoothed figures
+ALPHA = 0.3
+
+Request = Callable[..., Awaitable[Any]]
+
+
+def ewma(current: Optional[float], sample: float) -> float:
+    return sample if current is None else current + ALPHA * (sample - current)
+
+
+class PathStats:
+    """What is currently known about one inference path."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.healthy = False
+        self.error: Optional[str] = None
+        self.checked = 0.0
+        self.connected = name == "local"
+        self.queue_depth = 0
+        self.rtt_ms: Optional[float] = None
+        self.setup_ms: Optional[float] = None
+        self.frame_ms: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        self.connect_ms: Optional[float] = None
+
+    def figure(self, key: str) -> float:
+        value = getattr(self, f"{key}_ms")
+        return PRIORS[self.name][key] if value is None else value
+
+    def record(self, key: str, ms: float):
+        setattr(self, f"{key}_ms", ewma(getattr(self, f"{key}_ms"), ms))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "error": self.error,
+            "connected": self.connected,
+            "queue_depth": self.queue_depth,
+            "rtt_ms": self.rtt_ms,
+            "setup_ms": self.setup_ms,
+            "frame_latency_ms": self.frame_ms,
+            "load_ms": self.load_ms,
+            "connect_ms": self.connect_ms,
+            "checked_seconds_ago": (
+                time.monotonic() - self.checked if self.checked else None
+            ),
+        }
+
+
+class InferenceRouter:
+    """Measures both paths and picks one per new session."""
+
+    def __init__(
+        self,
+        request: Request,
+        local_queue: Callable[[], int],
+        cloud_configured: Callable[[], bool],
+        on_cloud_status: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        # ``request(endpoint)`` is proxy_to_scope; ``local_queue()`` counts
+        # loads waiting for the local GPU; ``on_cloud_status`` gets each
+        # probed cloud status
+        self.request = request
+        self.local_queue = local_queue
+        self.cloud_configured = cloud_configured
+        self.on_cloud_status = on_cloud_status
+        self.paths = {name: PathStats(name) for name in PATHS}
+        self.pipeline_status: Dict[str, Any] = {}
+        self.loading: Optional[Dict[str, Any]] = None
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+    # Measurements
+
+    async def timed(self, endpoint: str) -> Any:
+        start = time.monotonic()
+        result = await self.request(endpoint)
+        return result, (time.monotonic() - start) * 1000.0
+
+    async def probe(self):
+        local, cloud = self.paths["local"], self.paths["cloud"]
+        results = await asyncio.gather(
+            self.timed("/health"),
+            self.timed("/api/v1/cloud/status"),
+            self.request("/api/v1/pipeline/status"),
+            return_exceptions=True,
+        )
+        health, cloud_status, pipeline_status = results
+        now = time.monotonic()
+
+        for stats, result in ((local, health), (cloud, cloud_status)):
+            stats.checked = now
+            if isinstance(result, BaseException):
+                stats.healthy = False
+                stats.error = str(getattr(result, "detail", result))
+                continue
+            stats.error = None
+            stats.record("rtt", result[1])
+            PROBE_RTT.set(stats.rtt_ms, path=stats.name)
+            stats.healthy = True
+
+        local.queue_depth = self.local_queue()
+        if not isinstance(cloud_status, BaseException):
+            status = cloud_status[0]
+            if self.on_cloud_status is not None:
+                self.on_cloud_status(status)
+            cloud.connected = bool(status.get("connected"))
+            cloud.queue_depth = int(
+                status.get("queue_depth") or status.get("queue_position") or 0
+            )
+            cloud.healthy = cloud.connected or bool(
+                status.get("credentials_configured") or self.cloud_configured()
+            )
+            if not cloud.healthy:
+                cloud.error = "cloud credentials not configured"
+        if not isinstance(pipeline_status, BaseException):
+            self.observe_status(pipeline_status)
+
+    def observe_status(self, status: Dict[str, Any]):
+        """Track Scope's pipeline status; times loads from ``load_started``."""
+        self.pipeline_status = status
+        if (
+            self.loading is not None
+            and status.get("status") == "loaded"
+            and set(status.get("pipeline_ids") or []) == self.loading["pipeline_ids"]
+        ):
+            elapsed = (time.monotonic() - self.loading["started"]) * 1000.0
+            self.paths[self.loading["path"]].record("load", elapsed)
+            self.loading = None
+
+    def load_started(self, path: str, pipeline_ids: List[str]):
+        """A load of ``pipeline_ids`` on ``path`` was accepted by Scope."""
+        self.loading = {
+            "path": path,
+            "pipeline_ids": set(pipeline_ids),
+            "started": time.monotonic(),
+        }
+
+    def report(
+        self, path: str, setup_ms: float, frame_latency_ms: Optional[float] = None
+    ):
+        """Client-measured setup time and frame latency of a stream."""
+        stats = self.paths[path]
+        stats.record("setup", setup_ms)
+        if frame_latency_ms is not None:
+            stats.record("frame", frame_latency_ms)
+
+    # Decisions
+
+    def is_loaded(self, path: str, pipeline_ids: List[str]) -> bool:
+        status = self.pipeline_status
+        remote = bool((status.get("load_params") or {}).get("remoteInference"))
+        return (
+            status.get("status") == "loaded"
+            and set(status.get("pipeline_ids") or []) == set(pipeline_ids)
+            and remote == (path == "cloud")
+        )
+
+    def estimate(self, path: str, pipeline_ids: List[str]) -> Dict[str, Any]:
+        stats = self.paths[path]
+        rtt = stats.rtt_ms or 0.0
+        load = 0.0 if self.is_loaded(path, pipeline_ids) else stats.figure("load")
+        queue = stats.queue_depth * stats.figure("load")
+        connect = 0.0 if stats.connected else stats.figure("connect")
+        first_frame = rtt + queue + load + connect + stats.figure("setup")
+        if stats.frame_ms is not None:
+            frame = stats.frame_ms
+        else:
+            frame = PRIORS[path]["frame"] + (rtt if path == "cloud" else 0.0)
+        return {
+            "available": stats.healthy,
+            "time_to_first_frame_ms": round(first_frame, 1),
+            "frame_latency_ms": round(frame, 1),
+            "score": round(first_frame + settings.routing_frame_weight * frame, 1),
+        }
+
+    def decide(
+        self,
+        pipeline_ids: List[str],
+        constraints: Dict[str, Any],
+        preferred: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Choose a path for a new session and record why."""
+        estimates = {path: self.estimate(path, pipeline_ids) for path in PATHS}
+        pinned = constraints.get("path") or "auto"
+
+        def fits(path: str) -> bool:
+            estimate = estimates[path]
+            max_frame = constraints.get("max_frame_latency_ms")
+            max_first = constraints.get("max_time_to_first_frame_ms")
+            return (
+                max_frame is None or estimate["frame_latency_ms"] <= max_frame
+            ) and (max_first is None or estimate["time_to_first_frame_ms"] <= max_first)
+
+        if pinned in PATHS:
+            path, reason = pinned, "pinned"
+        elif settings.inference_routing == "manual":
+            path, reason = preferred or "local", "manual"
+        else:
+            available = [p for p in PATHS if estimates[p]["available"]]
+            meeting = [p for p in available if fits(p)]
+            candidates = meeting or available
+            if not candidates:
+                path, reason = preferred or "local", "no_path_available"
+            else:
+                path = min(candidates, key=lambda p: estimates[p]["score"])
+                reason = "lowest_latency" if meeting else "no_path_meets_constraints"
+                if (
+                    preferred in candidates
+                    and preferred != path
+                    and estimates[preferred]["score"] - estimates[path]["score"]
+                    <= settings.routing_preference_margin_ms
+                ):
+                    path, reason = preferred, "preferred"
+
+        decision = {
+            "path": path,
+            "reason": reason,
+            "preferred": preferred,
+            "constraints": constraints,
+            "pipeline_ids": pipeline_ids,
+            "estimates": estimates,
+            "time": time.time(),
+        }
+        self.log(decision)
+        return decision
+
+    def fall_back(self, decision: Dict[str, Any], path: str, reason: str):
+        """Record that a decision could not be carried out and ``path`` ran."""
+        decision = {**decision, "path": path, "reason": reason, "time": time.time()}
+        self.log(decision)
+        return decision
+
+    def log(self, decision: Dict[str, Any]):
+        self.decisions.append(decision)
+        ROUTING_DECISIONS.inc(path=decision["path"], reason=decision["reason"])
+        for path, estimate in decision["estimates"].items():
+            EXPECTED_FIRST_FRAME.set(estimate["time_to_first_frame_ms"], path=path)
+        chosen = decision["estimates"][decision["path"]]
+        logger.info(
+            "Routing %s to %s (%s): first frame ~%.0f ms, frame latency ~%.0f ms",
+            ",".join(decision["pipeline_ids"]),
+            decision["path"],
+            decision["reason"],
+            chosen["time_to_first_frame_ms"],
+            chosen["frame_latency_ms"],
+        )
+
+    async def run(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.warning("Routing probe failed: %s", e)
+            await asyncio.sleep(settings.routing_probe_interval)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": settings.inference_routing,
+            "paths": {name: stats.to_dict() for name, stats in self.paths.items()},
+            "decisions": list(self.decisions)[::-1],
+        }
+
+
+_router: Optional[InferenceRouter] = None
+_prober: Optional[asyncio.Task] = None
+
+
+def get_router(
+    request: Request,
+    local_queue: Callable[[], int],
+    cloud_configured: Callable[[], bool],
+    on_cloud_status: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> InferenceRouter:
+    """Return the process-wide router, created on first use."""
+    global _router
+    if _router is None:
+        _router = InferenceRouter(
+            request, local_queue, cloud_configured, on_cloud_status
+        )
+    return _router
+
+
+def start_prober(router: InferenceRouter):
+    """Measure both inference paths in the background."""
+    global _prober
+    if settings.scope_api_url:
+        _prober = asyncio.create_task(router.run())
+
+
+async def stop_prober():
+    if _prober is not None:
+        _prober.cancel()
+        try:
+            await _prober
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,289 @@
+"""Fair scheduling of expensive Scope operations.
+
+Pipeline loads, plugin installs and restarts are serialized on the Scope
+server. Requests for them pass through two stages:
+
+* a per-user token bucket (``scheduler_rate_per_minute``, burst
+  ``scheduler_burst``); each operation costs tokens by how expensive it is,
+  and an empty bucket is a 429 with ``Retry-After``
+* a weighted fair queue across users (start-time fair queuing): each job is
+  tagged with a virtual finish time of ``cost / weight`` after the later of
+  the user's previous job and the current virtual time, and the lowest tag
+  runs next. A user with many queued jobs therefore cannot push back
+  another user's single job by more than one job.
+
+Users are client addresses unless ``scheduler_trust_user_header`` is set.
+Metrics label users named in ``scheduler_user_weights`` and group the rest
+as ``other`` so label cardinality stays bounded.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from .config import settings
+from .metrics import Counter, Gauge, Histogram
+
+QUEUED = Gauge(
+    "openscope_scheduler_queued",
+    "Expensive Scope operations waiting to run, by user.",
+    ("user",),
+)
+REJECTED = Counter(
+    "openscope_scheduler_rejected_total",
+    "Operations rejected by the scheduler, by user, operation and reason.",
+    ("user", "operation", "reason"),
+)
+ADMITTED = Counter(
+    "openscope_scheduler_admitted_total",
+    "Operations that ran, by user and operation.",
+    ("user", "operation"),
+)
+WAIT = Histogram(
+    "openscope_scheduler_wait_seconds",
+    "Time an operation waited in the fair queue.",
+    ("operation",),
+)
+
+# Relative cost in tokens and in fair-queue service; installs build packages,
+# except from a wheel built here, and a plugin build does so on this host
+OPERATION_COSTS = {
+    "pipeline_load": 1.0,
+    "plugin_install": 4.0,
+    "plugin_install_wheel": 1.0,
+    "plugin_build": 4.0,
+    "plugin_uninstall": 2.0,
+    "restart": 4.0,
+}
+
+# Idle users' buckets and finish tags are dropped this often
+PRUNE_INTERVAL = 60.0
+
+
+class TokenBucket:
+    """Refills at ``rate`` tokens per second up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float) -> float:
+        """Take ``amount`` tokens; returns 0, or seconds until they are available."""
+        self.refill()
+        # Costs above the burst need a full bucket rather than never passing
+        amount = min(amount, self.burst)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (amount - self.tokens) / self.rate
+
+
+class Job:
+    def __init__(self, user: str, operation: str, start: float, finish: float):
+        self.user = user
+        self.operation = operation
+        self.start = start
+        self.finish = finish
+        self.enqueued = time.monotonic()
+        self.ready = asyncio.get_running_loop().create_future()
+
+
+class FairScheduler:
+    """Token buckets per user in front of a weighted fair queue."""
+
+    def __init__(
+        self,
+        concurrency: int,
+        rate_per_minute: float,
+        burst: float,
+        max_queued_per_user: int,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_queued_per_user = max_queued_per_user
+        self.weights = weights or {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.heap: List[Tuple[float, int, Job]] = []
+        self.sequence = itertools.count()
+        self.running = 0
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self.queued: Dict[str, int] = {}
+        # Smoothed run time, for Retry-After when a user's queue is full
+        self.service_seconds = 10.0
+        self.pruned = time.monotonic()
+
+    def weight(self, user: str) -> float:
+        return max(0.01, self.weights.get(user, 1.0))
+
+    def label(self, user: str) -> str:
+        """Metric label for ``user``: configured users by name, the rest as one."""
+        return user if user in self.weights else "other"
+
+    def prune(self):
+        """Forget users with a full bucket, nothing queued and no pending tag.
+
+        Their state is then the same as a new user's, so nothing is lost.
+        """
+        self.pruned = time.monotonic()
+        if not self.heap and not self.running and self.last_finish:
+            # Idle: virtual time catches up with the latest tag, as in SFQ
+            self.virtual_time = max(self.virtual_time, *self.last_finish.values())
+        for user, bucket in list(self.buckets.items()):
+            bucket.refill()
+            if bucket.tokens >= bucket.burst and user not in self.queued:
+                del self.buckets[user]
+        for user, finish in list(self.last_finish.items()):
+            if finish <= self.virtual_time and user not in self.queued:
+                del self.last_finish[user]
+
+    def bucket(self, user: str) -> TokenBucket:
+        if user not in self.buckets:
+            self.buckets[user] = TokenBucket(self.rate, self.burst)
+        return self.buckets[user]
+
+    def reject(self, user: str, operation: str, reason: str, retry_after: float):
+        REJECTED.inc(user=self.label(user), operation=operation, reason=reason)
+        retry_after = max(1, math.ceil(min(retry_after, 3600.0)))
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "message": f"Too many {operation.replace('_', ' ')} requests",
+                "reason": reason,
+                "retry_after": retry_after,
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def set_queued(self, user: str, delta: int):
+        self.queued[user] = self.queued.get(user, 0) + delta
+        if not self.queued[user]:
+            del self.queued[user]
+        label = self.label(user)
+        QUEUED.set(
+            sum(n for u, n in self.queued.items() if self.label(u) == label),
+            user=label,
+        )
+
+    def dispatch(self):
+        while self.heap and self.running < self.concurrency:
+            _, _, job = heapq.heappop(self.heap)
+            if job.ready.done():  # cancelled while waiting
+                continue
+            self.running += 1
+            self.virtual_time = job.start
+            self.set_queued(job.user, -1)
+            job.ready.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, user: str, operation: str):
+        """Run the body once ``user``'s turn comes; 429 when over its rate."""
+        cost = OPERATION_COSTS.get(operation, 1.0)
+        if time.monotonic() - self.pruned > PRUNE_INTERVAL:
+            self.prune()
+        if self.queued.get(user, 0) >= self.max_queued_per_user:
+            self.reject(
+                user, operation, "queue_full", self.service_seconds * self.queued[user]
+            )
+        wait = self.bucket(user).take(cost)
+        if wait:
+            self.reject(user, operation, "rate_limited", wait)
+
+        start = max(self.virtual_time, self.last_finish.get(user, 0.0))
+        job = Job(user, operation, start, start + cost / self.weight(user))
+        self.last_finish[user] = job.finish
+        heapq.heappush(self.heap, (job.finish, next(self.sequence), job))
+        self.set_queued(user, 1)
+        self.dispatch()
+
+        try:
+            await job.ready
+        except asyncio.CancelledError:
+            # Client went away while queued: give the turn back
+            if not job.ready.done() or job.ready.cancelled():
+                self.set_queued(user, -1)
+                if self.last_finish.get(user) == job.finish:
+                    self.last_finish[user] = job.start
+            else:
+                self.running -= 1
+                self.dispatch()
+            raise
+
+        began = time.monotonic()
+        WAIT.observe(began - job.enqueued, operation=operation)
+        ADMITTED.inc(user=self.label(user), operation=operation)
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - began
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * elapsed
+            self.running -= 1
+            self.dispatch()
+
+    def to_dict(self) -> Dict[str, Any]:
+        users = set(self.buckets) | set(self.queued)
+        for bucket in self.buckets.values():
+            bucket.refill()
+        return {
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "users": {
+                user: {
+                    "queued": self.queued.get(user, 0),
+                    "tokens": round(self.bucket(user).tokens, 2),
+                    "weight": self.weight(user),
+                }
+                for user in sorted(users)
+            },
+        }
+
+
+_scheduler: Optional[FairScheduler] = None
+
+
+def get_scheduler() -> FairScheduler:
+    """Return the process-wide scheduler, created on first use."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler(
+            concurrency=settings.scheduler_concurrency,
+            rate_per_minute=settings.scheduler_rate_per_minute,
+            burst=settings.scheduler_burst,
+            max_queued_per_user=settings.scheduler_max_queued_per_user,
+            weights=settings.scheduler_user_weights,
+        )
+    return _scheduler
+
+
+def request_user(request: Request) -> str:
+    """The user to schedule for: the client address, or a trusted ``X-User-Id``.
+
+    Ids the client sends itself are not used, or it could rotate them to get
+    a fresh bucket per request. Behind a proxy the address is the one it
+    appended to ``X-Forwarded-For`` (see ``proxy``), for the same reason.
+    """
+    if settings.scheduler_trust_user_header and request.headers.get("x-user-id"):
+        return request.headers["x-user-id"]
+    return f"client:{request.client.host if request.client else 'unknown'}"
+
+
+def scheduled(operation: str, user: str):
+    """``async with scheduled("restart", user):`` around an expensive call."""
+    return get_scheduler().slot(user, operation)
@@ -0,0 +1,160 @@
+"""Versioned change feed of pipeline schemas.
+
+Every schemas document fetched from Scope is compared with the previous one
+by a content hash per pipeline. A client that sends the version it last saw
+gets back only the pipelines added, removed or modified since, so refresh
+traffic after a plugin install is one pipeline's schema rather than the
+whole document.
+
+A version is a hash of the per-pipeline hashes, so every worker (and a
+restarted backend) gives the same schemas the same version and can diff
+from a token another one issued. Each feed keeps the pipeline hashes of its
+last ``schema_feed_history`` versions; a token it has not seen gets a full
+reset instead of a diff.
+"""
+
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .config import settings
+from .metrics import Counter
+from .responses import loads
+
+SCHEMA_CHANGES = Counter(
+    "openscope_schema_changes_total",
+    "Pipeline schema changes seen in Scope's schemas document, by kind.",
+    ("kind",),
+)
+SCHEMA_FEED_RESPONSES = Counter(
+    "openscope_schema_feed_responses_total",
+    "Change-feed responses, by kind (diff, reset or unchanged).",
+    ("kind",),
+)
+
+
+def schema_hash(schema: Any) -> str:
+    """Content hash of one pipeline schema, independent of key order."""
+    encoded = json.dumps(schema, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+
+def version_of(hashes: Dict[str, str]) -> str:
+    """Feed version for a set of pipeline hashes."""
+    return schema_hash(hashes)
+
+
+class SchemaFeed:
+    """Per-pipeline hashes, current and for recent versions, of one backend."""
+
+    def __init__(self, history: int):
+        self.schemas: Dict[str, Any] = {}
+        self.hashes: Dict[str, str] = {}
+        self.token = version_of(self.hashes)
+        # Pipeline hashes by version, oldest first
+        self.versions: "OrderedDict[str, Dict[str, str]]" = OrderedDict(
+            [(self.token, {})]
+        )
+        self.history = max(1, history)
+        self.body_hash: Optional[str] = None
+        self.changed = asyncio.Event()
+
+    def update(self, body: bytes) -> bool:
+        """Record a fetched schemas document; returns whether anything changed.
+
+        Cheap when the document is unchanged: only the raw body is hashed.
+        """
+        body_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if body_hash == self.body_hash:
+            return False
+        self.body_hash = body_hash
+
+        pipelines = loads(body).get("pipelines") or {}
+        hashes = {pid: schema_hash(schema) for pid, schema in pipelines.items()}
+        self.schemas = dict(pipelines)
+        if hashes == self.hashes:
+            return False
+
+        for pid in self.hashes:
+            if pid not in hashes:
+                SCHEMA_CHANGES.inc(kind="removed")
+        for pid, digest in hashes.items():
+            if pid not in self.hashes:
+                SCHEMA_CHANGES.inc(kind="added")
+            elif self.hashes[pid] != digest:
+                SCHEMA_CHANGES.inc(kind="modified")
+        self.hashes = hashes
+        self.token = version_of(hashes)
+        self.versions[self.token] = hashes
+        self.versions.move_to_end(self.token)
+        while len(self.versions) > self.history:
+            self.versions.popitem(last=False)
+        # Wake every waiting stream, then re-arm for the next change
+        self.changed.set()
+        self.changed = asyncio.Event()
+        return True
+
+    def since(self, since: Optional[str]) -> Dict[str, Any]:
+        """Changes after ``since``: a diff, or a full reset."""
+        seen = self.versions.get(since) if since else None
+        if seen is None:
+            SCHEMA_FEED_RESPONSES.inc(kind="reset")
+            return {
+                "version": self.token,
+                "reset": True,
+                "added": self.schemas,
+                "modified": {},
+                "removed": [],
+                "hashes": self.hashes,
+            }
+
+        added, modified = {}, {}
+        for pid, digest in self.hashes.items():
+            if pid not in seen:
+                added[pid] = self.schemas[pid]
+            elif seen[pid] != digest:
+                modified[pid] = self.schemas[pid]
+        removed = [pid for pid in seen if pid not in self.hashes]
+
+        changed = added or modified or removed
+        SCHEMA_FEED_RESPONSES.inc(kind="diff" if changed else "unchanged")
+        return {
+            "version": self.token,
+            "reset": False,
+            "added": added,
+            "modified": modified,
+            "removed": removed,
+            "hashes": {pid: self.hashes[pid] for pid in [*added, *modified]},
+        }
+
+    async def wait(self, since: Optional[str], timeout: float) -> bool:
+        """Wait up to ``timeout`` for a version newer than ``since``."""
+        if since != self.token:
+            return True
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+# Feeds for Scope backends other than the configured one come from a
+# client-supplied scope_url; only the most recently used are kept
+MAX_FEEDS = 8
+
+_feeds: "OrderedDict[str, SchemaFeed]" = OrderedDict()
+
+
+def get_feed(scope_url: Optional[str] = None) -> SchemaFeed:
+    """Change feed for a Scope backend, created on first use."""
+    default = settings.scope_api_url.rstrip("/")
+    backend = (scope_url or default).rstrip("/")
+    if backend not in _feeds:
+        _feeds[backend] = SchemaFeed(settings.schema_feed_history)
+    _feeds.move_to_end(backend)
+    others = [b for b in _feeds if b != default]
+    for stale in others[: max(0, len(others) - MAX_FEEDS)]:
+        del _feeds[stale]
+    return _feeds[backend]
@@ -0,0 +1,313 @@
+"""Streaming-session registry with admission control.
+
+Each Scope backend gets at most ``session_capacity`` concurrent sessions. A
+session is keyed by the client's ``connection_id`` (else ``user_id``, else
+its address) and covers both the pipeline load and the WebRTC stream that
+follows, so one client holds one slot.
+
+When the backend is full, requests join a FIFO admission queue and wait up
+to ``session_queue_wait`` seconds. If still not admitted they get a 503 with
+their queue position and an ETA, and keep their place for as long as they
+retry within ``session_claim_timeout``. Sessions without activity for
+``session_idle_timeout`` are reaped and their slot goes to the next in line.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import settings
+from .metrics import Gauge, Histogram
+
+ACTIVE_SESSIONS = Gauge(
+    "openscope_sessions_active",
+    "Streaming sessions holding a slot, by backend.",
+    ("backend",),
+)
+QUEUED_SESSIONS = Gauge(
+    "openscope_sessions_queued",
+    "Clients waiting in the admission queue, by backend.",
+    ("backend",),
+)
+ADMISSION_WAIT = Histogram(
+    "openscope_session_admission_wait_seconds",
+    "Time from joining the admission queue to getting a slot.",
+    ("backend",),
+)
+
+# Assumed session length until enough sessions have ended to measure it
+DEFAULT_SESSION_SECONDS = 300.0
+
+
+class Queued(Exception):
+    """The backend is at capacity; the client holds a place in the queue."""
+
+    def __init__(self, position: int, eta_seconds: float):
+        super().__init__(f"Queued at position {position}")
+        self.position = position
+        self.eta_seconds = eta_seconds
+
+
+class Session:
+    """A client holding one streaming slot."""
+
+    def __init__(self, key: str, user_id: Optional[str], client: Optional[str]):
+        self.key = key
+        self.user_id = user_id
+        # Address that took the slot; only it may release it
+        self.client = client
+        self.scope_session_id: Optional[str] = None
+        # "local" or "cloud" once the session has been routed
+        self.route: Optional[str] = None
+        self.started = time.monotonic()
+        self.last_seen = self.started
+        # False while the slot is reserved for a queued client that has not
+        # come back for it yet
+        self.claimed = False
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "key": self.key,
+            "user_id": self.user_id,
+            "scope_session_id": self.scope_session_id,
+            "route": self.route,
+            "age_seconds": now - self.started,
+            "idle_seconds": now - self.last_seen,
+            "claimed": self.claimed,
+        }
+
+
+class Waiter:
+    """A queued client."""
+
+    def __init__(self, key: str, user_id: Optional[str], client: Optional[str]):
+        self.key = key
+        self.user_id = user_id
+        self.client = client
+        self.enqueued = time.monotonic()
+        self.last_seen = self.enqueued
+        self.admitted = asyncio.Event()
+
+
+class SessionRegistry:
+    """Active sessions and the admission queue for one Scope backend."""
+
+    def __init__(
+        self,
+        backend: str,
+        capacity: int,
+        idle_timeout: float,
+        claim_timeout: float,
+    ):
+        self.backend = backend
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self.claim_timeout = claim_timeout
+        self.sessions: Dict[str, Session] = {}
+        self.queue: "OrderedDict[str, Waiter]" = OrderedDict()
+        self.durations: Deque[float] = deque(maxlen=50)
+
+    def full(self) -> bool:
+        return 0 < self.capacity <= len(self.sessions)
+
+    def mean_duration(self) -> float:
+        if not self.durations:
+            return DEFAULT_SESSION_SECONDS
+        return sum(self.durations) / len(self.durations)
+
+    def position(self, key: str) -> int:
+        for position, waiting in enumerate(self.queue, start=1):
+            if waiting == key:
+                return position
+        return 0
+
+    def eta(self, position: int) -> float:
+        """Seconds until the client at ``position`` should get a slot.
+
+        Assumes sessions last the recent mean: the Nth in line takes the slot
+        that frees up Nth, one full session later for every lap of capacity.
+        """
+        mean = self.mean_duration()
+        now = time.monotonic()
+        remaining = sorted(
+            max(0.0, mean - (now - s.started)) for s in self.sessions.values()
+        )
+        laps, index = divmod(position - 1, max(1, self.capacity))
+        first = remaining[index] if index < len(remaining) else 0.0
+        return first + laps * mean
+
+    def update_gauges(self):
+        ACTIVE_SESSIONS.set(len(self.sessions), backend=self.backend)
+        QUEUED_SESSIONS.set(len(self.queue), backend=self.backend)
+
+    def admit(self, key: str, user_id: Optional[str], client: Optional[str]) -> Session:
+        session = Session(key, user_id, client)
+        self.sessions[key] = session
+        return session
+
+    def promote(self):
+        """Give free slots to the head of the queue."""
+        while self.queue and not self.full():
+            key, waiter = self.queue.popitem(last=False)
+            self.admit(key, waiter.user_id, waiter.client)
+            ADMISSION_WAIT.observe(
+                time.monotonic() - waiter.enqueued, backend=self.backend
+            )
+            waiter.admitted.set()
+        self.update_gauges()
+
+    def release(self, key: str) -> bool:
+        """Free the slot held by ``key``; returns whether it held one."""
+        session = self.sessions.pop(key, None)
+        if session is not None and session.claimed:
+            self.durations.append(time.monotonic() - session.started)
+        self.queue.pop(key, None)
+        self.promote()
+        return session is not None
+
+    def reap(self) -> List[str]:
+        """Drop idle sessions, unclaimed reservations and abandoned waiters."""
+        now = time.monotonic()
+        reaped = [
+            key
+            for key, s in self.sessions.items()
+            if now - s.last_seen
+            > (self.idle_timeout if s.claimed else self.claim_timeout)
+        ]
+        for key in reaped:
+            session = self.sessions.pop(key)
+            if session.claimed:
+                self.durations.append(session.last_seen - session.started)
+        for key in [
+            k for k, w in self.queue.items() if now - w.last_seen > self.claim_timeout
+        ]:
+            del self.queue[key]
+        self.promote()
+        return reaped
+
+    async def acquire(
+        self,
+        key: str,
+        user_id: Optional[str] = None,
+        wait: float = 0.0,
+        client: Optional[str] = None,
+    ) -> Session:
+        """Return the session for ``key``, admitting it if there is room.
+
+        Waits up to ``wait`` seconds in the queue, then raises ``Queued``.
+        """
+        self.reap()
+        session = self.sessions.get(key)
+        if session is None and not self.queue and not self.full():
+            session = self.admit(key, user_id, client)
+            self.update_gauges()
+
+        if session is None:
+            waiter = self.queue.get(key)
+            if waiter is None:
+                waiter = self.queue[key] = Waiter(key, user_id, client)
+                self.update_gauges()
+            waiter.last_seen = time.monotonic()
+            try:
+                await asyncio.wait_for(waiter.admitted.wait(), wait)
+            except asyncio.TimeoutError:
+                position = self.position(key)
+                raise Queued(position, self.eta(position))
+            session = self.sessions[key]
+
+        session.claimed = True
+        session.touch()
+        return session
+
+    def holder(self, key: str) -> Optional[str]:
+        """Address of the client holding or queued for ``key``, if known."""
+        entry = self.sessions.get(key) or self.queue.get(key)
+        return entry.client if entry is not None else None
+
+    def find(self, scope_session_id: str) -> Optional[Session]:
+        for session in self.sessions.values():
+            if session.scope_session_id == scope_session_id:
+                return session
+        return None
+
+    def status(self, key: str) -> Dict[str, Any]:
+        """Where ``key`` stands: admitted, queued with an ETA, or unknown."""
+        if key in self.sessions:
+            return {"state": "admitted", "session": self.sessions[key].to_dict()}
+        position = self.position(key)
+        if position:
+            self.queue[key].last_seen = time.monotonic()
+            return {
+                "state": "queued",
+                "position": position,
+                "eta_seconds": self.eta(position),
+            }
+        return {"state": "unknown"}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "capacity": self.capacity,
+            "active": [s.to_dict() for s in self.sessions.values()],
+            "queue": [
+                {
+                    "key": key,
+                    "user_id": waiter.user_id,
+                    "position": position,
+                    "eta_seconds": self.eta(position),
+                }
+                for position, (key, waiter) in enumerate(self.queue.items(), start=1)
+            ],
+            "mean_session_seconds": self.mean_duration(),
+        }
+
+
+_registries: Dict[str, SessionRegistry] = {}
+_reaper: Optional[asyncio.Task] = None
+
+
+def get_registry(scope_url: Optional[str] = None) -> SessionRegistry:
+    """Registry for a Scope backend, created on first use."""
+    backend = (scope_url or settings.scope_api_url).rstrip("/")
+    if backend not in _registries:
+        _registries[backend] = SessionRegistry(
+            backend,
+            capacity=settings.session_capacity,
+            idle_timeout=settings.session_idle_timeout,
+            claim_timeout=settings.session_claim_timeout,
+        )
+    return _registries[backend]
+
+
+def session_key(
+    connection_id: Optional[str], user_id: Optional[str], client: Optional[str]
+) -> str:
+    return connection_id or user_id or f"client:{client or 'unknown'}"
+
+
+async def reap_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        for registry in list(_registries.values()):
+            registry.reap()
+
+
+def start_reaper():
+    """Reap idle sessions in the background so queued clients move up."""
+    global _reaper
+    interval = max(1.0, min(settings.session_idle_timeout, 30.0) / 4)
+    _reaper = asyncio.create_task(reap_forever(interval))
+
+
+async def stop_reaper():
+    if _reaper is not None:
+        _reaper.cancel()
+        try:
+            await _reaper
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,462 @@
+"""Workflow store with delta-encoded version history.
+
+Each save is a JSON Patch (RFC 6902) against the previous version. Every
+``snapshot_interval`` versions the full document is stored instead, so any
+version is rebuilt from the nearest snapshot at or below it plus at most
+``snapshot_interval - 1`` deltas.
+
+Workflow metadata lives in its own table; listing workflows or versions
+never reads a document body.
+
+Calls that take an ``owner`` only see that user's workflows; with no owner
+the store is single-user and every workflow is visible.
+"""
+
+import asyncio
+import copy
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+
+DEFAULT_PATH = Path(__file__).parent.parent / "data" / "workflows.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    head_version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_workflows_user_updated
+    ON workflows (user_id, updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_workflows_updated ON workflows (updated_at DESC);
+CREATE TABLE IF NOT EXISTS workflow_versions (
+    workflow_id TEXT NOT NULL REFERENCES workflows (id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    is_snapshot INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (workflow_id, version)
+) WITHOUT ROWID;
+"""
+
+# Columns of a workflow summary; document bodies are in workflow_versions
+SUMMARY_COLUMNS = "id, user_id, name, description, head_version, created_at, updated_at"
+
+
+class PatchError(ValueError):
+    """A JSON Patch that cannot be applied to the document."""
+
+
+class WorkflowNotFound(KeyError):
+    """Unknown workflow id or version."""
+
+
+class VersionConflict(Exception):
+    """A delta was based on a version that is no longer the head."""
+
+    def __init__(self, head_version: int):
+        super().__init__(f"Base version is stale; head is {head_version}")
+        self.head_version = head_version
+
+
+def _pointer(path: Any) -> List[str]:
+    if not isinstance(path, str):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    return [p.replace("~1", "/").replace("~0", "~") for p in path[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(document: Any, tokens: List[str]) -> Any:
+    for token in tokens:
+        if isinstance(document, list):
+            document = document[_index(document, token, allow_end=False)]
+        elif isinstance(document, dict) and token in document:
+            document = document[token]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return document
+
+
+def _add(document: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, list):
+        parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        raise PatchError(f"Cannot add to a scalar at /{'/'.join(tokens[:-1])}")
+    return document
+
+
+def _remove(document: Any, tokens: List[str]) -> Tuple[Any, Any]:
+    if not tokens:
+        raise PatchError("Cannot remove the document root")
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, list):
+        return document, parent.pop(_index(parent, tokens[-1], allow_end=False))
+    if isinstance(parent, dict) and tokens[-1] in parent:
+        return document, parent.pop(tokens[-1])
+    raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def apply_patch(document: Any, patch: List[Dict[str, Any]]) -> Any:
+    """Apply a JSON Patch and return the new document.
+
+    The input is not modified. Raises ``PatchError`` if any operation fails,
+    in which case no part of the patch is applied.
+    """
+    document = copy.deepcopy(document)
+    for operation in patch:
+        op = operation.get("op")
+        if "path" not in operation:
+            raise PatchError(f"Operation without a path: {operation}")
+        tokens = _pointer(operation["path"])
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' operation without a value")
+
+        if op == "add":
+            document = _add(document, tokens, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            document, _ = _remove(document, tokens)
+        elif op == "replace":
+            document, _ = _remove(document, tokens) if tokens else (None, None)
+            document = _add(document, tokens, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            source = _pointer(operation.get("from", ""))
+            if op == "move":
+                if tokens[: len(source)] == source and tokens != source:
+                    raise PatchError("Cannot move a value into itself")
+                document, value = _remove(document, source)
+            else:
+                value = copy.deepcopy(_resolve(document, source))
+            document = _add(document, tokens, value)
+        elif op == "test":
+            if _resolve(document, tokens) != operation["value"]:
+                raise PatchError(f"Test failed at {operation['path']}")
+        else:
+            raise PatchError(f"Unknown operation: {op!r}")
+    return document
+
+
+def encode(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def row_to_summary(row: tuple) -> Dict[str, Any]:
+    keys = [c.strip() for c in SUMMARY_COLUMNS.split(",")]
+    return dict(zip(keys, row))
+
+
+class WorkflowStore:
+    """SQLite-backed workflows; blocking calls run in a worker thread."""
+
+    def __init__(self, path: str, snapshot_interval: int = 20, max_heads: int = 64):
+        self.path = path
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.connection: Optional[sqlite3.Connection] = None
+        self.db_lock = threading.Lock()
+        # Recently written heads, so consecutive saves skip reconstruction
+        self.heads: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self.max_heads = max_heads
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(SCHEMA)
+            self.connection = connection
+        return self.connection
+
+    async def run(self, method, *args):
+        return await asyncio.to_thread(method, *args)
+
+    def remember(self, workflow_id: str, version: int, document: Any):
+        self.heads[workflow_id] = (version, document)
+        self.heads.move_to_end(workflow_id)
+        while len(self.heads) > self.max_heads:
+            self.heads.popitem(last=False)
+
+    # Blocking implementations
+
+    def _create(
+        self, name: str, description: str, document: Any, user_id: Optional[str]
+    ) -> Dict[str, Any]:
+        workflow_id = str(uuid.uuid4())
+        now = time.time()
+        body = encode(document)
+        with self.db_lock:
+            connection = self.connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    f"INSERT INTO workflows ({SUMMARY_COLUMNS}) "
+                    "VALUES (?, ?, ?, ?, 1, ?, ?)",
+                    (workflow_id, user_id, name, description, now, now),
+                )
+                connection.execute(
+                    "INSERT INTO workflow_versions "
+                    "(workflow_id, version, is_snapshot, size, created_at, body) "
+                    "VALUES (?, 1, 1, ?, ?, ?)",
+                    (workflow_id, len(body), now, body),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self.remember(workflow_id, 1, copy.deepcopy(document))
+        return self._summary(workflow_id)
+
+    def _summary(self, workflow_id: str, owner: Optional[str] = None) -> Dict[str, Any]:
+        rows = (
+            self.connect()
+            .execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM workflows WHERE id = ?",
+                (workflow_id,),
+            )
+            .fetchall()
+        )
+        if not rows:
+            raise WorkflowNotFound(workflow_id)
+        summary = row_to_summary(rows[0])
+        # Someone else's workflow looks the same as a missing one
+        if owner is not None and summary["user_id"] != owner:
+            raise WorkflowNotFound(workflow_id)
+        return summary
+
+    def _document(self, workflow_id: str, version: int) -> Any:
+        head = self.heads.get(workflow_id)
+        if head is not None and head[0] == version:
+            return copy.deepcopy(head[1])
+
+        connection = self.connect()
+        rows = connection.execute(
+            "SELECT version, body FROM workflow_versions "
+            "WHERE workflow_id = ? AND version <= ? AND is_snapshot = 1 "
+            "ORDER BY version DESC LIMIT 1",
+            (workflow_id, version),
+        ).fetchall()
+        if not rows:
+            raise WorkflowNotFound(f"{workflow_id}@{version}")
+        snapshot_version, body = rows[0]
+        document = json.loads(body)
+
+        deltas = connection.execute(
+            "SELECT version, body FROM workflow_versions "
+            "WHERE workflow_id = ? AND version > ? AND version <= ? "
+            "ORDER BY version",
+            (workflow_id, snapshot_version, version),
+        ).fetchall()
+        if snapshot_version + len(deltas) != version:
+            raise WorkflowNotFound(f"{workflow_id}@{version}")
+        for _, delta in deltas:
+            document = apply_patch(document, json.loads(delta))
+        return document
+
+    def _get(
+        self, workflow_id: str, version: Optional[int], owner: Optional[str]
+    ) -> Dict[str, Any]:
+        with self.db_lock:
+            summary = self._summary(workflow_id, owner)
+            if version is None:
+                version = summary["head_version"]
+            document = self._document(workflow_id, version)
+        return {**summary, "version": version, "document": document}
+
+    def _commit(
+        self,
+        workflow_id: str,
+        base_version: int,
+        patch: List[Dict[str, Any]],
+        name: Optional[str],
+        description: Optional[str],
+        owner: Optional[str],
+    ) -> Dict[str, Any]:
+        with self.db_lock:
+            summary = self._summary(workflow_id, owner)
+            head_version = summary["head_version"]
+            if base_version != head_version:
+                raise VersionConflict(head_version)
+
+            document = self._document(workflow_id, head_version)
+            document = apply_patch(document, patch)
+            version = head_version + 1
+            is_snapshot = (version - 1) % self.snapshot_interval == 0
+            body = encode(document if is_snapshot else patch)
+            now = time.time()
+
+            connection = self.connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Guarded on the head so a concurrent writer in another
+                # process cannot interleave with us
+                cursor = connection.execute(
+                    "UPDATE workflows SET head_version = ?, updated_at = ?, "
+                    "name = COALESCE(?, name), description = COALESCE(?, description) "
+                    "WHERE id = ? AND head_version = ?",
+                    (version, now, name, description, workflow_id, head_version),
+                )
+                if cursor.rowcount != 1:
+                    raise VersionConflict(self._summary(workflow_id)["head_version"])
+                connection.execute(
+                    "INSERT INTO workflow_versions "
+                    "(workflow_id, version, is_snapshot, size, created_at, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (workflow_id, version, int(is_snapshot), len(body), now, body),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                self.heads.pop(workflow_id, None)
+                raise
+            self.remember(workflow_id, version, document)
+            return self._summary(workflow_id)
+
+    def _list(
+        self, user_id: Optional[str], limit: int, offset: int
+    ) -> List[Dict[str, Any]]:
+        if user_id is None:
+            sql = f"SELECT {SUMMARY_COLUMNS} FROM workflows ORDER BY updated_at DESC"
+            params: tuple = ()
+        else:
+            sql = (
+                f"SELECT {SUMMARY_COLUMNS} FROM workflows WHERE user_id = ? "
+                "ORDER BY updated_at DESC"
+            )
+            params = (user_id,)
+        with self.db_lock:
+            rows = (
+                self.connect()
+                .execute(f"{sql} LIMIT ? OFFSET ?", params + (limit, offset))
+                .fetchall()
+            )
+        return [row_to_summary(row) for row in rows]
+
+    def _versions(self, workflow_id: str, owner: Optional[str]) -> List[Dict[str, Any]]:
+        with self.db_lock:
+            self._summary(workflow_id, owner)
+            rows = (
+                self.connect()
+                .execute(
+                    "SELECT version, is_snapshot, size, created_at "
+                    "FROM workflow_versions WHERE workflow_id = ? "
+                    "ORDER BY version DESC",
+                    (workflow_id,),
+                )
+                .fetchall()
+            )
+        return [
+            {
+                "version": version,
+                "snapshot": bool(is_snapshot),
+                "size": size,
+                "created_at": created_at,
+            }
+            for version, is_snapshot, size, created_at in rows
+        ]
+
+    def _delete(self, workflow_id: str, owner: Optional[str]):
+        with self.db_lock:
+            cursor = self.connect().execute(
+                "DELETE FROM workflows WHERE id = ? AND (? IS NULL OR user_id = ?)",
+                (workflow_id, owner, owner),
+            )
+            self.heads.pop(workflow_id, None)
+        if cursor.rowcount != 1:
+            raise WorkflowNotFound(workflow_id)
+
+    # Async API
+
+    async def create(
+        self,
+        name: str,
+        document: Any,
+        description: str = "",
+        user_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Create a workflow; its first version is a snapshot."""
+        return await self.run(self._create, name, description, document, user_id)
+
+    async def get(
+        self,
+        workflow_id: str,
+        version: Optional[int] = None,
+        owner: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Summary plus the document at ``version`` (default: head)."""
+        return await self.run(self._get, workflow_id, version, owner)
+
+    async def commit(
+        self,
+        workflow_id: str,
+        base_version: int,
+        patch: List[Dict[str, Any]],
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        owner: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Apply ``patch`` to ``base_version``, which must be the head."""
+        return await self.run(
+            self._commit, workflow_id, base_version, patch, name, description, owner
+        )
+
+    async def list(
+        self, user_id: Optional[str] = None, limit: int = 50, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Workflow summaries, most recently updated first."""
+        return await self.run(self._list, user_id, limit, offset)
+
+    async def versions(
+        self, workflow_id: str, owner: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Version history without bodies, newest first."""
+        return await self.run(self._versions, workflow_id, owner)
+
+    async def delete(self, workflow_id: str, owner: Optional[str] = None):
+        await self.run(self._delete, workflow_id, owner)
+
+
+_store = None
+
+
+def get_store() -> WorkflowStore:
+    """Return the process-wide workflow store, created on first use."""
+    global _store
+    if _store is None:
+        _store = WorkflowStore(
+            settings.workflow_db_path or str(DEFAULT_PATH),
+            snapshot_interval=settings.workflow_snapshot_interval,
+        )
+    return _store
@@ -0,0 +1,42 @@
+"""Regression tests for node-graph validation of malformed input."""
+
+from openscope_backend.graph import validate_graph
+
+
+def codes(report):
+    return [d.code for d in report.diagnostics]
+
+
+def test_non_string_type_is_reported():
+    graph = {"nodes": [{"id": "a", "data": {"type": 5}}], "edges": []}
+    report = validate_graph(graph)
+    assert "invalid_type" in codes(report)
+    assert report.escalate
+
+
+def test_non_finite_param_is_reset():
+    graph = {
+        "nodes": [
+            {"id": "v", "data": {"type": "videoInput"}},
+            {"id": "b", "data": {"type": "blur", "config": {"radius": float("nan")}}},
+            {"id": "o", "data": {"type": "pipelineOutput"}},
+        ],
+        "edges": [{"source": "v", "target": "b"}, {"source": "b", "target": "o"}],
+    }
+    report = validate_graph(graph)
+    assert "invalid_param" in codes(report)
+    assert report.fixed_graph["nodes"][1]["data"]["config"]["radius"] == 5
+
+
+def test_duplicate_ids_are_reported_once_in_order():
+    graph = {
+        "nodes": [
+            {"id": "a", "data": {"type": "videoInput"}},
+            {"id": "a", "data": {"type": "videoInput"}},
+            {"id": "o", "data": {"type": "pipelineOutput"}},
+        ],
+        "edges": [{"source": "a", "target": "o"}],
+    }
+    report = validate_graph(graph)
+    assert "duplicate_id" in codes(report)
+    assert report.order == ["a", "o"]
@@ -0,0 +1,63 @@
+"""Regression tests for the grid_per_call rule of the performance linter."""
+
+from openscope_backend.perf_lint import lint_source
+
+
+def rules(code: str):
+    return [finding.rule for finding in lint_source(code)]
+
+
+def test_grid_built_per_call_is_flagged():
+    code = """
+import torch
+
+def process_frames(frames):
+    _, h, w, _ = frames.shape
+    ys = torch.linspace(-1, 1, h)
+    return frames
+"""
+    assert "grid_per_call" in rules(code)
+
+
+def test_memoized_grid_helper_is_not_flagged():
+    code = """
+from functools import lru_cache
+import functools
+import torch
+
+@lru_cache(maxsize=8)
+def _grid(h, w):
+    return torch.meshgrid(torch.linspace(-1, 1, h), torch.linspace(-1, 1, w))
+
+@functools.cache
+def _ramp(n):
+    return torch.arange(n)
+
+def process_frames(frames):
+    _, h, w, _ = frames.shape
+    return _grid(h, w), _ramp(h)
+"""
+    assert "grid_per_call" not in rules(code)
+
+
+def test_dict_cached_grid_is_not_flagged():
+    code = """
+import torch
+
+class Warp:
+    def __init__(self):
+        self.grids = {}
+        self.grid = None
+
+    def __call__(self, frames):
+        key = tuple(frames.shape[1:3])
+        if key not in self.grids:
+            self.grids[key] = torch.linspace(-1, 1, key[0])
+        if self.grid is None:
+            self.grid = torch.arange(key[1])
+        cached = self.grids.get(key)
+        if cached is None:
+            cached = torch.linspace(-1, 1, key[1])
+        return frames
+"""
+    assert "grid_per_call" not in rules(code)
@@ -0,0 +1,48 @@
+"""Tests for per-user rate limiting behind a proxy."""
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from openscope_backend import scheduler
+from openscope_backend.proxy import ForwardedMiddleware
+
+
+def make_client(monkeypatch) -> TestClient:
+    # One restart's worth of tokens and no refill
+    monkeypatch.setattr(
+        scheduler,
+        "_scheduler",
+        scheduler.FairScheduler(
+            concurrency=1, rate_per_minute=0, burst=4, max_queued_per_user=3
+        ),
+    )
+    app = FastAPI()
+    app.add_middleware(ForwardedMiddleware, hops=1)
+
+    @app.post("/restart")
+    async def restart(request: Request):
+        async with scheduler.scheduled("restart", scheduler.request_user(request)):
+            return {"user": scheduler.request_user(request)}
+
+    return TestClient(app)
+
+
+def test_rotated_forwarded_for_keeps_the_bucket(monkeypatch):
+    client = make_client(monkeypatch)
+    first = client.post("/restart", headers={"X-Forwarded-For": "10.0.0.1, 1.2.3.4"})
+    assert first.json() == {"user": "client:1.2.3.4"}
+
+    # Rotating the entries the client writes does not give it a new bucket
+    for spoofed in ("10.0.0.2", "10.0.0.3"):
+        response = client.post(
+            "/restart", headers={"X-Forwarded-For": f"{spoofed}, 1.2.3.4"}
+        )
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+
+
+def test_other_clients_have_their_own_bucket(monkeypatch):
+    client = make_client(monkeypatch)
+    for address in ("1.2.3.4", "5.6.7.8"):
+        response = client.post("/restart", headers={"X-Forwarded-For": address})
+        assert response.status_code == 200
@@ -0,0 +1,45 @@
+"""Tests for the pipeline-schema change feed."""
+
+import json
+
+from openscope_backend import schema_feed
+from openscope_backend.schema_feed import SchemaFeed, get_feed
+
+
+def document(**pipelines) -> bytes:
+    return json.dumps({"pipelines": pipelines}).encode()
+
+
+def test_versions_match_across_feeds():
+    # Two workers that fetched the same schemas agree on the version
+    first, second = SchemaFeed(10), SchemaFeed(10)
+    first.update(document(a={"v": 1}))
+    second.update(document(a={"v": 1}))
+    token = first.token
+    assert second.token == token
+
+    second.update(document(a={"v": 2}, b={"v": 1}))
+    changes = second.since(token)
+    assert not changes["reset"]
+    assert changes["added"] == {"b": {"v": 1}}
+    assert changes["modified"] == {"a": {"v": 2}}
+
+    second.update(document(b={"v": 1}))
+    assert second.since(token)["removed"] == ["a"]
+
+
+def test_unknown_version_resets():
+    feed = SchemaFeed(10)
+    feed.update(document(a={"v": 1}))
+    changes = feed.since("unknown")
+    assert changes["reset"]
+    assert changes["added"] == {"a": {"v": 1}}
+
+
+def test_feeds_for_other_backends_are_capped(monkeypatch):
+    monkeypatch.setattr(schema_feed, "_feeds", schema_feed.OrderedDict())
+    default = get_feed()
+    for i in range(schema_feed.MAX_FEEDS * 2):
+        get_feed(f"http://scope-{i}:8000")
+    assert len(schema_feed._feeds) == schema_feed.MAX_FEEDS + 1
+    assert get_feed() is default
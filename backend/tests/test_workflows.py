@@ -0,0 +1,84 @@
+"""Tests for JSON Patch application and delta-encoded workflow history."""
+
+import asyncio
+
+import pytest
+
+from openscope_backend.workflows import (
+    PatchError,
+    WorkflowNotFound,
+    WorkflowStore,
+    apply_patch,
+)
+
+
+def test_patch_operations():
+    document = {"nodes": [{"id": "a"}], "edges": [], "plugin_config": {}}
+    patched = apply_patch(
+        document,
+        [
+            {"op": "add", "path": "/nodes/-", "value": {"id": "b"}},
+            {"op": "replace", "path": "/nodes/0/id", "value": "c"},
+            {"op": "copy", "from": "/nodes/1", "path": "/plugin_config/last"},
+            {"op": "move", "from": "/nodes/0", "path": "/edges/0"},
+            {"op": "remove", "path": "/nodes/0"},
+            {"op": "test", "path": "/plugin_config/last/id", "value": "b"},
+        ],
+    )
+    assert patched == {
+        "nodes": [],
+        "edges": [{"id": "c"}],
+        "plugin_config": {"last": {"id": "b"}},
+    }
+    assert document == {"nodes": [{"id": "a"}], "edges": [], "plugin_config": {}}
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        {"op": "add", "path": 1, "value": 1},
+        {"op": "move", "from": None, "path": "/x"},
+        {"op": "add", "path": "nodes", "value": 1},
+        {"op": "remove", "path": "/nodes/5"},
+        {"op": "test", "path": "/nodes", "value": None},
+        {"op": "bogus", "path": "/nodes"},
+    ],
+)
+def test_invalid_operations_raise_patch_error(operation):
+    with pytest.raises(PatchError):
+        apply_patch({"nodes": []}, [operation])
+
+
+def test_versions_rebuild_from_snapshots_and_deltas(tmp_path):
+    async def scenario():
+        store = WorkflowStore(str(tmp_path / "w.sqlite3"), snapshot_interval=3)
+        created = await store.create("flow", {"nodes": []})
+        workflow_id = created["id"]
+        for version in range(1, 7):
+            patch = [{"op": "add", "path": "/nodes/-", "value": version}]
+            await store.commit(workflow_id, version, patch)
+
+        history = await store.versions(workflow_id)
+        snapshots = [v["version"] for v in history if v["snapshot"]]
+        assert sorted(snapshots) == [1, 4, 7]
+
+        # A fresh store has no cached heads, so every read rebuilds
+        fresh = WorkflowStore(store.path, snapshot_interval=3)
+        for version in range(1, 8):
+            workflow = await fresh.get(workflow_id, version)
+            assert workflow["document"] == {"nodes": list(range(1, version))}
+
+    asyncio.run(scenario())
+
+
+def test_owner_scopes_access(tmp_path):
+    async def scenario():
+        store = WorkflowStore(str(tmp_path / "w.sqlite3"))
+        created = await store.create("flow", {"nodes": []}, user_id="alice")
+        with pytest.raises(WorkflowNotFound):
+            await store.get(created["id"], owner="bob")
+        with pytest.raises(WorkflowNotFound):
+            await store.delete(created["id"], owner="bob")
+        await store.delete(created["id"], owner="alice")
+
+    asyncio.run(scenario())
@@ -64,8 +64,8 @@ export default function Home() {
     loadPipeline,
     startWebRTC,
     stopWebRTC,
-    connectToCloud,
     sendParameterUpdate,
+    queueStatus,
   } = useScopeServer();
 
   const [user, setUser] = useState<{ email?: string; avatar_url?: string } | null>(null);
@@ -151,6 +151,15 @@ export default function Home() {
     return () => subscription.unsubscribe();
   }, []);
 
+  // Scope is at capacity: tell the user where they are in line
+  useEffect(() => {
+    if (!queueStatus) return;
+    showWarning(
+      "Waiting for a free stream",
+      `Position ${queueStatus.position} in queue, about ${Math.ceil(queueStatus.etaSeconds)}s`
+    );
+  }, [queueStatus?.position]);
+
   // Listen for video stream ready events from nodes
   useEffect(() => {
     const handleVideoStreamReady = (event: Event) => {
@@ -255,16 +264,9 @@ export default function Home() {
       const textPromptNodes = nodes.filter(n => n.data.type === "textPrompt");
       const imageInputNodes = nodes.filter(n => n.data.type === "imageInput");
 
-      // If remote inference is enabled, connect to cloud first
-      if (remoteInference) {
-        try {
-          await connectToCloud();
-        } catch (cloudErr) {
-          console.warn("Cloud connection failed, continuing anyway:", cloudErr);
-        }
-      }
-
-      // Include pipeline config parameters when loading pipeline
+      // Include pipeline config parameters when loading pipeline. The backend
+      // routes the session to local or cloud inference (remoteInference is a
+      // preference) and connects to the cloud itself when it picks it.
       await loadPipeline([pipelineId], { remoteInference, ...pipelineConfig });
 
       // Build prompts array from textPrompt nodes
@@ -365,7 +367,7 @@ export default function Home() {
     } finally {
       setIsLoading(false);
     }
-  }, [isScopeConnected, nodes, loadPipeline, startWebRTC, connectToCloud]);
+  }, [isScopeConnected, nodes, loadPipeline, startWebRTC]);
 
   const handleStopStream = useCallback(() => {
     stopWebRTC();
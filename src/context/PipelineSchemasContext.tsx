@@ -39,33 +39,69 @@ const PipelineSchemasContext = createContext<PipelineSchemasContextType>({
   runtimeParams: {},
 });
 
+interface SchemaChanges {
+  version: string;
+  reset: boolean;
+  added: Record<string, PipelineInfo>;
+  modified: Record<string, PipelineInfo>;
+  removed: string[];
+}
+
+// Extract runtime params (is_load_param === false) for each pipeline
+function extractRuntimeParams(schemas: Record<string, PipelineInfo>) {
+  const runtime: Record<string, string[]> = {};
+  Object.entries(schemas).forEach(([id, info]) => {
+    const configSchema = info.config_schema as { properties?: Record<string, { ui?: { is_load_param?: boolean } }> } | undefined;
+    if (configSchema?.properties) {
+      runtime[id] = Object.entries(configSchema.properties)
+        .filter(([, prop]) => prop.ui?.is_load_param === false)
+        .map(([key]) => key);
+    } else {
+      runtime[id] = [];
+    }
+  });
+  return runtime;
+}
+
+function applyChanges(
+  current: Record<string, PipelineInfo>,
+  changes: SchemaChanges,
+): Record<string, PipelineInfo> {
+  const next = changes.reset ? {} : { ...current };
+  changes.removed.forEach((id) => delete next[id]);
+  return { ...next, ...changes.added, ...changes.modified };
+}
+
 export function PipelineSchemasProvider({ children }: { children: ReactNode }) {
   const [pipelineSchemas, setPipelineSchemas] = useState<Record<string, PipelineInfo>>({});
   const [isLoading, setIsLoading] = useState(true);
   const [runtimeParams, setRuntimeParams] = useState<Record<string, string[]>>({});
 
   useEffect(() => {
+    // The change feed sends every schema once, then only the pipelines that
+    // were added, modified or removed (e.g. after a plugin install)
+    let source: EventSource | null = null;
+
+    const apply = (changes: SchemaChanges) => {
+      setPipelineSchemas((current) => {
+        const schemas = applyChanges(current, changes);
+        setRuntimeParams(extractRuntimeParams(schemas));
+        return schemas;
+      });
+    };
+
     const fetchSchemas = async () => {
       try {
-        const response = await fetch(`${getBackendUrl()}${SCOPE_API_URL}/pipelines`);
+        const response = await fetch(`${getBackendUrl()}${SCOPE_API_URL}/pipelines/changes`);
         if (response.ok) {
-          const data = await response.json(); 
-          const schemas = data.pipelines as Record<string, PipelineInfo>;
-          setPipelineSchemas(schemas);
-
-          // Extract runtime params (is_load_param === false) for each pipeline
-          const runtime: Record<string, string[]> = {};
-          Object.entries(schemas).forEach(([id, info]) => {
-            const configSchema = info.config_schema as { properties?: Record<string, { ui?: { is_load_param?: boolean } }> } | undefined;
-            if (configSchema?.properties) {
-              runtime[id] = Object.entries(configSchema.properties)
-                .filter(([, prop]) => prop.ui?.is_load_param === false)
-                .map(([key]) => key);
-            } else {
-              runtime[id] = [];
-            }
+          const changes = (await response.json()) as SchemaChanges;
+          apply(changes);
+          source = new EventSource(
+            `${getBackendUrl()}${SCOPE_API_URL}/pipelines/changes/stream?since=${encodeURIComponent(changes.version)}`,
+          );
+          source.addEventListener("changes", (event) => {
+            apply(JSON.parse((event as MessageEvent).data) as SchemaChanges);
           });
-          setRuntimeParams(runtime);
         }
       } catch (error) {
         console.error("Failed to fetch pipeline schemas:", error);
@@ -74,6 +110,7 @@ export function PipelineSchemasProvider({ children }: { children: ReactNode }) {
       }
     };
     fetchSchemas();
+    return () => source?.close();
   }, []);
 
   return (
@@ -1,6 +1,8 @@
 "use client";
 
 import { useState, useEffect, useRef, useCallback } from "react";
+import { usePipelineSchemas } from "@/context/PipelineSchemasContext";
+import { checkParameters } from "@/lib/parameterRanges";
 
 export interface PipelineStatus {
   status: "not_loaded" | "loading" | "loaded" | "error";
@@ -33,6 +35,9 @@ export interface WebRTCOfferResponse {
   sdp: string;
   type: string;
   sessionId: string;
+  // Returned by /webrtc/connect along with the answer
+  iceServers?: IceServer[];
+  iceServersTtl?: number;
 }
 
 export interface CloudStatus {
@@ -43,8 +48,53 @@ export interface CloudStatus {
   credentials_configured: boolean;
 }
 
+export interface QueueStatus {
+  position: number;
+  etaSeconds: number;
+}
+
 const SCOPE_API_URL = "/api/scope";
 
+// Heartbeats keep the streaming slot from being reaped as idle; well inside
+// the backend's session idle timeout
+const HEARTBEAT_INTERVAL_MS = 20000;
+
+// Parameter changes are merged and sent at most this often over the data channel
+const PARAMETER_MAX_RATE_HZ = 20;
+
+// One streaming slot per tab. The backend keys admission on this id, so
+// tabs behind the same proxy address do not share (or steal) a slot.
+const getConnectionId = (): string => {
+  let id = sessionStorage.getItem("openscope-connection-id");
+  if (!id) {
+    id = crypto.randomUUID();
+    sessionStorage.setItem("openscope-connection-id", id);
+  }
+  return id;
+};
+
+// Error text from a failed response; FastAPI puts it in "detail", which may
+// be an object with a "message"
+const readError = async (response: Response, fallback: string) => {
+  const contentType = response.headers.get("content-type");
+  if (contentType?.includes("application/json")) {
+    try {
+      const errorData = await response.json();
+      const detail = errorData.detail;
+      if (typeof detail === "string") return detail;
+      return detail?.message || fallback;
+    } catch {
+      return fallback;
+    }
+  }
+  const errorText = await response.text();
+  return errorText.substring(0, 200) || fallback;
+};
+
+// ICE servers from the last /webrtc/connect, reused until they expire so
+// later streams start without a separate ice-servers round trip
+let cachedIceServers: { servers: IceServer[]; expires: number } | null = null;
+
 export const getBackendUrl = () => {
   if (typeof window === "undefined") return "";
 
@@ -65,11 +115,71 @@ export function useScopeServer() {
     null,
   );
   const [cloudStatus, setCloudStatus] = useState<CloudStatus | null>(null);
+  const [queueStatus, setQueueStatus] = useState<QueueStatus | null>(null);
 
   const peerConnectionRef = useRef<RTCPeerConnection | null>(null);
   const sessionIdRef = useRef<string | null>(null);
   const remoteStreamRef = useRef<MediaStream | null>(null);
   const dataChannelRef = useRef<RTCDataChannel | null>(null);
+  const heartbeatRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const leftQueueRef = useRef(false);
+  const pendingParametersRef = useRef<Record<string, unknown>>({});
+  const parameterTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+  const parametersSentRef = useRef(0);
+  const loadedPipelineIdsRef = useRef<string[]>([]);
+  const { pipelineSchemas } = usePipelineSchemas();
+
+  // POST that needs a streaming slot. While Scope is at capacity the backend
+  // answers 503 with our queue position; retry to keep the place.
+  const postAdmitted = useCallback(
+    async (path: string, body: Record<string, unknown>) => {
+      leftQueueRef.current = false;
+      while (true) {
+        const response = await fetch(`${getBackendUrl()}${SCOPE_API_URL}${path}`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ ...body, connection_id: getConnectionId() }),
+        });
+        const detail =
+          response.status === 503
+            ? (await response.clone().json().catch(() => null))?.detail
+            : null;
+        if (typeof detail?.position !== "number") {
+          setQueueStatus(null);
+          return response;
+        }
+        setQueueStatus({ position: detail.position, etaSeconds: detail.eta_seconds });
+        const retryAfter = Number(response.headers.get("Retry-After")) || 5;
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+        if (leftQueueRef.current) {
+          setQueueStatus(null);
+          throw new Error("Left the queue");
+        }
+      }
+    },
+    [],
+  );
+
+  const startHeartbeat = useCallback(() => {
+    if (heartbeatRef.current) return;
+    const url = `${getBackendUrl()}${SCOPE_API_URL}/sessions/${getConnectionId()}/heartbeat`;
+    heartbeatRef.current = setInterval(() => {
+      fetch(url, { method: "POST" }).catch(() => {});
+    }, HEARTBEAT_INTERVAL_MS);
+  }, []);
+
+  // Give the slot (or queue place) back; keepalive lets it run on page unload
+  const releaseSession = useCallback(() => {
+    leftQueueRef.current = true;
+    if (heartbeatRef.current) {
+      clearInterval(heartbeatRef.current);
+      heartbeatRef.current = null;
+    }
+    fetch(`${getBackendUrl()}${SCOPE_API_URL}/sessions/${getConnectionId()}`, {
+      method: "DELETE",
+      keepalive: true,
+    }).catch(() => {});
+  }, []);
 
   const checkConnection = useCallback(async () => {
     try {
@@ -130,35 +240,17 @@ export function useScopeServer() {
     ) => {
       try {
         setPipelineStatus({ status: "loading" });
-        const response = await fetch(
-          `${getBackendUrl()}${SCOPE_API_URL}/pipeline/load`,
-          {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-              pipeline_ids: pipelineIds,
-              load_params: loadParams || {},
-            }),
-          },
-        );
+        loadedPipelineIdsRef.current = pipelineIds;
+        const response = await postAdmitted("/pipeline/load", {
+          pipeline_ids: pipelineIds,
+          load_params: loadParams || {},
+        });
 
         if (!response.ok) {
-          const contentType = response.headers.get("content-type");
-          let errorMessage = "Failed to load pipeline";
-          if (contentType?.includes("application/json")) {
-            try {
-              const errorData = await response.json();
-              errorMessage = errorData.detail || errorMessage;
-            } catch {
-              const errorText = await response.text();
-              errorMessage = errorText.substring(0, 200);
-            }
-          } else {
-            const errorText = await response.text();
-            errorMessage = errorText.substring(0, 200);
-          }
-          throw new Error(errorMessage);
+          throw new Error(await readError(response, "Failed to load pipeline"));
         }
+        // Admitted: hold the slot through the load and the stream
+        startHeartbeat();
 
         // If waitForLoad is true, poll until pipeline is loaded
         if (waitForLoad) {
@@ -187,6 +279,7 @@ export function useScopeServer() {
         return data;
       } catch (err) {
         console.error("Failed to load pipeline:", err);
+        releaseSession();
         setPipelineStatus({
           status: "error",
           error: err instanceof Error ? err.message : "Unknown error",
@@ -194,7 +287,7 @@ export function useScopeServer() {
         throw err;
       }
     },
-    [],
+    [postAdmitted, startHeartbeat, releaseSession],
   );
 
   const getCloudStatus = useCallback(async () => {
@@ -271,10 +364,15 @@ export function useScopeServer() {
       localStream?: MediaStream | null,
     ) => {
       try {
-        const iceResponse = await fetch(
-          `${getBackendUrl()}${SCOPE_API_URL}/webrtc/ice-servers`,
-        );
-        const iceData: IceServersResponse = await iceResponse.json();
+        let iceData: IceServersResponse;
+        if (cachedIceServers && cachedIceServers.expires > Date.now()) {
+          iceData = { iceServers: cachedIceServers.servers };
+        } else {
+          const iceResponse = await fetch(
+            `${getBackendUrl()}${SCOPE_API_URL}/webrtc/ice-servers`,
+          );
+          iceData = await iceResponse.json();
+        }
 
         // Helper to normalize urls (can be string or array)
         const normalizeUrls = (urls: string | string[]): string[] => {
@@ -351,12 +449,49 @@ export function useScopeServer() {
           }
         };
 
+        // Time from creating the offer to ICE connected, reported to the backend
+        const setupStart = performance.now();
+        let setupReported = false;
+
         // Log ICE connection state changes
         pc.oniceconnectionstatechange = () => {
           console.log(
             "[OpenScope] ICE connection state:",
             pc.iceConnectionState,
           );
+          if (pc.iceConnectionState === "connected" && !setupReported) {
+            setupReported = true;
+            fetch(`${getBackendUrl()}${SCOPE_API_URL}/webrtc/timing`, {
+              method: "POST",
+              headers: { "Content-Type": "application/json" },
+              body: JSON.stringify({
+                setup_ms: performance.now() - setupStart,
+                ice_mode: "batched",
+                session_id: sessionIdRef.current,
+              }),
+            }).catch(() => {});
+          }
+        };
+
+        // Candidates are gathered in bursts: collect them briefly and send
+        // each burst in one request. Candidates gathered before the answer
+        // arrives wait until the session id is known.
+        const pendingCandidates: RTCIceCandidateInit[] = [];
+        let flushTimer: ReturnType<typeof setTimeout> | null = null;
+        const flushCandidates = () => {
+          flushTimer = null;
+          if (!sessionIdRef.current || pendingCandidates.length === 0) return;
+          const candidates = pendingCandidates.splice(0);
+          fetch(
+            `${getBackendUrl()}${SCOPE_API_URL}/webrtc/ice/batch?session_id=${sessionIdRef.current}`,
+            {
+              method: "POST",
+              headers: { "Content-Type": "application/json" },
+              body: JSON.stringify({ candidates }),
+            },
+          ).catch((err) =>
+            console.error("[OpenScope] ICE candidate send failed:", err),
+          );
         };
 
         pc.onicecandidate = (event) => {
@@ -365,17 +500,8 @@ export function useScopeServer() {
               "[OpenScope] Local ICE candidate:",
               event.candidate.toJSON(),
             );
-          }
-          if (event.candidate && sessionIdRef.current) {
-            const iceUrl = `${getBackendUrl()}/api/scope/webrtc/ice?session_id=${sessionIdRef.current}`;
-            console.log("[OpenScope] Sending ICE candidate to:", iceUrl);
-            fetch(iceUrl, {
-              method: "POST",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify(event.candidate.toJSON()),
-            }).catch((err) =>
-              console.error("[OpenScope] ICE candidate send failed:", err),
-            );
+            pendingCandidates.push(event.candidate.toJSON());
+            if (!flushTimer) flushTimer = setTimeout(flushCandidates, 20);
           }
         };
 
@@ -399,40 +525,28 @@ export function useScopeServer() {
           JSON.stringify(requestBody, null, 2),
         );
 
-        const response = await fetch(
-          `${getBackendUrl()}${SCOPE_API_URL}/webrtc/offer`,
-          {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-              sdp: pc.localDescription?.sdp,
-              type: pc.localDescription?.type,
-              initialParameters: initialParameters,
-            }),
-          },
-        );
+        const response = await postAdmitted("/webrtc/connect", {
+          sdp: pc.localDescription?.sdp,
+          type: pc.localDescription?.type,
+          initialParameters: initialParameters,
+        });
 
         if (!response.ok) {
-          // Try to parse JSON error, fall back to text
-          const contentType = response.headers.get("content-type");
-          let errorMessage = "Failed to create WebRTC offer";
-          if (contentType?.includes("application/json")) {
-            try {
-              const errorData = await response.json();
-              errorMessage = errorData.detail || errorMessage;
-            } catch {
-              const errorText = await response.text();
-              errorMessage = errorText.substring(0, 200);
-            }
-          } else {
-            const errorText = await response.text();
-            errorMessage = errorText.substring(0, 200);
-          }
-          throw new Error(errorMessage);
+          throw new Error(
+            await readError(response, "Failed to create WebRTC offer"),
+          );
         }
+        startHeartbeat();
 
         const answer: WebRTCOfferResponse = await response.json();
         sessionIdRef.current = answer.sessionId;
+        if (answer.iceServers && answer.iceServersTtl) {
+          cachedIceServers = {
+            servers: answer.iceServers,
+            expires: Date.now() + answer.iceServersTtl * 1000,
+          };
+        }
+        flushCandidates();
 
         await pc.setRemoteDescription({
           sdp: answer.sdp,
@@ -449,10 +563,11 @@ export function useScopeServer() {
         return pc;
       } catch (err) {
         console.error("Failed to start WebRTC:", err);
+        releaseSession();
         throw err;
       }
     },
-    [],
+    [postAdmitted, startHeartbeat, releaseSession],
   );
 
   const stopWebRTC = useCallback(() => {
@@ -463,11 +578,19 @@ export function useScopeServer() {
     sessionIdRef.current = null;
     remoteStreamRef.current = null;
     dataChannelRef.current = null;
-  }, []);
-
-  // Send parameter update via WebRTC data channel
-  const sendParameterUpdate = useCallback((params: Record<string, unknown>) => {
-    console.log("[useScopeServer] sendParameterUpdate called with:", JSON.stringify(params, null, 2));
+    if (parameterTimerRef.current) {
+      clearTimeout(parameterTimerRef.current);
+      parameterTimerRef.current = null;
+    }
+    pendingParametersRef.current = {};
+    releaseSession();
+  }, [releaseSession]);
+
+  // Send all pending parameter changes in one data-channel message
+  const flushParameters = useCallback(() => {
+    parameterTimerRef.current = null;
+    const params = pendingParametersRef.current;
+    pendingParametersRef.current = {};
     if (
       dataChannelRef.current &&
       dataChannelRef.current.readyState === "open"
@@ -477,12 +600,35 @@ export function useScopeServer() {
         ...params,
       });
       dataChannelRef.current.send(message);
+      parametersSentRef.current = Date.now();
       console.log("[useScopeServer] Parameter update sent via data channel:", params);
     } else {
       console.warn("[useScopeServer] Data channel not ready for parameter update! readyState:", dataChannelRef.current?.readyState);
     }
   }, []);
 
+  // Send parameter update via WebRTC data channel. Values are checked
+  // against the loaded pipelines' schema ranges first, and rapid updates are
+  // merged so only the latest value per key goes out, at most
+  // PARAMETER_MAX_RATE_HZ times a second.
+  const sendParameterUpdate = useCallback((params: Record<string, unknown>) => {
+    console.log("[useScopeServer] sendParameterUpdate called with:", JSON.stringify(params, null, 2));
+    const checked = checkParameters(params, pipelineSchemas, loadedPipelineIdsRef.current);
+    if (checked.rejected.length) {
+      console.warn("[useScopeServer] Dropped parameters outside the pipeline schema:", checked.rejected);
+    }
+    if (!Object.keys(checked.params).length) return;
+    Object.assign(pendingParametersRef.current, checked.params);
+    if (parameterTimerRef.current) return;
+    const wait =
+      parametersSentRef.current + 1000 / PARAMETER_MAX_RATE_HZ - Date.now();
+    if (wait <= 0) {
+      flushParameters();
+    } else {
+      parameterTimerRef.current = setTimeout(flushParameters, wait);
+    }
+  }, [flushParameters, pipelineSchemas]);
+
   useEffect(() => {
     checkConnection();
 
@@ -490,6 +636,12 @@ export function useScopeServer() {
     return () => clearInterval(interval);
   }, [checkConnection]);
 
+  // Closing the tab ends the stream; free its slot (or queue place)
+  useEffect(() => {
+    window.addEventListener("pagehide", releaseSession);
+    return () => window.removeEventListener("pagehide", releaseSession);
+  }, [releaseSession]);
+
   return {
     isConnected,
     isConnecting,
@@ -497,6 +649,7 @@ export function useScopeServer() {
     pipelines,
     pipelineStatus,
     cloudStatus,
+    queueStatus,
     checkConnection,
     fetchPipelines,
     getPipelineStatus,
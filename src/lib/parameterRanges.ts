@@ -0,0 +1,97 @@
+// Check runtime parameter updates against the loaded pipelines' config
+// schemas before they go to Scope: numbers are clamped into their range
+// (and rounded for integers), values of the wrong type or outside an enum
+// are dropped. Keys no schema describes are passed through unchanged.
+
+interface PropertySchema {
+  type?: string;
+  enum?: unknown[];
+  minimum?: number;
+  maximum?: number;
+  exclusiveMinimum?: number;
+  exclusiveMaximum?: number;
+  anyOf?: PropertySchema[];
+}
+
+interface SchemaSource {
+  config_schema?: Record<string, unknown>;
+}
+
+export interface ParameterCheck {
+  params: Record<string, unknown>;
+  rejected: string[];
+}
+
+function findProperty(
+  key: string,
+  schemas: Record<string, SchemaSource>,
+  pipelineIds: string[],
+): PropertySchema | undefined {
+  for (const id of pipelineIds) {
+    const configSchema = schemas[id]?.config_schema as
+      | { properties?: Record<string, PropertySchema> }
+      | undefined;
+    const property = configSchema?.properties?.[key];
+    if (property) return property;
+  }
+  return undefined;
+}
+
+// Optional fields are anyOf [{type: "number", ...}, {type: "null"}]
+function variants(property: PropertySchema): PropertySchema[] {
+  return property.anyOf?.length ? property.anyOf : [property];
+}
+
+function checkValue(property: PropertySchema, value: unknown): { ok: boolean; value?: unknown } {
+  if (property.enum) {
+    return { ok: property.enum.some((option) => option === value), value };
+  }
+  for (const variant of variants(property)) {
+    if (variant.type === "null" && value === null) return { ok: true, value };
+    if (variant.type === "boolean" && typeof value === "boolean") return { ok: true, value };
+    if (variant.type === "string" && typeof value === "string") return { ok: true, value };
+    if (
+      (variant.type === "number" || variant.type === "integer") &&
+      typeof value === "number" &&
+      Number.isFinite(value)
+    ) {
+      let clamped = value;
+      if (variant.minimum !== undefined) clamped = Math.max(clamped, variant.minimum);
+      if (variant.maximum !== undefined) clamped = Math.min(clamped, variant.maximum);
+      if (variant.type === "integer") clamped = Math.round(clamped);
+      // Exclusive bounds have no closest valid value to clamp to
+      if (
+        (variant.exclusiveMinimum !== undefined && clamped <= variant.exclusiveMinimum) ||
+        (variant.exclusiveMaximum !== undefined && clamped >= variant.exclusiveMaximum)
+      ) {
+        return { ok: false };
+      }
+      return { ok: true, value: clamped };
+    }
+    if (!variant.type && variant.enum === undefined) return { ok: true, value };
+  }
+  return { ok: false };
+}
+
+export function checkParameters(
+  params: Record<string, unknown>,
+  schemas: Record<string, SchemaSource>,
+  pipelineIds: string[],
+): ParameterCheck {
+  const checked: Record<string, unknown> = {};
+  const rejected: string[] = [];
+  Object.entries(params).forEach(([key, value]) => {
+    const property = findProperty(key, schemas, pipelineIds);
+    if (!property) {
+      checked[key] = value;
+      return;
+    }
+    const result = checkValue(property, value);
+    if (result.ok) {
+      checked[key] = result.value;
+    } else {
+      rejected.push(key);
+    }
+  });
+  return { params: checked, rejected };
+}